@@ -0,0 +1,93 @@
+import configparser
+import os
+from dataclasses import dataclass, asdict
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SerialAnalyzer.ini")
+
+
+def _get_optional_int(section: configparser.SectionProxy, key: str, fallback: int | None) -> int | None:
+    # An empty value or 0 disables the limit; a value that is not a number keeps the fallback
+    if key not in section:
+        return fallback
+    text = section.get(key, "").strip()
+    if not text:
+        return None
+    try:
+        value = int(text)
+    except ValueError:
+        return fallback
+    return value if value > 0 else None
+
+
+def _get_int(section: configparser.SectionProxy, key: str, fallback: int) -> int:
+    # A missing, empty or malformed value keeps the fallback
+    try:
+        return int(section.get(key, "").strip())
+    except ValueError:
+        return fallback
+
+
+def _get_bool(section: configparser.SectionProxy, key: str, fallback: bool) -> bool:
+    # Accepts what getboolean() accepts; anything else keeps the fallback
+    text = section.get(key, "").strip().lower()
+    return configparser.ConfigParser.BOOLEAN_STATES.get(text, fallback)
+
+
+@dataclass(frozen=True)
+class ScrollbackConfig:
+    max_lines: int | None
+    max_bytes: int | None
+    spill_dir: str | None
+
+    @classmethod
+    def default(cls):
+        return cls(
+            max_lines=1_000_000,
+            max_bytes=64 * 1024 * 1024,
+            spill_dir=None,
+        )
+
+    @classmethod
+    def load(cls, path: str = CONFIG_PATH):
+        default = cls.default()
+        parser = configparser.ConfigParser()
+        parser.read(path, encoding="utf-8")
+        if not parser.has_section("scrollback"):
+            return default
+        section = parser["scrollback"]
+        return cls(
+            max_lines=_get_optional_int(section, "max_lines", default.max_lines),
+            max_bytes=_get_optional_int(section, "max_bytes", default.max_bytes),
+            spill_dir=section.get("spill_dir", "").strip() or default.spill_dir,
+        )
+
+    def replace(self, key, value):
+        items = asdict(self)
+        items[key] = value
+        return type(self)(**items)
+
+
+@dataclass(frozen=True)
+class RenderConfig:
+    fps: int
+    adaptive: bool
+
+    @classmethod
+    def default(cls):
+        return cls(
+            fps=30,
+            adaptive=True,
+        )
+
+    @classmethod
+    def load(cls, path: str = CONFIG_PATH):
+        default = cls.default()
+        parser = configparser.ConfigParser()
+        parser.read(path, encoding="utf-8")
+        if not parser.has_section("render"):
+            return default
+        section = parser["render"]
+        return cls(
+            fps=max(1, _get_int(section, "fps", default.fps)),
+            adaptive=_get_bool(section, "adaptive", default.adaptive),
+        )
@@ -0,0 +1,44 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_hex_builder import legacy_decode_ascii
+from utils import decode_ascii
+
+
+def measure(func, data: bytes, repeat: int, **kwargs) -> float:
+    best = None
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func(data, **kwargs)
+        elapsed = time.perf_counter() - t_start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="decode_ascii time per call")
+    parser.add_argument("--size", type=int, default=1 << 20, help="bytes decoded per call")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    printable = bytes(range(0x20, 0x7e)) * (args.size // 0x5e + 1)
+    mixed = bytes(range(256)) * (args.size // 256 + 1)
+    cases = [
+        ("strict", printable[:args.size], {}),
+        ("replace_error", mixed[:args.size], {"replace_error": "・"}),
+        ("replace_error+enable_spaces", mixed[:args.size], {"replace_error": "・", "enable_spaces": True}),
+    ]
+
+    print(f"size={args.size:,} bytes")
+    for name, data, kwargs in cases:
+        before = measure(legacy_decode_ascii, data, args.repeat, **kwargs)
+        after = measure(decode_ascii, data, args.repeat, **kwargs)
+        print(f"{name:<28s} before: {before * 1e3:>9.2f} ms  after: {after * 1e3:>7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
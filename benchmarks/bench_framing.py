@@ -0,0 +1,54 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framing import DelimiterFramer, LengthPrefixFramer, SlipFramer, CobsFramer, IdleGapFramer
+
+
+def make_messages(n_messages: int, size: int, seed: int = 0) -> list[bytes]:
+    rnd = random.Random(seed)
+    alphabet = bytes(range(0x20, 0x7e))
+    return [bytes(rnd.choice(alphabet) for _ in range(rnd.randint(1, 2 * size))) for _ in range(n_messages)]
+
+
+def split(data: bytes, chunk_size: int) -> list[bytes]:
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+def measure(framer, chunks: list[bytes]) -> tuple[float, int]:
+    n_messages = 0
+    t_start = time.perf_counter()
+    for i, chunk in enumerate(chunks):
+        n_messages += len(framer.feed(chunk, i))
+    return time.perf_counter() - t_start, n_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Framing throughput (MB/s and messages/s)")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=32, help="average message payload in bytes")
+    parser.add_argument("--chunk", type=int, default=256, help="bytes per feed, as read by the reader thread")
+    args = parser.parse_args()
+
+    payloads = make_messages(args.messages, args.size)
+    streams = [
+        ("delimiter LF", DelimiterFramer(b"\n"), b"".join(p + b"\n" for p in payloads)),
+        ("delimiter CRLF", DelimiterFramer(b"\r\n"), b"".join(p + b"\r\n" for p in payloads)),
+        ("length 2 BE", LengthPrefixFramer(2), b"".join(len(p).to_bytes(2, "big") + p for p in payloads)),
+        ("SLIP", SlipFramer(), b"".join(p + b"\xc0" for p in payloads)),
+        ("COBS", CobsFramer(), b"".join(bytes([len(p) + 1]) + p + b"\x00" for p in payloads if len(p) < 254)),
+        ("idle gap", IdleGapFramer(1), b"".join(payloads)),
+    ]
+
+    print(f"messages={args.messages:,} size~{args.size} bytes chunk={args.chunk} bytes")
+    for name, framer, data in streams:
+        elapsed, n_messages = measure(framer, split(data, args.chunk))
+        print(f"{name:<15s} {len(data) / elapsed / 1e6:>8.1f} MB/s {n_messages / elapsed:>12,.0f} messages/s")
+
+
+if __name__ == '__main__':
+    main()
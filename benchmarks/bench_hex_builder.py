@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_store import SessionBuffer
+from formatting import SessionBufferStringBuilder, HexStringBuilder
+
+
+def legacy_decode_ascii(values, replace_error=None, enable_spaces=False):
+    # utils.decode_ascii as it was before the table-driven rewrite
+    if not isinstance(values, list):
+        values = list(values)
+    for i in range(len(values)):
+        value = values[i]
+        if enable_spaces:
+            error = 0x7d < value
+        else:
+            error = value < 0x20 or 0x7d < value
+        if error:
+            if replace_error is not None:
+                values[i] = None
+            else:
+                raise ValueError()
+    return "".join(replace_error if value is None else chr(value) for value in values)
+
+
+class LegacyHexStringBuilder(SessionBufferStringBuilder):
+    # HexStringBuilder as it was before the batch renderer, kept as the "before" baseline
+    HEADER_LENGTH = 15
+    BLOCK_SIZE = 16
+
+    def _iter_blocks(self):
+        i = 0
+        values = self._buf.values
+        while i < len(values):
+            block = values[i:i + self.BLOCK_SIZE]
+            yield block
+            i += self.BLOCK_SIZE
+
+    def to_string(self) -> str:
+        block_bytes = [
+            " ".join("{:02x}".format(value) for value in block)
+            for block in self._iter_blocks()
+        ]
+        block_asciis = [
+            "".join(legacy_decode_ascii(block, replace_error='・'))
+            for block in self._iter_blocks()
+        ]
+        block_headers = [
+            str(self._buf.timestamp) if i == 0 else ""
+            for i in range(len(block_bytes))
+        ]
+        lines = [
+            f'{1 + i:>5d} | {header.ljust(self.HEADER_LENGTH)} | {b.ljust(3 * self.BLOCK_SIZE)}| {a}'
+            for i, (header, b, a) in enumerate(zip(block_headers, block_bytes, block_asciis))
+        ]
+        content = "\n".join(lines) + "\n"
+        return content
+
+
+def make_sessions(total_size: int, chunk_size: int) -> list[SessionBuffer]:
+    payload = bytes(range(256)) * (chunk_size // 256 + 1)
+    sessions = []
+    for _ in range(max(1, total_size // chunk_size)):
+        buf = SessionBuffer()
+        buf.append_bytes(payload[:chunk_size])
+        sessions.append(buf)
+    return sessions
+
+
+def measure(builder_cls, sessions: list[SessionBuffer], repeat: int) -> float:
+    best = None
+    n_lines = 0
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        n_lines = sum(builder_cls(buf).to_string().count("\n") for buf in sessions)
+        elapsed = time.perf_counter() - t_start
+        best = elapsed if best is None else min(best, elapsed)
+    return n_lines / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hex dump rendering throughput (lines/s)")
+    parser.add_argument("--size", type=int, default=1 << 20, help="total bytes rendered per run")
+    parser.add_argument("--chunk", type=int, default=4096, help="bytes per session")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sessions = make_sessions(args.size, args.chunk)
+    assert all(
+        LegacyHexStringBuilder(buf).to_string() == HexStringBuilder(buf).to_string()
+        for buf in sessions[:4]
+    )
+
+    before = measure(LegacyHexStringBuilder, sessions, args.repeat)
+    after = measure(HexStringBuilder, sessions, args.repeat)
+    print(f"size={args.size:,} bytes chunk={args.chunk:,} bytes")
+    print(f"before: {before:>14,.0f} lines/s")
+    print(f"after : {after:>14,.0f} lines/s ({after / before:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
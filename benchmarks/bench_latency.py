@@ -0,0 +1,105 @@
+import argparse
+import os
+import signal
+import sys
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import LatencyConfig, RESPONSE_HEX
+from serial_core import COMPortConnection
+
+
+class EchoDevice:
+    # Answers every line written to the master end of a pty after a fixed delay, like a device under test.
+    # It runs in a child process so that its timing does not compete for the GIL with the port's threads.
+    def __init__(self, delay: float):
+        self.__delay = delay
+        self.__master_fd, self.__slave_fd = os.openpty()
+        tty.setraw(self.__master_fd)
+        tty.setraw(self.__slave_fd)
+        self.__pid = os.fork()
+        if self.__pid == 0:
+            try:
+                self.__run()
+            finally:
+                os._exit(0)
+
+    @property
+    def device_name(self) -> str:
+        return os.ttyname(self.__slave_fd)
+
+    def close(self):
+        os.kill(self.__pid, signal.SIGTERM)
+        os.waitpid(self.__pid, 0)
+        os.close(self.__master_fd)
+        os.close(self.__slave_fd)
+
+    def __run(self):
+        buf = b""
+        while True:
+            buf += os.read(self.__master_fd, 4096)
+            while b"\n" in buf:
+                _, buf = buf.split(b"\n", 1)
+                # Busy-wait so the reply leaves on time to within a few microseconds
+                deadline = time.perf_counter() + self.__delay
+                while time.perf_counter() < deadline:
+                    pass
+                os.write(self.__master_fd, b"OK\r\n")
+
+
+def measure(device: EchoDevice, config: LatencyConfig, n_requests: int, interval: float):
+    conn = COMPortConnection(device.device_name)
+    conn.set_latency(config)
+    conn.open(baudrate=115200)
+    assert conn.alive
+    for _ in range(n_requests):
+        conn.io.send_bytes(b"PING\n")
+        time.sleep(interval)
+        conn.io.receive_chunks()
+    snapshot, = conn.latency.snapshot()
+    conn.close()
+    return snapshot
+
+
+def measure_overhead(config: LatencyConfig, n_chunks: int, waiting: bool) -> float:
+    # Cost of on_received per chunk for the reader thread, idle or while a request waits for a pattern
+    tracker = config.create_tracker()
+    if waiting:
+        tracker.on_send_started(b"PING\n", 0)
+        tracker.on_sent(1)
+    chunk = b"x" * 64
+    t_start = time.perf_counter()
+    for i in range(n_chunks):
+        tracker.on_received(chunk, 2 + i)
+    return (time.perf_counter() - t_start) / n_chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency measured against a pty device that answers after a known delay")
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between requests")
+    args = parser.parse_args()
+
+    device = EchoDevice(args.delay_ms / 1000)
+    cases = [
+        ("first chunk", LatencyConfig.default()),
+        ("hex pattern", LatencyConfig.default().replace("response_kind", RESPONSE_HEX).replace("response_pattern", "4f4b")),
+    ]
+    print(f"device delay={args.delay_ms:.3f} ms requests={args.requests}")
+    for name, config in cases:
+        s = measure(device, config, args.requests, args.interval)
+        print(f"{name:<12s} replies={s.n_replies:>5,} unanswered={s.n_unanswered:>3,} "
+              f"min={s.min_ns / 1e6:.3f} p50={s.p50_ns / 1e6:.3f} p99={s.p99_ns / 1e6:.3f} max={s.max_ns / 1e6:.3f} ms")
+    device.close()
+
+    _, config = cases[1]
+    idle = measure_overhead(config, 100_000, waiting=False)
+    waiting = measure_overhead(config.replace("timeout_ms", 1e9), 100_000, waiting=True)
+    print(f"on_received idle={idle * 1e9:,.0f} ns/chunk waiting for a pattern={waiting * 1e9:,.0f} ns/chunk")
+
+
+if __name__ == '__main__':
+    main()
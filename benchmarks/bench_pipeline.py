@@ -0,0 +1,284 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QListView
+
+from serial_core import COMPortConnection
+from widget_logging_field import LogBuffer, LogViewWidget, HexStringBuilder, TextStringBuilder
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class TrafficSource:
+    # Writes chunks at a fixed rate from its own thread and remembers when each byte offset was sent
+    def __init__(self, transport: str, rate: int, chunk_size: int, duration: float, params: dict):
+        self.__rate = rate
+        self.__chunk_size = chunk_size
+        self.__duration = duration
+        self.__conn: COMPortConnection | None = None
+        self.__master_fd: int | None = None
+        self.__slave_fd: int | None = None
+
+        if transport == "loop":
+            self.__conn = COMPortConnection("loop://")
+        elif transport == "pty":
+            # The capture side opens the slave end like any other device; traffic is written to the master end
+            self.__master_fd, self.__slave_fd = os.openpty()
+            self.__conn = COMPortConnection(os.ttyname(self.__slave_fd))
+        else:
+            assert False, transport
+        self.__conn.open(**params)
+        assert self.__conn.alive, transport
+
+        self.__sent: list[tuple[int, int]] = []  # (stream offset after the chunk, perf_counter_ns)
+        self.__n_sent = 0
+        self.__thread = threading.Thread(target=self.__run, name="TrafficSource", daemon=True)
+
+    @property
+    def io(self):
+        return self.__conn.io
+
+    @property
+    def sent(self) -> list[tuple[int, int]]:
+        return self.__sent
+
+    @property
+    def n_sent(self) -> int:
+        return self.__n_sent
+
+    @property
+    def finished(self) -> bool:
+        return not self.__thread.is_alive()
+
+    def start(self):
+        self.__thread.start()
+
+    def close(self):
+        self.__thread.join()
+        self.__conn.close()
+        for fd in (self.__master_fd, self.__slave_fd):
+            if fd is not None:
+                os.close(fd)
+
+    def __write(self, data: bytes):
+        if self.__master_fd is not None:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.__master_fd, view):]
+        else:
+            self.__conn.io.send_bytes(data)
+
+    def __run(self):
+        payload = bytes(range(256)) * (self.__chunk_size // 256 + 1)
+        chunk = payload[:self.__chunk_size]
+        t_start = time.perf_counter()
+        for i in itertools.count():
+            now = time.perf_counter()
+            if now - t_start >= self.__duration:
+                break
+            if self.__rate:
+                # Paced by the schedule rather than by sleeping a fixed time, so slow writes do not lower the rate
+                delay = t_start + i * self.__chunk_size / self.__rate - now
+                if delay > 0:
+                    time.sleep(delay)
+            self.__write(chunk)
+            self.__n_sent += len(chunk)
+            self.__sent.append((self.__n_sent, time.perf_counter_ns()))
+
+
+class PipelineProbe:
+    # Drains the port like SerialReceiverViewWidget.update_log, renders each session with both string builders
+    # and feeds it to a LogViewWidget; a byte is delivered once the view has appended the session holding it
+    def __init__(self, source: TrafficSource):
+        self.__source = source
+        self.__buf = LogBuffer()
+        self.__logger = LogViewWidget()
+        self.__logger.resize(900, 600)
+        self.__logger.show()
+        self.__buf.session_completed.connect(self.__on_session_completed)
+        # The render scheduler hands over every pending session at once, so each insert delivers all of them
+        self.__logger.findChild(QListView).model().rowsInserted.connect(self.__on_rows_inserted)
+
+        self.__n_pushed = 0
+        self.__n_delivered = 0
+        self.__i_sent = 0
+        self.__latencies_ns: list[int] = []
+        self.__builder_ns = 0
+        self.__last_delivery_ns: int | None = None
+
+        self.__timer = QTimer()
+        self.__timer.setInterval(10)
+        self.__timer.timeout.connect(self.__poll)
+
+    @property
+    def n_delivered(self) -> int:
+        return self.__n_delivered
+
+    @property
+    def latencies_ns(self) -> list[int]:
+        return self.__latencies_ns
+
+    @property
+    def builder_ns(self) -> int:
+        return self.__builder_ns
+
+    @property
+    def last_delivery_ns(self) -> int | None:
+        return self.__last_delivery_ns
+
+    def start(self):
+        self.__timer.start()
+
+    def stop(self):
+        self.__timer.stop()
+        self.__logger.close()
+        self.__logger.deleteLater()
+
+    def __poll(self):
+        chunks = self.__source.io.receive_chunks()
+        if not chunks:
+            return
+        self.__buf.session_begin()
+        for _, values in chunks:
+            self.__buf.append(values)
+        self.__buf.session_end()
+
+    def __on_session_completed(self, buf):
+        t_start = time.perf_counter_ns()
+        HexStringBuilder(buf).to_string()
+        TextStringBuilder(buf).to_string()
+        self.__builder_ns += time.perf_counter_ns() - t_start
+        self.__n_pushed += len(buf)
+        self.__logger.update_by_session(buf)
+
+    def __on_rows_inserted(self, *_):
+        now = time.perf_counter_ns()
+        self.__n_delivered = self.__n_pushed
+        self.__last_delivery_ns = now
+        sent = self.__source.sent
+        while self.__i_sent < len(sent) and sent[self.__i_sent][0] <= self.__n_delivered:
+            self.__latencies_ns.append(now - sent[self.__i_sent][1])
+            self.__i_sent += 1
+
+
+def percentile(values: list[int], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_case(app: QApplication, transport: str, rate: int, chunk_size: int, duration: float,
+             drain_timeout: float, baudrate: int) -> dict:
+    source = TrafficSource(transport, rate, chunk_size, duration, dict(baudrate=baudrate))
+    probe = PipelineProbe(source)
+    probe.start()
+    t_start_ns = time.perf_counter_ns()
+    source.start()
+
+    drain_deadline = None
+    while True:
+        app.processEvents()
+        time.sleep(0.001)
+        if not source.finished:
+            continue
+        if drain_deadline is None:
+            drain_deadline = time.perf_counter() + drain_timeout
+        if probe.n_delivered >= source.n_sent or time.perf_counter() > drain_deadline:
+            break
+
+    probe.stop()
+    n_dropped = source.io.n_dropped
+    source.close()
+
+    # Sustained rate from the first write to the last byte shown
+    elapsed_sec = ((probe.last_delivery_ns or t_start_ns) - t_start_ns) / 1e9
+    latencies_ms = [latency / 1e6 for latency in probe.latencies_ns]
+    return {
+        "transport": transport,
+        "rate": rate,
+        "chunk_size": chunk_size,
+        "duration": duration,
+        "n_sent": source.n_sent,
+        "n_delivered": probe.n_delivered,
+        "n_dropped": n_dropped,
+        "n_lost": source.n_sent - probe.n_delivered,
+        "bytes_per_sec": probe.n_delivered / elapsed_sec if elapsed_sec > 0 else None,
+        "builder_ms": probe.builder_ns / 1e6,
+        "latency_ms": {
+            "p50": percentile(latencies_ms, 0.5),
+            "p90": percentile(latencies_ms, 0.9),
+            "p99": percentile(latencies_ms, 0.99),
+            "max": max(latencies_ms, default=None),
+        },
+    }
+
+
+def parse_int_list(text: str) -> list[int]:
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end receive and render pipeline throughput and latency")
+    parser.add_argument("--transport", choices=["loop", "pty"], default="loop")
+    parser.add_argument("--rates", type=parse_int_list, default=[11_520, 115_200, 0],
+                        help="comma separated bytes/s to offer; 0 writes as fast as possible")
+    parser.add_argument("--chunk-sizes", type=parse_int_list, default=[16, 1024],
+                        help="comma separated bytes per write")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of traffic per case")
+    parser.add_argument("--drain-timeout", type=float, default=5.0,
+                        help="seconds to wait for the pipeline to catch up after the traffic stops")
+    parser.add_argument("--baudrate", type=int, default=115_200)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/pipeline_<time>.json)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+
+    cases = []
+    for rate, chunk_size in itertools.product(args.rates, args.chunk_sizes):
+        result = run_case(app, args.transport, rate, chunk_size, args.duration, args.drain_timeout, args.baudrate)
+        cases.append(result)
+        latency = result["latency_ms"]
+        print(
+            f"rate={rate or 'max':>8} chunk={chunk_size:>6,}"
+            f" {result['bytes_per_sec'] or 0:>14,.0f} B/s"
+            f" dropped={result['n_dropped']:,} lost={result['n_lost']:,}"
+            f" p50={latency['p50'] or 0:.1f}ms p99={latency['p99'] or 0:.1f}ms"
+        )
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "transport": args.transport,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "cases": cases,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime("pipeline_%Y%m%d_%H%M%S.json"))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"peak RSS: {report['peak_rss_bytes'] / (1 << 20):,.1f} MB")
+    print(f"saved: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QMutex
+
+from serial_core import COMPortStat
+
+
+@dataclass
+class LegacyCOMPortStat:
+    # COMPortStat before the lock-free counters
+    mutex: QMutex
+    received_at: datetime | None = None
+    total_n_received: int = 0
+
+    def __enter__(self):
+        self.mutex.lock()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.mutex.unlock()
+        return False
+
+
+def legacy_update(stat: LegacyCOMPortStat, n: int):
+    with stat as s:
+        s.received_at = datetime.now()
+        s.total_n_received += n
+
+
+def update(stat: COMPortStat, n: int):
+    stat.on_received(n, time.perf_counter_ns())
+
+
+def measure(func, stat, n_calls: int) -> float:
+    t_start = time.perf_counter()
+    for _ in range(n_calls):
+        func(stat, 64)
+    return time.perf_counter() - t_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cost of one statistics update on the receive path")
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    before = measure(legacy_update, LegacyCOMPortStat(QMutex()), args.calls)
+    after = measure(update, COMPortStat(), args.calls)
+    print(f"calls={args.calls:,}")
+    print(f"update  before: {before / args.calls * 1e9:>7.0f} ns  after: {after / args.calls * 1e9:>7.0f} ns")
+
+    stat = COMPortStat()
+    t_start = time.perf_counter()
+    version = None
+    for _ in range(args.calls):
+        if stat.version != version:
+            version = stat.version
+    elapsed = time.perf_counter() - t_start
+    print(f"unchanged check: {elapsed / args.calls * 1e9:>7.0f} ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_search import CaptureSearch, SearchPattern, SEARCH_HEX, SEARCH_ASCII, SEARCH_REGEX
+from capture_store import CaptureStore, SessionBuffer
+from formatting import HexStringBuilder
+
+
+def make_store(n_bytes: int, chunk: int, frame_every: int, seed: int = 0) -> CaptureStore:
+    # Text lines with a binary frame about every frame_every lines, split into sessions of chunk bytes
+    rnd = random.Random(seed)
+    lines = [f"$GPGGA,{i:06d},{rnd.randint(0, 9999):04d}.{rnd.randint(0, 99):02d},N*{i % 256:02X}\r\n".encode()
+             for i in range(1000)]
+    frame = bytes(range(0x80, 0xa0))
+    parts = []
+    size = 0
+    while size < n_bytes:
+        part = frame if rnd.randrange(frame_every) == 0 else rnd.choice(lines)
+        parts.append(part)
+        size += len(part)
+    data = b"".join(parts)
+
+    store = CaptureStore(block_size=HexStringBuilder.BLOCK_SIZE)
+    for i in range(0, len(data), chunk):
+        buf = SessionBuffer()
+        buf.append_bytes(data[i:i + chunk])
+        store.append(buf)
+    return store
+
+
+def measure(search: CaptureSearch, pattern: SearchPattern) -> tuple[float, int]:
+    t_start = time.perf_counter()
+    n_hits = len(search.search(pattern))
+    return time.perf_counter() - t_start, n_hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency over a capture, cold and repeated")
+    parser.add_argument("--megabytes", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=4096, help="bytes per session")
+    parser.add_argument("--frame-every", type=int, default=20_000, help="text lines per binary frame")
+    args = parser.parse_args()
+
+    store = make_store(args.megabytes << 20, args.chunk, args.frame_every)
+    patterns = [
+        ("hex (rare bytes)", SearchPattern(SEARCH_HEX, "9e9f")),
+        ("hex (frequent)", SearchPattern(SEARCH_HEX, "0d0a24")),
+        ("ascii", SearchPattern(SEARCH_ASCII, "000777")),
+        ("regex", SearchPattern(SEARCH_REGEX, r"N\*F[0-9A-F]")),
+    ]
+
+    print(f"capture={store.n_bytes / 1e6:,.1f} MB sessions={store.n_sessions:,}")
+    search = CaptureSearch(store)
+    for name, pattern in patterns:
+        cold, n_hits = measure(search, pattern)
+        repeated, _ = measure(search, pattern)
+        print(f"{name:<18s} hits={n_hits:>10,} cold={cold * 1e3:>9,.1f} ms repeated={repeated * 1e3:>7,.2f} ms")
+
+    # Patterns searched for the first time after the byte-presence masks exist
+    search.clear()
+    measure(search, patterns[0][1])
+    for name, pattern in [("hex (other rare)", SearchPattern(SEARCH_HEX, "8182")), patterns[2]]:
+        indexed, n_hits = measure(search, pattern)
+        print(f"{name:<18s} hits={n_hits:>10,} indexed={indexed * 1e3:>6,.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Started in a fresh interpreter like main.pyw; prints time.time_ns() once the main window has been shown
+# and the event loop has processed the resulting events
+WINDOW_SCRIPT = """
+import sys, time
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from window_main import MainWindow
+window = MainWindow()
+window.show()
+def visible():
+    print(time.time_ns(), flush=True)
+    app.quit()
+QTimer.singleShot(0, visible)
+app.exec()
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def measure_imports(module: str) -> dict[str, int]:
+    # Cumulative import time in microseconds of every module, as reported by -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def measure_window() -> float:
+    # Seconds from starting the interpreter to the main window being shown
+    t_start = time.time_ns()
+    result = subprocess.run(
+        [sys.executable, "-c", WINDOW_SCRIPT],
+        cwd=ROOT_DIR, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    t_visible = int(result.stdout.split()[-1])
+    return (t_visible - t_start) / 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to a visible main window")
+    parser.add_argument("--module", default="window_main", help="module whose import is broken down")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to show")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/startup_<time>.json)")
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.repeat)]
+    names = set().union(*runs)
+    imports_us = {name: statistics.median(run.get(name, 0) for run in runs) for name in names}
+    window_sec = [measure_window() for _ in range(args.repeat)]
+
+    print(f"import {args.module}: {imports_us.get(args.module, 0) / 1e3:,.1f} ms (median of {args.repeat})")
+    for name, us in sorted(imports_us.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1e3:>8,.1f} ms  {name}")
+    print(f"window visible: median {statistics.median(window_sec) * 1e3:,.0f} ms, max {max(window_sec) * 1e3:,.0f} ms")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "module": args.module,
+        "repeat": args.repeat,
+        "import_ms": {name: us / 1e3 for name, us in sorted(imports_us.items(), key=lambda item: -item[1])},
+        "window_visible_ms": [sec * 1e3 for sec in window_sec],
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime("startup_%Y%m%d_%H%M%S.json"))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from triggers import TriggerConfig, TriggerRule, RULE_HEX, RULE_REGEX, RULE_RATE, ACTION_HIGHLIGHT, \
+    ACTION_COUNT, ACTION_START
+
+
+def make_chunks(n_bytes: int, chunk: int, event_every: int, seed: int = 0) -> list[bytes]:
+    # Log lines with an ERROR line about every event_every lines
+    rnd = random.Random(seed)
+    lines = []
+    size = 0
+    while size < n_bytes:
+        if rnd.randrange(event_every) == 0:
+            line = f"ERROR code={rnd.randint(0, 99)}\r\n".encode()
+        else:
+            line = f"INFO t={size} v={rnd.randint(0, 9999)}\r\n".encode()
+        lines.append(line)
+        size += len(line)
+    data = b"".join(lines)
+    return [data[i:i + chunk] for i in range(0, len(data), chunk)]
+
+
+def measure(config: TriggerConfig, chunks: list[bytes]) -> tuple[float, int]:
+    pipeline = config.create_pipeline()
+    n_delivered = 0
+    t_start = time.perf_counter()
+    for i, chunk in enumerate(chunks):
+        for _, piece, offset in pipeline.process(chunk, i * 1_000_000):
+            pipeline.on_delivered(offset, len(piece), n_delivered)
+            n_delivered += len(piece)
+    return time.perf_counter() - t_start, n_delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigger pipeline throughput and the share of bytes it delivers")
+    parser.add_argument("--megabytes", type=int, default=50)
+    parser.add_argument("--chunk", type=int, default=256, help="bytes per read, as seen by the reader thread")
+    parser.add_argument("--event-every", type=int, default=100_000, help="lines per ERROR line")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.megabytes << 20, args.chunk, args.event_every)
+    n_bytes = sum(map(len, chunks))
+    cases = [
+        ("hex count", (TriggerRule(RULE_HEX, "4552524f52", ACTION_COUNT),)),
+        ("hex highlight", (TriggerRule(RULE_HEX, "4552524f52", ACTION_HIGHLIGHT),)),
+        ("regex line count", (TriggerRule(RULE_REGEX, "^ERROR", ACTION_COUNT),)),
+        ("rate count", (TriggerRule(RULE_RATE, "1000000", ACTION_COUNT),)),
+        ("hex start", (TriggerRule(RULE_HEX, "4552524f52", ACTION_START),)),
+        ("regex line start", (TriggerRule(RULE_REGEX, "^ERROR", ACTION_START),)),
+    ]
+
+    print(f"received={n_bytes / 1e6:,.1f} MB chunk={args.chunk} bytes")
+    for name, rules in cases:
+        elapsed, n_delivered = measure(TriggerConfig.default().replace("rules", rules), chunks)
+        print(f"{name:<17s} {n_bytes / elapsed / 1e6:>8.1f} MB/s delivered={n_delivered / n_bytes:>8.3%}")
+
+
+if __name__ == '__main__':
+    main()
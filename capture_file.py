@@ -0,0 +1,323 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+# Capture file: a file header followed by append-only records.
+#   file header : magic, wall clock (time.time_ns) and perf_counter_ns taken at the same moment
+#   record      : header (timestamp_ns, length, port id, kind, direction) + payload
+# Timestamps are perf_counter_ns values; the file header anchors them to wall clock time.
+# A PORT record declares the name of the next port id; DATA records carry received or sent bytes.
+#
+# Sidecar index (<capture>.idx): a magic followed by (timestamp_ns, record offset) pairs in time order.
+# Every PORT record and a DATA record at least every INDEX_INTERVAL bytes is indexed, so the port table
+# can be rebuilt and a time can be located without reading the whole capture.
+
+CAPTURE_MAGIC = b"SACAP\x00\x01\x00"
+INDEX_MAGIC = b"SAIDX\x00\x01\x00"
+FILE_HEADER = struct.Struct("<8sQQ")
+RECORD_HEADER = struct.Struct("<QIHBB")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+KIND_DATA = 0
+KIND_PORT = 1
+
+DIRECTION_RX = 0
+DIRECTION_TX = 1
+
+INDEX_INTERVAL = 64 * 1024
+
+CAPTURE_FILE_SUFFIX = ".sacap"
+
+
+class CaptureFormatError(ValueError):
+    pass
+
+
+def index_path_of(path: str) -> str:
+    return path + ".idx"
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    offset: int
+    timestamp_ns: int
+    direction: int
+    port: str
+    data: bytes
+
+
+class CaptureWriter:
+    # Shared by the reader threads and the sender, so every write holds the lock
+    def __init__(self, path: str):
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__file = open(path, "wb")
+        self.__index_file = open(index_path_of(path), "wb")
+        self.__port_ids: dict[str, int] = {}
+        self.__last_indexed = None
+        self.__last_timestamp_ns = 0
+
+        self.__file.write(FILE_HEADER.pack(CAPTURE_MAGIC, time.time_ns(), time.perf_counter_ns()))
+        self.__index_file.write(INDEX_MAGIC)
+        self.__offset = FILE_HEADER.size
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        return self.__offset
+
+    def __write_record(self, timestamp_ns: int, port_id: int, kind: int, direction: int, payload, index: bool):
+        if index:
+            self.__index_file.write(INDEX_ENTRY.pack(timestamp_ns, self.__offset))
+            self.__last_indexed = self.__offset
+        self.__file.write(RECORD_HEADER.pack(timestamp_ns, len(payload), port_id, kind, direction))
+        self.__file.write(payload)
+        self.__offset += RECORD_HEADER.size + len(payload)
+
+    def write(self, direction: int, port: str, data: bytes, timestamp_ns: int | None = None):
+        with self.__lock:
+            if self.__file is None:
+                return
+            # Callers take their timestamps before the lock, so a thread can lose the race to one with a
+            # later timestamp; clamping keeps the records in time order for seek_time's bisect
+            if timestamp_ns is None:
+                timestamp_ns = time.perf_counter_ns()
+            timestamp_ns = max(timestamp_ns, self.__last_timestamp_ns)
+            self.__last_timestamp_ns = timestamp_ns
+            port_id = self.__port_ids.get(port)
+            if port_id is None:
+                port_id = self.__port_ids[port] = len(self.__port_ids)
+                self.__write_record(timestamp_ns, port_id, KIND_PORT, 0, port.encode("utf-8"), index=True)
+            index = self.__last_indexed is None or self.__offset - self.__last_indexed >= INDEX_INTERVAL
+            self.__write_record(timestamp_ns, port_id, KIND_DATA, direction, data, index=index)
+
+    def flush(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+                self.__index_file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__index_file.close()
+                self.__file = None
+                self.__index_file = None
+
+
+class RotatingCaptureWriter:
+    # CaptureWriter that moves on to a new file once the current one is max_bytes long or max_seconds old,
+    # deleting the oldest files beyond keep so that a capture running for days uses bounded disk space.
+    # Files are named <stem>_<start time><suffix> after the given path.
+    def __init__(self, path: str, max_bytes: int | None = None, max_seconds: float | None = None,
+                 keep: int | None = None):
+        self.__stem, self.__suffix = os.path.splitext(path)
+        self.__suffix = self.__suffix or CAPTURE_FILE_SUFFIX
+        self.__max_bytes = max_bytes
+        self.__max_seconds = max_seconds
+        self.__keep = keep
+        self.__lock = threading.Lock()
+        self.__paths: list[str] = []
+        self.__n_opened = 0
+        self.__writer: CaptureWriter | None = None
+        self.__opened_at = 0.0
+        self.__open_next()
+
+    @property
+    def path(self) -> str:
+        return self.__paths[-1]
+
+    @property
+    def paths(self) -> list[str]:
+        return list(self.__paths)
+
+    def __open_next(self):
+        name = self.__stem + datetime.now().strftime("_%Y%m%d_%H%M%S")
+        path = name + self.__suffix
+        if os.path.exists(path) or self.__n_opened:
+            # Several files within a second are told apart, in order, by how many were opened before
+            path = f"{name}_{self.__n_opened}{self.__suffix}"
+        self.__n_opened += 1
+        self.__writer = CaptureWriter(path)
+        self.__opened_at = time.monotonic()
+        self.__paths.append(path)
+
+        while self.__keep is not None and len(self.__paths) > self.__keep:
+            old_path = self.__paths.pop(0)
+            for p in (old_path, index_path_of(old_path)):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+
+    def __should_rotate(self) -> bool:
+        if self.__max_bytes is not None and self.__writer.size >= self.__max_bytes:
+            return True
+        if self.__max_seconds is not None and time.monotonic() - self.__opened_at >= self.__max_seconds:
+            return True
+        return False
+
+    def write(self, direction: int, port: str, data: bytes, timestamp_ns: int | None = None):
+        with self.__lock:
+            if self.__writer is None:
+                return
+            if self.__should_rotate():
+                self.__writer.close()
+                self.__open_next()
+            # Each file declares its own ports, so every file can be read on its own
+            self.__writer.write(direction, port, data, timestamp_ns)
+
+    def flush(self):
+        with self.__lock:
+            if self.__writer is not None:
+                self.__writer.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__writer is not None:
+                self.__writer.close()
+                self.__writer = None
+
+
+class CaptureReader:
+    # Reads a capture through mmap; payloads are copied out, so no view pins the mapping after close()
+    def __init__(self, path: str):
+        self.__path = path
+        self.__file = open(path, "rb")
+        self.__mmap = None
+        self.__view = None
+        try:
+            if os.fstat(self.__file.fileno()).st_size < FILE_HEADER.size:
+                raise CaptureFormatError(f"{path}: not a capture file")
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__view = memoryview(self.__mmap)
+
+            magic, self.__epoch_ns, self.__origin_ns = FILE_HEADER.unpack_from(self.__view, 0)
+            if magic != CAPTURE_MAGIC:
+                raise CaptureFormatError(f"{path}: not a capture file")
+
+            self.__index_times, self.__index_offsets = self.__load_index()
+            self.__ports: list[str] = []
+            self.__load_ports()
+        except BaseException:
+            self.close()
+            raise
+
+    def __load_index(self) -> tuple[list[int], list[int]]:
+        times, offsets = [], []
+        try:
+            with open(index_path_of(self.__path), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        if data[:len(INDEX_MAGIC)] == INDEX_MAGIC:
+            body = memoryview(data)[len(INDEX_MAGIC):]
+            body = body[:len(body) - len(body) % INDEX_ENTRY.size]
+            for timestamp_ns, offset in INDEX_ENTRY.iter_unpack(body):
+                if offset + RECORD_HEADER.size > len(self.__view):
+                    break
+                times.append(timestamp_ns)
+                offsets.append(offset)
+        if not offsets:
+            # Missing or broken index: fall back to one scan of the capture
+            offset = FILE_HEADER.size
+            last_indexed = None
+            for offset, timestamp_ns, kind in self.__iter_headers(offset):
+                if kind == KIND_PORT or last_indexed is None or offset - last_indexed >= INDEX_INTERVAL:
+                    times.append(timestamp_ns)
+                    offsets.append(offset)
+                    last_indexed = offset
+        return times, offsets
+
+    def __iter_headers(self, offset: int):
+        end = len(self.__view)
+        while offset + RECORD_HEADER.size <= end:
+            timestamp_ns, length, port_id, kind, direction = RECORD_HEADER.unpack_from(self.__view, offset)
+            if offset + RECORD_HEADER.size + length > end:
+                return  # truncated tail of a capture that is still being written or was cut off
+            yield offset, timestamp_ns, kind
+            offset += RECORD_HEADER.size + length
+
+    def __load_ports(self):
+        # Every PORT record is indexed, and they are declared in id order
+        for offset in self.__index_offsets:
+            timestamp_ns, length, port_id, kind, direction = RECORD_HEADER.unpack_from(self.__view, offset)
+            if kind == KIND_PORT and port_id == len(self.__ports):
+                start = offset + RECORD_HEADER.size
+                self.__ports.append(bytes(self.__view[start:start + length]).decode("utf-8"))
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def ports(self) -> list[str]:
+        return list(self.__ports)
+
+    def to_datetime(self, timestamp_ns: int) -> datetime:
+        return datetime.fromtimestamp((self.__epoch_ns + timestamp_ns - self.__origin_ns) / 1e9)
+
+    def records(self, offset: int = FILE_HEADER.size):
+        view = self.__view
+        end = len(view)
+        while offset + RECORD_HEADER.size <= end:
+            timestamp_ns, length, port_id, kind, direction = RECORD_HEADER.unpack_from(view, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > end:
+                return
+            if kind == KIND_DATA:
+                port = self.__ports[port_id] if port_id < len(self.__ports) else str(port_id)
+                yield CaptureRecord(offset, timestamp_ns, direction, port, bytes(view[start:start + length]))
+            offset = start + length
+
+    def seek_time(self, timestamp_ns: int) -> int:
+        # Offset of the first record at or after timestamp_ns; start from the last index entry before it,
+        # since records sharing timestamp_ns may precede an index entry with that timestamp
+        i = bisect.bisect_left(self.__index_times, timestamp_ns) - 1
+        offset = self.__index_offsets[i] if i >= 0 else FILE_HEADER.size
+        for offset, record_ns, kind in self.__iter_headers(offset):
+            if record_ns >= timestamp_ns:
+                return offset
+        return len(self.__view)
+
+    @property
+    def time_range(self) -> tuple[int, int] | None:
+        first = last = None
+        for _, timestamp_ns, _ in self.__iter_headers(FILE_HEADER.size):
+            first = timestamp_ns
+            break
+        start = self.__index_offsets[-1] if self.__index_offsets else FILE_HEADER.size
+        for _, timestamp_ns, _ in self.__iter_headers(start):
+            last = timestamp_ns
+        if first is None:
+            return None
+        return first, last
+
+    def close(self):
+        try:
+            if self.__view is not None:
+                self.__view.release()
+                self.__view = None
+        finally:
+            try:
+                if self.__mmap is not None:
+                    self.__mmap.close()
+                    self.__mmap = None
+            finally:
+                self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
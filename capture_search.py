@@ -0,0 +1,231 @@
+import bisect
+import re
+from array import array
+from dataclasses import dataclass
+
+from capture_store import CaptureStore
+
+SEARCH_HEX = "hex"
+SEARCH_ASCII = "ascii"
+SEARCH_REGEX = "regex"
+
+
+class SearchPatternError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SearchPattern:
+    kind: str
+    text: str
+
+    def compile(self) -> "CompiledPattern":
+        if self.kind == SEARCH_HEX:
+            try:
+                literal = bytes.fromhex(self.text)
+            except ValueError:
+                raise SearchPatternError("16進数で入力してください")
+        elif self.kind == SEARCH_ASCII:
+            try:
+                literal = self.text.encode("ascii")
+            except UnicodeEncodeError:
+                raise SearchPatternError("ASCII文字で入力してください")
+        elif self.kind == SEARCH_REGEX:
+            try:
+                return CompiledPattern(None, re.compile(self.text.encode("utf-8")))
+            except re.error as e:
+                raise SearchPatternError(f"正規表現が正しくありません：{e}")
+        else:
+            assert False, self.kind
+        if not literal:
+            raise SearchPatternError("検索するバイト列を入力してください")
+        return CompiledPattern(literal, None)
+
+
+class CompiledPattern:
+    # A regex match may be at most MAX_REGEX_SPAN bytes long to be found across chunk boundaries
+    MAX_REGEX_SPAN = 4096
+
+    def __init__(self, literal: bytes | None, regex: re.Pattern | None):
+        self.__literal = literal
+        self.__regex = regex
+        # Byte values every match contains, as a bit mask; only known for literals
+        self.required = 0
+        for value in set(literal or b""):
+            self.required |= 1 << value
+
+    @property
+    def span(self) -> int:
+        return len(self.__literal) if self.__literal is not None else self.MAX_REGEX_SPAN
+
+    def finditer(self, data: bytes, stop: int):
+        # (start, end) of the non-overlapping matches in data that start before stop
+        if self.__literal is not None:
+            i = data.find(self.__literal)
+            while 0 <= i < stop:
+                yield i, i + len(self.__literal)
+                i = data.find(self.__literal, i + len(self.__literal))
+        else:
+            for match in self.__regex.finditer(data):
+                if match.start() >= stop:
+                    break
+                if match.end() > match.start():
+                    yield match.start(), match.end()
+
+
+def _presence_mask(data: bytes) -> int:
+    # Values seen near the start are deleted in one pass, which leaves few bytes to look at one by one
+    seen = set(data[:1024])
+    rest = data.translate(None, bytes(seen))
+    while rest:
+        seen.add(rest[0])
+        rest = rest.translate(None, rest[:1])
+    mask = 0
+    for value in seen:
+        mask |= 1 << value
+    return mask
+
+
+class _Matches:
+    # Matches of one pattern found so far; evicted ones stay at the front until they make up half of them
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self, first_byte: int):
+        self.starts = array("q")
+        self.ends = array("q")
+        self.head = 0
+        self.searched = first_byte  # stream offset the next match may start at
+
+    def evict(self, first_byte: int):
+        self.head = bisect.bisect_left(self.starts, first_byte, lo=self.head)
+        self.searched = max(self.searched, first_byte)
+        if self.head >= self.COMPACT_THRESHOLD and self.head * 2 >= len(self.starts):
+            del self.starts[:self.head]
+            del self.ends[:self.head]
+            self.head = 0
+
+
+class SearchHits:
+    # Matches of a search, oldest first, as (start, end) stream offsets
+    def __init__(self, matches: _Matches, tail: list[tuple[int, int]]):
+        self.__starts = matches.starts
+        self.__ends = matches.ends
+        self.__head = matches.head
+        self.__n_settled = len(matches.starts) - matches.head
+        self.__tail = tail
+
+    def __len__(self):
+        return self.__n_settled + len(self.__tail)
+
+    def __getitem__(self, i: int) -> tuple[int, int]:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if i >= self.__n_settled:
+            return self.__tail[i - self.__n_settled]
+        return self.__starts[self.__head + i], self.__ends[self.__head + i]
+
+    def index_after(self, offset: int) -> int:
+        # Index of the first match starting after offset, len(self) if none
+        i = bisect.bisect_right(self.__starts, offset, lo=self.__head, hi=self.__head + self.__n_settled)
+        if i < self.__head + self.__n_settled:
+            return i - self.__head
+        return self.__n_settled + bisect.bisect_right([start for start, _ in self.__tail], offset)
+
+    def index_at(self, offset: int) -> int:
+        # Index of the first match starting at or after offset, len(self) if none
+        return self.index_after(offset - 1)
+
+
+class CaptureSearch:
+    # Searches the bytes of a CaptureStore by stream offset.
+    # The stream is cut into BLOCK_SIZE blocks; a completed block gets a byte-presence mask the first time
+    # a search reaches it, and a literal can skip every block pair that lacks one of its byte values.
+    # Matches are kept per pattern together with how far the stream has been searched, so searching again
+    # only scans what arrived since. Masks and matches that fall behind the evicted head are dropped.
+    BLOCK_SIZE = 64 * 1024
+    SCAN_SIZE = 1024 * 1024
+    MAX_CACHED_PATTERNS = 16
+
+    def __init__(self, store: CaptureStore):
+        self.__store = store
+        self.__masks: dict[int, int] = {}  # block number -> byte-presence mask
+        self.__matches: dict[SearchPattern, _Matches] = {}
+
+    def clear(self):
+        self.__masks.clear()
+        self.__matches.clear()
+
+    def __block_mask(self, block: int) -> int | None:
+        mask = self.__masks.get(block)
+        if mask is None:
+            start = block * self.BLOCK_SIZE
+            stop = start + self.BLOCK_SIZE
+            if start < self.__store.first_byte or stop > self.__store.end_byte:
+                # Partly evicted or still being filled; scanned without a filter
+                return None
+            mask = self.__masks[block] = _presence_mask(self.__store.read(start, stop))
+        return mask
+
+    def __may_match(self, pattern: CompiledPattern, block: int) -> bool:
+        # A match starting in this block ends in it or in the next one
+        if not pattern.required or pattern.span > self.BLOCK_SIZE:
+            return True
+        mask = self.__block_mask(block)
+        if mask is None:
+            return True
+        if (block + 1) * self.BLOCK_SIZE < self.__store.end_byte:
+            next_mask = self.__block_mask(block + 1)
+            if next_mask is None:
+                return True
+            mask |= next_mask
+        return pattern.required & mask == pattern.required
+
+    def __scan(self, pattern: CompiledPattern, start: int, stop: int, after: int):
+        # (start, end) of the matches starting in [start, stop), reading up to span - 1 bytes past stop.
+        # The next match is looked for after the end of the previous one, the first one at or after after.
+        end_byte = self.__store.end_byte
+        start = max(start, after)
+        while start < stop:
+            block = start // self.BLOCK_SIZE
+            block_stop = min(stop, (block + 1) * self.BLOCK_SIZE)
+            if not self.__may_match(pattern, block):
+                start = block_stop
+                continue
+            # Read the longest run of blocks that may match, up to SCAN_SIZE
+            run_stop = block_stop
+            while run_stop < stop and run_stop - start < self.SCAN_SIZE and self.__may_match(pattern, block + 1):
+                block += 1
+                run_stop = min(stop, (block + 1) * self.BLOCK_SIZE)
+            data = self.__store.read(start, min(end_byte, run_stop + pattern.span - 1))
+            match_end = start
+            for i, j in pattern.finditer(data, run_stop - start):
+                yield start + i, start + j
+                match_end = start + j
+            start = max(run_stop, match_end)
+
+    def search(self, pattern: SearchPattern) -> SearchHits:
+        # Every match in the retained bytes
+        compiled = pattern.compile()
+        first_byte, end_byte = self.__store.first_byte, self.__store.end_byte
+
+        for block in [block for block in self.__masks if block * self.BLOCK_SIZE < first_byte]:
+            del self.__masks[block]
+
+        matches = self.__matches.pop(pattern, None) or _Matches(first_byte)
+        matches.evict(first_byte)
+        self.__matches[pattern] = matches
+        while len(self.__matches) > self.MAX_CACHED_PATTERNS:
+            del self.__matches[next(iter(self.__matches))]
+
+        # A match starting near the end may still grow; those are found again by the next search
+        settled = max(matches.searched, end_byte - compiled.span + 1)
+        after = matches.ends[-1] if len(matches.starts) > matches.head else first_byte
+        for start, end in self.__scan(compiled, matches.searched, settled, after):
+            matches.starts.append(start)
+            matches.ends.append(end)
+            after = end
+        matches.searched = settled
+
+        return SearchHits(matches, list(self.__scan(compiled, settled, end_byte, after)))
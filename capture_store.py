@@ -0,0 +1,276 @@
+import bisect
+from array import array
+from datetime import datetime, time
+
+
+class SessionBuffer:
+    def __init__(self, timestamp: time | None = None, source: str | None = None, highlighted: bool = False):
+        self.__timestamp = datetime.now().time() if timestamp is None else timestamp
+        self.__source = source  # name of the port the bytes came from
+        self.__highlighted = highlighted  # holds bytes a trigger rule marked
+        self.__values = bytearray()
+
+    def append_bytes(self, values: bytes | bytearray | memoryview):
+        # A bytearray cannot be resized while a view is exported, so append before reading values
+        self.__values += values
+
+    @property
+    def values(self) -> memoryview:
+        return memoryview(self.__values)
+
+    def count(self, sub: bytes) -> int:
+        # Searched in place; a memoryview has no count or find, and tobytes() would copy the session
+        return self.__values.count(sub)
+
+    def find(self, sub: bytes, start: int = 0) -> int:
+        return self.__values.find(sub, start)
+
+    @property
+    def timestamp(self):
+        return self.__timestamp
+
+    @property
+    def source(self) -> str | None:
+        return self.__source
+
+    @property
+    def highlighted(self) -> bool:
+        return self.__highlighted
+
+    def __len__(self):
+        return len(self.__values)
+
+
+class CaptureStore:
+    # Keeps the raw sessions of a log and indexes them by hex row and by text line,
+    # so that a view can render any single row without touching the rest of the capture.
+    # Offsets are stream offsets counted from the last clear and stay valid across eviction;
+    # rows and lines are counted from the oldest retained one.
+    NEW_LINE = b"\n"
+
+    # Evicted entries stay at the front of the index arrays until they make up half of them,
+    # which keeps eviction O(1) amortized
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self, block_size: int, max_lines: int | None = None, max_bytes: int | None = None):
+        self.__block_size = block_size
+        self.__max_lines = max_lines
+        self.__max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self.__sessions: list[SessionBuffer | None] = []
+        self.__byte_starts = array("q")  # stream offset of each session
+        self.__hex_row_starts = array("q")  # first hex row of each session
+        self.__line_starts = array("q")  # stream offset of each text line
+        self.__highlight_starts = array("q")  # stream offsets of the highlighted sessions
+        self.__highlight_ends = array("q")
+        self.__head = 0  # first retained session
+        self.__line_head = 0  # first retained text line
+        self.__n_compacted_lines = 0
+        self.__first_byte = 0
+        self.__end_byte = 0
+        self.__end_hex_row = 0
+
+    def set_limit(self, max_lines: int | None, max_bytes: int | None):
+        self.__max_lines = max_lines
+        self.__max_bytes = max_bytes
+
+    @property
+    def max_lines(self) -> int | None:
+        return self.__max_lines
+
+    @property
+    def max_bytes(self) -> int | None:
+        return self.__max_bytes
+
+    @property
+    def sessions(self) -> list[SessionBuffer]:
+        return self.__sessions[self.__head:]
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.__sessions) - self.__head
+
+    @property
+    def first_byte(self) -> int:
+        return self.__first_byte
+
+    @property
+    def end_byte(self) -> int:
+        return self.__end_byte
+
+    @property
+    def n_bytes(self) -> int:
+        return self.__end_byte - self.__first_byte
+
+    @property
+    def n_hex_rows(self) -> int:
+        if not self.n_sessions:
+            return 0
+        return self.__end_hex_row - self.__hex_row_starts[self.__head]
+
+    @property
+    def n_text_lines(self) -> int:
+        return len(self.__line_starts) - self.__line_head
+
+    @property
+    def first_hex_row(self) -> int:
+        # Number of hex rows evicted since the last clear
+        if not self.n_sessions:
+            return self.__end_hex_row
+        return self.__hex_row_starts[self.__head]
+
+    @property
+    def first_text_line(self) -> int:
+        # Number of text lines evicted since the last clear
+        return self.__n_compacted_lines + self.__line_head
+
+    def n_hex_rows_of(self, *bufs: SessionBuffer) -> int:
+        return sum((len(buf) + self.__block_size - 1) // self.__block_size for buf in bufs)
+
+    def n_text_lines_of(self, *bufs: SessionBuffer) -> int:
+        if not any(len(buf) for buf in bufs):
+            return 0
+        n_new_lines = sum(buf.count(self.NEW_LINE) for buf in bufs)
+        return n_new_lines + (0 if self.n_sessions else 1)
+
+    def append(self, buf: SessionBuffer):
+        if not len(buf):
+            return
+        base = self.__end_byte
+
+        if not self.n_sessions:
+            self.__line_starts.append(base)
+        i = buf.find(self.NEW_LINE)
+        while i >= 0:
+            self.__line_starts.append(base + i + 1)
+            i = buf.find(self.NEW_LINE, i + 1)
+
+        self.__sessions.append(buf)
+        self.__byte_starts.append(base)
+        self.__hex_row_starts.append(self.__end_hex_row)
+        self.__end_hex_row += self.n_hex_rows_of(buf)
+        self.__end_byte += len(buf)
+        if buf.highlighted:
+            self.__highlight_starts.append(base)
+            self.__highlight_ends.append(self.__end_byte)
+
+    def __line_head_at(self, first_byte: int) -> int:
+        return bisect.bisect_right(self.__line_starts, first_byte, lo=self.__line_head) - 1
+
+    def __exceeds_limit(self, head: int) -> bool:
+        first_byte = self.__byte_starts[head]
+        if self.__max_bytes is not None and self.__end_byte - first_byte > self.__max_bytes:
+            return True
+        if self.__max_lines is not None:
+            if self.__end_hex_row - self.__hex_row_starts[head] > self.__max_lines:
+                return True
+            if len(self.__line_starts) - self.__line_head_at(first_byte) > self.__max_lines:
+                return True
+        return False
+
+    def n_evictable(self) -> int:
+        # Number of oldest sessions to drop for the limits to hold; the newest session is always kept
+        n = 0
+        while n < self.n_sessions - 1 and self.__exceeds_limit(self.__head + n):
+            n += 1
+        return n
+
+    def n_hex_rows_evicted_by(self, n_sessions: int) -> int:
+        return self.__hex_row_starts[self.__head + n_sessions] - self.__hex_row_starts[self.__head]
+
+    def n_text_lines_evicted_by(self, n_sessions: int) -> int:
+        return self.__line_head_at(self.__byte_starts[self.__head + n_sessions]) - self.__line_head
+
+    def evict(self, n_sessions: int) -> list[SessionBuffer]:
+        assert 0 <= n_sessions < self.n_sessions, n_sessions
+        new_head = self.__head + n_sessions
+        evicted = self.__sessions[self.__head:new_head]
+        for i in range(self.__head, new_head):
+            self.__sessions[i] = None
+
+        self.__first_byte = self.__byte_starts[new_head]
+        self.__line_head = self.__line_head_at(self.__first_byte)
+        self.__head = new_head
+        self.__compact()
+        return evicted
+
+    def __compact(self):
+        head = self.__head
+        if head >= self.COMPACT_THRESHOLD and 2 * head >= len(self.__sessions):
+            del self.__sessions[:head]
+            del self.__byte_starts[:head]
+            del self.__hex_row_starts[:head]
+            self.__head = 0
+        line_head = self.__line_head
+        if line_head >= self.COMPACT_THRESHOLD and 2 * line_head >= len(self.__line_starts):
+            del self.__line_starts[:line_head]
+            self.__line_head = 0
+            self.__n_compacted_lines += line_head
+        n_highlights = bisect.bisect_right(self.__highlight_ends, self.__first_byte)
+        if n_highlights >= self.COMPACT_THRESHOLD and 2 * n_highlights >= len(self.__highlight_ends):
+            del self.__highlight_starts[:n_highlights]
+            del self.__highlight_ends[:n_highlights]
+
+    def __locate_hex_row(self, row: int) -> tuple[int, int]:
+        row += self.__hex_row_starts[self.__head]
+        i = bisect.bisect_right(self.__hex_row_starts, row, lo=self.__head) - 1
+        return i, row - self.__hex_row_starts[i]
+
+    def locate_hex_row(self, row: int) -> tuple[SessionBuffer, int]:
+        i, block = self.__locate_hex_row(row)
+        return self.__sessions[i], block
+
+    def hex_row_offset(self, row: int) -> int:
+        i, block = self.__locate_hex_row(row)
+        return self.__byte_starts[i] + block * self.__block_size
+
+    def hex_row_at(self, offset: int) -> int:
+        offset = min(max(offset, self.__first_byte), self.__end_byte - 1)
+        i = bisect.bisect_right(self.__byte_starts, offset, lo=self.__head) - 1
+        block = (offset - self.__byte_starts[i]) // self.__block_size
+        return self.__hex_row_starts[i] + block - self.__hex_row_starts[self.__head]
+
+    def text_line_offset(self, line: int) -> int:
+        return max(self.__line_starts[line + self.__line_head], self.__first_byte)
+
+    def text_line_at(self, offset: int) -> int:
+        i = bisect.bisect_right(self.__line_starts, offset, lo=self.__line_head) - 1
+        return max(0, i - self.__line_head)
+
+    def is_highlighted(self, start: int, stop: int) -> bool:
+        # Whether [start, stop) overlaps a highlighted session
+        i = bisect.bisect_left(self.__highlight_starts, stop) - 1
+        return i >= 0 and self.__highlight_ends[i] > start
+
+    def read(self, start: int, stop: int) -> bytes:
+        assert self.__first_byte <= start, start
+        parts = []
+        i = bisect.bisect_right(self.__byte_starts, start, lo=self.__head) - 1
+        while start < stop:
+            session_start = self.__byte_starts[i]
+            chunk = self.__sessions[i].values[start - session_start:stop - session_start]
+            parts.append(chunk)
+            start += len(chunk)
+            i += 1
+        return b"".join(parts)
+
+    def __text_line_end(self, line: int) -> int:
+        if line + 1 < len(self.__line_starts):
+            return self.__line_starts[line + 1] - len(self.NEW_LINE)
+        else:
+            return self.__end_byte
+
+    def text_line(self, line: int) -> bytes:
+        line += self.__line_head
+        # The oldest line may have lost its beginning to eviction
+        start = max(self.__line_starts[line], self.__first_byte)
+        return self.read(start, self.__text_line_end(line))
+
+    def text_lines(self, start: int, stop: int) -> list[bytes]:
+        if start >= stop:
+            return []
+        first = max(self.__line_starts[start + self.__line_head], self.__first_byte)
+        last = self.__text_line_end(stop - 1 + self.__line_head)
+        return self.read(first, last).split(self.NEW_LINE)
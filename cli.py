@@ -0,0 +1,176 @@
+import argparse
+import signal
+import sys
+import time
+
+from capture_file import RotatingCaptureWriter
+from capture_store import SessionBuffer
+from formatting import HexStringBuilder, TextStringBuilder
+from serial_core import COMPortConnection, COMPortIOError, list_device_names, perf_counter_ns_to_datetime
+from triggers import TriggerConfig, TriggerRule, RULE_HEX, RULE_REGEX, ACTION_START, ACTION_STOP
+
+# Captures serial ports without Qt: python cli.py /dev/ttyUSB0 --baudrate 115200 --output capture.sacap
+# Received bytes are written out as soon as they are drained and never kept, so memory stays bounded
+# by the receive queue of each port however long the capture runs.
+# For soak tests, --start/--stop keep only the bytes around the events of interest:
+#   python cli.py /dev/ttyUSB0 --start-regex "ERROR" --pre-trigger 4096 --post-trigger 4096 --output soak.sacap
+
+FORMATS = ("hex", "text", "raw", "none")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="GUIなしでシリアルポートを受信して標準出力やキャプチャファイルに書き出す")
+    parser.add_argument("ports", nargs="*", help="デバイス名またはpyserialのURL（loop://, socket://host:port など）")
+    parser.add_argument("--list", action="store_true", help="接続されているデバイスを表示して終了")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--format", choices=FORMATS, default="hex", help="標準出力の形式（none で出力しない）")
+    parser.add_argument("--output", help="受信と送信を記録するキャプチャファイル")
+    parser.add_argument("--rotate-bytes", type=int, help="キャプチャファイルをこのバイト数ごとに切り替える")
+    parser.add_argument("--rotate-seconds", type=float, help="キャプチャファイルをこの秒数ごとに切り替える")
+    parser.add_argument("--keep", type=int, help="残すキャプチャファイルの数（古い順に削除）")
+    parser.add_argument("--duration", type=float, help="この秒数で終了")
+    parser.add_argument("--interval", type=float, default=0.05, help="受信データを書き出す間隔（秒）")
+    parser.add_argument("--start", action="append", default=[], metavar="HEX",
+                        help="このバイト列を受信したら出力と記録を始める（複数指定可）")
+    parser.add_argument("--start-regex", action="append", default=[], metavar="REGEX",
+                        help="この正規表現に一致する行を受信したら出力と記録を始める（複数指定可）")
+    parser.add_argument("--stop", action="append", default=[], metavar="HEX",
+                        help="このバイト列を受信したら出力と記録を止める（複数指定可）")
+    parser.add_argument("--pre-trigger", type=int, default=TriggerConfig.default().pre_bytes,
+                        help="開始の前に残すバイト数")
+    parser.add_argument("--post-trigger", type=int, default=TriggerConfig.default().post_bytes,
+                        help="最後の開始の後に残すバイト数（0 で停止まで）")
+    return parser.parse_args(argv)
+
+
+def trigger_config(args) -> TriggerConfig | None:
+    rules = [TriggerRule(RULE_HEX, pattern, ACTION_START) for pattern in args.start]
+    rules += [TriggerRule(RULE_REGEX, pattern, ACTION_START) for pattern in args.start_regex]
+    rules += [TriggerRule(RULE_HEX, pattern, ACTION_STOP) for pattern in args.stop]
+    if not rules:
+        return None
+    return TriggerConfig(tuple(rules), args.pre_trigger, args.post_trigger)
+
+
+def format_session(buf: SessionBuffer, fmt: str, show_source: bool) -> bytes:
+    if fmt == "hex":
+        return HexStringBuilder(buf, show_source).to_string().encode("utf-8")
+    elif fmt == "text":
+        return TextStringBuilder(buf).to_string().encode("utf-8")
+    elif fmt == "raw":
+        return bytes(buf.values)
+    else:
+        assert False, fmt
+
+
+def close_connection(conn: COMPortConnection):
+    # Reports what was lost and closes; a failed reader still leaves the drop count to report
+    try:
+        n_dropped = conn.io.n_dropped if conn.alive else 0
+    except COMPortIOError:
+        n_dropped = 0
+    pipeline = conn.triggers
+    conn.close()
+    if n_dropped:
+        print(f"{conn.device_name}：{n_dropped:,} バイトを取りこぼしました", file=sys.stderr)
+    if pipeline is not None:
+        print(f"{conn.device_name}：トリガー {sum(pipeline.counts):,} 回、"
+              f"{pipeline.n_discarded:,} バイトを破棄しました", file=sys.stderr)
+
+
+def close_all(conns: list[COMPortConnection], recorder: RotatingCaptureWriter | None):
+    # Every connection and the recorder are closed even if closing one of them fails
+    if conns:
+        try:
+            close_connection(conns[0])
+        finally:
+            close_all(conns[1:], recorder)
+    elif recorder is not None:
+        recorder.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.list:
+        for name in list_device_names():
+            print(name)
+        return 0
+    if not args.ports:
+        print("ポートを指定してください", file=sys.stderr)
+        return 2
+    triggers = trigger_config(args)
+    if triggers is not None:
+        for rule in triggers.rules:
+            try:
+                rule.create_matcher()
+            except ValueError as e:
+                print(f"パターンが正しくありません：{rule.pattern} {e}", file=sys.stderr)
+                return 2
+
+    stopped = False
+
+    def stop(signum, frame):
+        nonlocal stopped
+        stopped = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    recorder = None
+    if args.output:
+        recorder = RotatingCaptureWriter(
+            args.output,
+            max_bytes=args.rotate_bytes,
+            max_seconds=args.rotate_seconds,
+            keep=args.keep,
+        )
+
+    conns = []
+    for name in args.ports:
+        conn = COMPortConnection(name)
+        conn.set_recorder(recorder)
+        conn.set_triggers(triggers)
+        conn.open(baudrate=args.baudrate)
+        if not conn.alive:
+            print(f"ポートを開けません：{name}", file=sys.stderr)
+            close_all(conns, recorder)
+            return 1
+        conns.append(conn)
+
+    out = sys.stdout.buffer
+    show_source = len(conns) > 1
+    deadline = None if args.duration is None else time.monotonic() + args.duration
+    exit_code = 0
+    last_flushed = time.monotonic()
+    try:
+        while not stopped and (deadline is None or time.monotonic() < deadline):
+            time.sleep(args.interval)
+            for conn in conns:
+                try:
+                    chunks = conn.io.receive_chunks()
+                except COMPortIOError as e:
+                    print(f"データを受信できません：{conn.device_name} {type(e).__name__}", file=sys.stderr)
+                    stopped, exit_code = True, 1
+                    continue
+                if not chunks or args.format == "none":
+                    continue
+                buf = SessionBuffer(perf_counter_ns_to_datetime(chunks[0][0]).time(), conn.device_name)
+                for _, data in chunks:
+                    buf.append_bytes(data)
+                out.write(format_session(buf, args.format, show_source))
+            out.flush()
+
+            if recorder is not None and time.monotonic() - last_flushed >= 1.0:
+                recorder.flush()
+                last_flushed = time.monotonic()
+    except BrokenPipeError:
+        # The reading end of a pipe went away (e.g. | head)
+        pass
+    finally:
+        close_all(conns, recorder)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
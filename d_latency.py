@@ -0,0 +1,211 @@
+import os
+from datetime import datetime
+
+from PyQt5.QtCore import QSize, QTimer
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QComboBox, \
+    QPushButton, QSpinBox, QCheckBox, QLabel, QLineEdit, QHeaderView, QAbstractItemView, QFileDialog
+
+from latency import LatencyConfig, LatencySnapshot, write_latency_csv, RESPONSE_ANY, RESPONSE_HEX, RESPONSE_REGEX
+from status import g_get_status
+from utils import g_get_ports
+from widget_port_details import SparklineWidget
+
+RESPONSE_CHOICES = [
+    ("最初の受信", RESPONSE_ANY),
+    ("16進数", RESPONSE_HEX),
+    ("正規表現（行）", RESPONSE_REGEX),
+]
+
+MAX_COMMAND_BYTES = 16
+
+
+def format_command(command: bytes | None) -> str:
+    if command is None:
+        return "（その他）"
+    text = command[:MAX_COMMAND_BYTES].hex(" ")
+    return text + " …" if len(command) > MAX_COMMAND_BYTES else text
+
+
+def format_latency(value_ns: float | None) -> str:
+    return "-" if value_ns is None else f"{value_ns / 1e6:,.3f}"
+
+
+class LatencyDialog(QDialog):
+    # Left open next to the main window; the results are refreshed while it is shown
+    HEADERS = ["ポート", "コマンド", "送信", "応答", "無応答", "最小", "平均", "50%", "90%", "99%", "最大"]
+    COLUMN_COMMAND = 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.__rows: list[tuple[str, LatencySnapshot]] = []
+
+        self.setWindowTitle("応答時間")
+
+        self.__init_ui()
+
+        self.resize(QSize(820, 420))
+
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(500)
+        self.__timer.timeout.connect(self.update_results)
+        self.__timer.start()
+
+    def __init_ui(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        config = g_get_ports().latency_config or LatencyConfig.default()
+
+        layout_config = QHBoxLayout()
+        layout.addLayout(layout_config)
+
+        cb_enabled = QCheckBox(self)
+        cb_enabled.setText("測定する")
+        cb_enabled.setToolTip("送信したフレームごとに、送信を終えてから応答を受信するまでの時間を測る")
+        cb_enabled.setChecked(g_get_ports().latency_config is not None)
+        cb_enabled.toggled.connect(self.__apply)
+        layout_config.addWidget(cb_enabled)
+        self.__cb_enabled = cb_enabled
+
+        layout_config.addWidget(QLabel("応答", self))
+        l_kind = QComboBox(self)
+        for text, kind in RESPONSE_CHOICES:
+            l_kind.addItem(text, kind)
+        l_kind.setCurrentIndex(l_kind.findData(config.response_kind))
+        layout_config.addWidget(l_kind)
+        self.__l_kind = l_kind
+
+        e_pattern = QLineEdit(self)
+        e_pattern.setPlaceholderText("応答のパターン 例：4f4b, ^OK")
+        e_pattern.setText(config.response_pattern)
+        layout_config.addWidget(e_pattern)
+        self.__e_pattern = e_pattern
+
+        layout_config.addWidget(QLabel("タイムアウト", self))
+        sb_timeout = QSpinBox(self)
+        sb_timeout.setRange(1, 600_000)
+        sb_timeout.setSuffix(" ms")
+        sb_timeout.setValue(round(config.timeout_ms))
+        layout_config.addWidget(sb_timeout)
+        self.__sb_timeout = sb_timeout
+
+        b_apply = QPushButton(self)
+        b_apply.setText("適用")
+        b_apply.setToolTip("設定を変えて測定をやり直す")
+        b_apply.clicked.connect(self.__apply)
+        layout_config.addWidget(b_apply)
+
+        table = QTableWidget(0, len(self.HEADERS), self)
+        table.setHorizontalHeaderLabels(self.HEADERS)
+        table.horizontalHeader().setSectionResizeMode(self.COLUMN_COMMAND, QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setSelectionMode(QAbstractItemView.SingleSelection)
+        table.setToolTip("時間はミリ秒")
+        table.itemSelectionChanged.connect(self.__update_histogram)
+        layout.addWidget(table)
+        self.__table = table
+
+        w_histogram = SparklineWidget(self, bars=True)
+        w_histogram.setFixedHeight(48)
+        w_histogram.setToolTip("選んだコマンドの応答時間の分布（左から1µs未満, 1µs以上, 2µs以上, 4µs以上, ... の2倍刻み、右端は4.19秒以上すべて）")
+        layout.addWidget(w_histogram)
+        self.__w_histogram = w_histogram
+
+        layout_buttons = QHBoxLayout()
+        layout.addLayout(layout_buttons)
+
+        b_reset = QPushButton(self)
+        b_reset.setText("リセット")
+        b_reset.clicked.connect(self.__reset)
+        layout_buttons.addWidget(b_reset)
+
+        b_export = QPushButton(self)
+        b_export.setText("エクスポート…")
+        b_export.clicked.connect(self.export)
+        layout_buttons.addWidget(b_export)
+
+        layout_buttons.addStretch(1)
+
+        b_close = QPushButton(self)
+        b_close.setText("閉じる")
+        b_close.clicked.connect(self.close)
+        layout_buttons.addWidget(b_close)
+
+    def __apply(self):
+        if not self.__cb_enabled.isChecked():
+            g_get_ports().set_latency(None)
+            self.update_results()
+            return
+        config = LatencyConfig(
+            response_kind=self.__l_kind.currentData(),
+            response_pattern=self.__e_pattern.text().strip(),
+            timeout_ms=float(self.__sb_timeout.value()),
+        )
+        try:
+            config.create_matcher()
+        except ValueError as e:
+            g_get_status().error(f"応答のパターンが正しくありません：{e}")
+            return
+        g_get_ports().set_latency(config)
+        self.update_results()
+
+    def __reset(self):
+        g_get_ports().set_latency(g_get_ports().latency_config)
+        self.update_results()
+
+    def update_results(self):
+        if not self.isVisible():
+            return
+        rows = g_get_ports().latency_snapshots()
+        self.__rows = rows
+        table = self.__table
+        table.setRowCount(len(rows))
+        for i_row, (name, snapshot) in enumerate(rows):
+            values = [
+                name,
+                format_command(snapshot.command),
+                f"{snapshot.n_requests:,}",
+                f"{snapshot.n_replies:,}",
+                f"{snapshot.n_unanswered:,}",
+                format_latency(snapshot.min_ns),
+                format_latency(snapshot.mean_ns),
+                format_latency(snapshot.p50_ns),
+                format_latency(snapshot.p90_ns),
+                format_latency(snapshot.p99_ns),
+                format_latency(snapshot.max_ns),
+            ]
+            for i_column, value in enumerate(values):
+                item = table.item(i_row, i_column)
+                if item is None:
+                    table.setItem(i_row, i_column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+        self.__update_histogram()
+
+    def __update_histogram(self):
+        row = self.__table.currentRow()
+        if 0 <= row < len(self.__rows):
+            self.__w_histogram.set_values(self.__rows[row][1].histogram)
+        else:
+            self.__w_histogram.set_values(())
+
+    def export(self):
+        default_name = datetime.now().strftime("latency_%Y%m%d_%H%M%S.csv")
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "応答時間の保存先",
+            os.path.join(os.getcwd(), default_name),
+            "CSV (*.csv)",
+        )
+        if not path:
+            return
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                write_latency_csv(f, g_get_ports().latency_snapshots())
+        except OSError as e:
+            g_get_status().error(f"応答時間を保存できません：{e}")
+            return
+        g_get_status().info(f"応答時間を保存しました：{path}")
@@ -0,0 +1,155 @@
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QComboBox, \
+    QPushButton, QSpinBox, QFormLayout, QDialogButtonBox, QHeaderView
+
+from status import g_get_status
+from triggers import TriggerConfig, TriggerRule, RULE_HEX, RULE_REGEX, RULE_RATE, ACTION_HIGHLIGHT, \
+    ACTION_COUNT, ACTION_START, ACTION_STOP
+
+RULE_CHOICES = [
+    ("16進数", RULE_HEX),
+    ("正規表現（行）", RULE_REGEX),
+    ("受信レート [B/s]", RULE_RATE),
+]
+
+ACTION_CHOICES = [
+    ("強調表示", ACTION_HIGHLIGHT),
+    ("カウント", ACTION_COUNT),
+    ("記録開始", ACTION_START),
+    ("記録停止", ACTION_STOP),
+]
+
+
+def format_rule(rule: TriggerRule) -> str:
+    kind = dict((value, text) for text, value in RULE_CHOICES)[rule.kind]
+    action = dict((value, text) for text, value in ACTION_CHOICES)[rule.action]
+    return f"{kind} {rule.pattern}（{action}）"
+
+
+class TriggerDialog(QDialog):
+    COLUMN_KIND = 0
+    COLUMN_PATTERN = 1
+    COLUMN_ACTION = 2
+
+    MAX_RING_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, parent=None, config: TriggerConfig = None):
+        super().__init__(parent)
+
+        self.__config = TriggerConfig.default() if config is None else config
+
+        self.setWindowModality(Qt.ApplicationModal)
+        self.setWindowTitle("トリガー設定")
+
+        self.__init_ui()
+
+        for rule in self.__config.rules:
+            self.__add_row(rule)
+
+        self.resize(QSize(560, 360))
+
+    def __init_ui(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        table = QTableWidget(0, 3, self)
+        table.setHorizontalHeaderLabels(["種類", "パターン", "動作"])
+        table.horizontalHeader().setSectionResizeMode(self.COLUMN_PATTERN, QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        layout.addWidget(table)
+        self.__table = table
+
+        layout_rows = QHBoxLayout()
+        layout.addLayout(layout_rows)
+
+        b_add = QPushButton(self)
+        b_add.setText("追加")
+        b_add.clicked.connect(lambda: self.__add_row(TriggerRule(RULE_HEX, "", ACTION_HIGHLIGHT)))
+        layout_rows.addWidget(b_add)
+
+        b_remove = QPushButton(self)
+        b_remove.setText("削除")
+        b_remove.clicked.connect(self.__remove_row)
+        layout_rows.addWidget(b_remove)
+
+        layout_rows.addStretch(1)
+
+        layout_ring = QFormLayout()
+        layout.addLayout(layout_ring)
+
+        sb_pre = QSpinBox(self)
+        sb_pre.setRange(0, self.MAX_RING_BYTES)
+        sb_pre.setSuffix(" バイト")
+        sb_pre.setValue(self.__config.pre_bytes)
+        sb_pre.setToolTip("記録開始のルールが一致する前に残すデータ量")
+        layout_ring.addRow("プリトリガー", sb_pre)
+        self.__sb_pre = sb_pre
+
+        sb_post = QSpinBox(self)
+        sb_post.setRange(0, self.MAX_RING_BYTES)
+        sb_post.setSuffix(" バイト")
+        sb_post.setSpecialValueText("記録停止のルールまで")
+        sb_post.setValue(self.__config.post_bytes)
+        sb_post.setToolTip("記録開始のルールが最後に一致した後に残すデータ量")
+        layout_ring.addRow("ポストトリガー", sb_post)
+        self.__sb_post = sb_post
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def __add_row(self, rule: TriggerRule):
+        row = self.__table.rowCount()
+        self.__table.insertRow(row)
+
+        l_kind = QComboBox(self.__table)
+        for text, kind in RULE_CHOICES:
+            l_kind.addItem(text, kind)
+        l_kind.setCurrentIndex(l_kind.findData(rule.kind))
+        self.__table.setCellWidget(row, self.COLUMN_KIND, l_kind)
+
+        self.__table.setItem(row, self.COLUMN_PATTERN, QTableWidgetItem(rule.pattern))
+
+        l_action = QComboBox(self.__table)
+        for text, action in ACTION_CHOICES:
+            l_action.addItem(text, action)
+        l_action.setCurrentIndex(l_action.findData(rule.action))
+        self.__table.setCellWidget(row, self.COLUMN_ACTION, l_action)
+
+    def __remove_row(self):
+        row = self.__table.currentRow()
+        if row >= 0:
+            self.__table.removeRow(row)
+
+    def __read_rules(self) -> list[TriggerRule] | None:
+        rules = []
+        for row in range(self.__table.rowCount()):
+            item = self.__table.item(row, self.COLUMN_PATTERN)
+            rule = TriggerRule(
+                kind=self.__table.cellWidget(row, self.COLUMN_KIND).currentData(),
+                pattern=item.text().strip() if item is not None else "",
+                action=self.__table.cellWidget(row, self.COLUMN_ACTION).currentData(),
+            )
+            try:
+                rule.create_matcher()
+            except ValueError as e:
+                g_get_status().error(f"{row + 1}行目のパターンが正しくありません：{e}")
+                return None
+            rules.append(rule)
+        return rules
+
+    def accept(self):
+        rules = self.__read_rules()
+        if rules is None:
+            return
+        self.__config = TriggerConfig(
+            rules=tuple(rules),
+            pre_bytes=self.__sb_pre.value(),
+            post_bytes=self.__sb_post.value(),
+        )
+        super().accept()
+
+    @property
+    def config(self) -> TriggerConfig:
+        return self.__config
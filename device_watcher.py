@@ -0,0 +1,158 @@
+import collections
+import os
+import select
+import sys
+import threading
+from dataclasses import dataclass
+
+from profiling import span
+from serial_core import list_device_names
+
+DEVICE_ADDED = "added"
+DEVICE_REMOVED = "removed"
+
+
+@dataclass(frozen=True)
+class DeviceEvent:
+    kind: str
+    name: str
+
+
+class _Inotify:
+    # Minimal ctypes binding of the Linux inotify API for watching a directory
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    IN_ATTRIB = 0x00000004
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+
+    def __init__(self, path: str):
+        # Imported here so that ctypes loads on the watcher thread instead of during startup
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.__fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CREATE | self.IN_DELETE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_ATTRIB
+        if libc.inotify_add_watch(self.__fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.__fd)
+            raise OSError(errno, f"inotify_add_watch failed: {path}")
+
+    def wait(self, timeout: float) -> bool:
+        # True if anything changed; the events themselves are drained, a rescan tells what changed
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.__fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.__fd)
+
+
+class DeviceWatcher:
+    # Keeps the set of serial devices up to date on a worker thread and publishes add/remove events.
+    # On Linux it rescans only when /dev changes (inotify); elsewhere, or if inotify is unavailable,
+    # it polls list_device_names() off the GUI thread.
+    POLL_INTERVAL = 0.5
+    # udev creates the node before it sets permissions and symlinks, so let a burst of events settle
+    SETTLE_DELAY = 0.05
+    # Rescan now and then even with inotify in case an event was missed
+    RESCAN_INTERVAL = 5.0
+
+    def __init__(self, list_devices=list_device_names):
+        self.__list_devices = list_devices
+        self.__devices: frozenset[str] = frozenset()
+        self.__events: collections.deque[DeviceEvent] = collections.deque()
+        self.__listeners = []
+        self.__scanned = threading.Event()
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="DeviceWatcher", daemon=True)
+
+    @property
+    def devices(self) -> frozenset[str]:
+        return self.__devices
+
+    @property
+    def scanned(self) -> bool:
+        return self.__scanned.is_set()
+
+    def add_listener(self, listener):
+        # listener(events) is called on the watcher thread
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.__listeners.remove(listener)
+
+    def poll_events(self) -> list[DeviceEvent]:
+        events = []
+        while True:
+            try:
+                events.append(self.__events.popleft())
+            except IndexError:
+                return events
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __rescan(self):
+        try:
+            with span("device_scan"):
+                devices = frozenset(self.__list_devices())
+        except OSError as e:
+            print(e, file=sys.stderr)
+            return
+        previous, self.__devices = self.__devices, devices
+        events = [DeviceEvent(DEVICE_ADDED, name) for name in sorted(devices - previous)]
+        events += [DeviceEvent(DEVICE_REMOVED, name) for name in sorted(previous - devices)]
+        self.__scanned.set()
+        if not events:
+            return
+        self.__events.extend(events)
+        for listener in list(self.__listeners):
+            listener(events)
+
+    def __open_inotify(self) -> _Inotify | None:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return _Inotify("/dev")
+        except (OSError, AttributeError) as e:
+            print(f"DeviceWatcher: falling back to polling ({e})", file=sys.stderr)
+            return None
+
+    def __run(self):
+        inotify = self.__open_inotify()
+        try:
+            self.__rescan()
+            if inotify is None:
+                while not self.__stop_event.wait(self.POLL_INTERVAL):
+                    self.__rescan()
+            else:
+                while not self.__stop_event.is_set():
+                    # Wake up regularly to notice stop() and for the safety rescan
+                    waited = 0.0
+                    changed = False
+                    while not changed and waited < self.RESCAN_INTERVAL and not self.__stop_event.is_set():
+                        changed = inotify.wait(self.POLL_INTERVAL)
+                        waited += self.POLL_INTERVAL
+                    if changed and self.__stop_event.wait(self.SETTLE_DELAY):
+                        return
+                    self.__rescan()
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -0,0 +1,98 @@
+# Text rendering of captured bytes, shared by the GUI and the command line; nothing here may import Qt
+from abc import ABC, abstractmethod
+
+from capture_store import SessionBuffer
+
+
+# decode_ascii accepts 0x20..0x7d (0x00..0x7d with enable_spaces); every other byte is mapped to DEL
+_ASCII_ERROR = 0x7f
+_ASCII_TABLES = {
+    enable_spaces: bytes(
+        value if (enable_spaces or 0x20 <= value) and value <= 0x7d else _ASCII_ERROR
+        for value in range(256)
+    )
+    for enable_spaces in (False, True)
+}
+
+
+def _as_translatable(values: bytes | bytearray | memoryview | list[int]) -> bytes | bytearray:
+    if isinstance(values, (bytes, bytearray)):
+        return values
+    try:
+        return bytes(values)
+    except ValueError:
+        # Integers that do not fit in a byte are decode errors as well
+        return bytes(value if 0 <= value <= 0xff else _ASCII_ERROR for value in values)
+
+
+def decode_ascii(values: bytes | bytearray | memoryview | list[int], replace_error=None, enable_spaces=False):
+    mapped = _as_translatable(values).translate(_ASCII_TABLES[bool(enable_spaces)])
+    if replace_error is None:
+        i = mapped.find(_ASCII_ERROR)
+        if i >= 0:
+            raise ValueError(f"byte at offset {i} is not printable ASCII")
+        return mapped.decode("ascii")
+    return mapped.decode("ascii").replace(chr(_ASCII_ERROR), replace_error)
+
+
+class SessionBufferStringBuilder(ABC):
+    def __init__(self, session_buffer: SessionBuffer):
+        self.__session_buffer = session_buffer
+
+    @property
+    def _buf(self):
+        return self.__session_buffer
+
+    @abstractmethod
+    def to_string(self):
+        raise NotImplementedError()
+
+
+class HexStringBuilder(SessionBufferStringBuilder):
+    HEADER_LENGTH = 15
+    SOURCE_LENGTH = 12
+    BLOCK_SIZE = 16
+
+    def __init__(self, session_buffer: SessionBuffer, show_source: bool = False):
+        super().__init__(session_buffer)
+        self.__show_source = show_source
+
+    def to_lines(self, start: int = 0, stop: int | None = None) -> list[str]:
+        values = self._buf.values
+        n_blocks = (len(values) + self.BLOCK_SIZE - 1) // self.BLOCK_SIZE
+        stop = n_blocks if stop is None else min(stop, n_blocks)
+        if start >= stop:
+            return []
+
+        values = values[start * self.BLOCK_SIZE:stop * self.BLOCK_SIZE]
+        hex_width = 3 * self.BLOCK_SIZE
+        hex_text = values.hex(" ").ljust((stop - start) * hex_width)
+        ascii_text = decode_ascii(values, replace_error='・')
+
+        def line(i, header, source):
+            j = i - start
+            source = f"{source[:self.SOURCE_LENGTH]:<{self.SOURCE_LENGTH}} | " if self.__show_source else ""
+            return (
+                f"{1 + i:>5d} | {source}{header.ljust(self.HEADER_LENGTH)} | "
+                f"{hex_text[j * hex_width:(j + 1) * hex_width]}"
+                f"| {ascii_text[j * self.BLOCK_SIZE:(j + 1) * self.BLOCK_SIZE]}"
+            )
+
+        lines = [line(i, "", "") for i in range(start, stop)]
+        if start == 0:
+            lines[0] = line(0, str(self._buf.timestamp), self._buf.source or "")
+        return lines
+
+    def to_string(self) -> str:
+        content = "\n".join(self.to_lines()) + "\n"
+        return content
+
+
+class TextStringBuilder(SessionBufferStringBuilder):
+    def to_string(self) -> str:
+        content = decode_ascii(self._buf.values, replace_error='・', enable_spaces=True)
+        return content
+
+    @staticmethod
+    def format_line(values: bytes) -> str:
+        return decode_ascii(values, replace_error='・', enable_spaces=True).rstrip("\r")
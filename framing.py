@@ -0,0 +1,248 @@
+# Splits a received byte stream into protocol messages; Qt-free so the command line can use it as well
+import collections
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+
+
+class Framer(ABC):
+    # Incremental state machine over a bytearray: feed() appends the new bytes and returns the messages
+    # completed by them, and every subclass resumes where the previous call stopped instead of rescanning.
+    # A message carries the timestamp of the chunk its first byte arrived in.
+    # Bytes that do not complete a message within MAX_MESSAGE_SIZE are handed out as a message anyway,
+    # so a stream that never matches the framing cannot grow the buffer without bound.
+    MAX_MESSAGE_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.__chunk_starts: collections.deque[tuple[int, int]] = collections.deque()  # (stream offset, ts)
+        self.__consumed = 0  # stream offset of _buf[0]
+        self.__message_offsets: list[int] = []
+
+    @property
+    def n_pending(self) -> int:
+        return len(self._buf)
+
+    @property
+    def message_offsets(self) -> list[int]:
+        # Stream offsets (bytes fed before) of the messages returned by the last feed(), poll() or flush()
+        return self.__message_offsets
+
+    def feed(self, data: bytes, timestamp_ns: int) -> list[tuple[int, bytes]]:
+        self.__message_offsets = []
+        messages = self._before_feed(timestamp_ns)
+        if data:
+            self.__chunk_starts.append((self.__consumed + len(self._buf), timestamp_ns))
+            self._buf += data
+        messages += self._split()
+        while len(self._buf) > self.MAX_MESSAGE_SIZE:
+            messages.append(self._take(self.MAX_MESSAGE_SIZE))
+        return messages
+
+    def poll(self, now_ns: int) -> list[tuple[int, bytes]]:
+        # Messages that are complete because of the time that has passed rather than because of new bytes
+        self.__message_offsets = []
+        return []
+
+    def flush(self) -> list[tuple[int, bytes]]:
+        self.__message_offsets = []
+        if not self._buf:
+            return []
+        return [self._take(len(self._buf))]
+
+    def _take(self, n: int) -> tuple[int, bytes]:
+        start = self.__consumed
+        chunk_starts = self.__chunk_starts
+        while len(chunk_starts) > 1 and chunk_starts[1][0] <= start:
+            chunk_starts.popleft()
+        timestamp_ns = chunk_starts[0][1]
+
+        data = bytes(self._buf[:n])
+        self._drop(n)
+        self.__message_offsets.append(start)
+        return timestamp_ns, data
+
+    def _drop(self, n: int):
+        # Deleting from the front of a bytearray only moves its start, so this does not copy the rest
+        del self._buf[:n]
+        self.__consumed += n
+        self._on_taken(n)
+
+    def _before_feed(self, timestamp_ns: int) -> list[tuple[int, bytes]]:
+        return []
+
+    def _on_taken(self, n: int):
+        pass
+
+    @abstractmethod
+    def _split(self) -> list[tuple[int, bytes]]:
+        raise NotImplementedError()
+
+
+class DelimiterFramer(Framer):
+    # A message ends with the delimiter, which stays part of it
+    def __init__(self, delimiter: bytes, skip_empty: bool = False):
+        super().__init__()
+        assert delimiter
+        self.__delimiter = delimiter
+        self.__skip_empty = skip_empty
+        self.__scanned = 0  # bytes of _buf known not to start a delimiter
+
+    def _on_taken(self, n: int):
+        self.__scanned = max(0, self.__scanned - n)
+
+    def _split(self) -> list[tuple[int, bytes]]:
+        messages = []
+        while True:
+            i = self._buf.find(self.__delimiter, self.__scanned)
+            if i < 0:
+                # A delimiter may be cut between this feed and the next one
+                self.__scanned = max(0, len(self._buf) - len(self.__delimiter) + 1)
+                return messages
+            if self.__skip_empty and i == 0:
+                self._drop(len(self.__delimiter))
+            else:
+                messages.append(self._take(i + len(self.__delimiter)))
+
+
+class SlipFramer(DelimiterFramer):
+    # RFC 1055; frames are kept as sent, slip_decode() gives the payload
+    END = 0xc0
+    ESC = 0xdb
+    ESC_END = 0xdc
+    ESC_ESC = 0xdd
+
+    def __init__(self):
+        # A sender may start every frame with END as well, which leaves empty frames in between
+        super().__init__(bytes([self.END]), skip_empty=True)
+
+
+def slip_decode(frame: bytes) -> bytes:
+    payload = bytearray()
+    escaped = False
+    for value in frame:
+        if escaped:
+            escaped = False
+            if value == SlipFramer.ESC_END:
+                value = SlipFramer.END
+            elif value == SlipFramer.ESC_ESC:
+                value = SlipFramer.ESC
+            payload.append(value)
+        elif value == SlipFramer.ESC:
+            escaped = True
+        elif value != SlipFramer.END:
+            payload.append(value)
+    return bytes(payload)
+
+
+class CobsFramer(DelimiterFramer):
+    # Consistent Overhead Byte Stuffing with a zero byte after every frame; cobs_decode() gives the payload
+    def __init__(self):
+        super().__init__(b"\x00", skip_empty=True)
+
+
+def cobs_decode(frame: bytes) -> bytes:
+    frame = frame.rstrip(b"\x00")
+    payload = bytearray()
+    i = 0
+    while i < len(frame):
+        code = frame[i]
+        if code == 0:
+            raise ValueError(f"zero byte at offset {i} in a COBS frame")
+        payload += frame[i + 1:i + code]
+        i += code
+        if code < 0xff and i < len(frame):
+            payload.append(0)
+    return bytes(payload)
+
+
+class LengthPrefixFramer(Framer):
+    # A message is a length field of length_size bytes followed by that many bytes; both stay in the message
+    def __init__(self, length_size: int, byteorder: str = "big"):
+        super().__init__()
+        assert length_size in (1, 2, 4), length_size
+        self.__length_size = length_size
+        self.__byteorder = byteorder
+
+    def _split(self) -> list[tuple[int, bytes]]:
+        messages = []
+        while len(self._buf) >= self.__length_size:
+            length = int.from_bytes(self._buf[:self.__length_size], self.__byteorder)
+            total = self.__length_size + length
+            if total > self.MAX_MESSAGE_SIZE:
+                # Not a plausible length; hand out the field alone and look for the next message right after it
+                messages.append(self._take(self.__length_size))
+                continue
+            if len(self._buf) < total:
+                break
+            messages.append(self._take(total))
+        return messages
+
+
+class IdleGapFramer(Framer):
+    # A message ends when no byte has arrived for gap_ns
+    def __init__(self, gap_ns: int):
+        super().__init__()
+        self.__gap_ns = gap_ns
+        self.__last_ns: int | None = None
+
+    def _before_feed(self, timestamp_ns: int) -> list[tuple[int, bytes]]:
+        messages = self.poll(timestamp_ns)
+        self.__last_ns = timestamp_ns
+        return messages
+
+    def poll(self, now_ns: int) -> list[tuple[int, bytes]]:
+        if self._buf and self.__last_ns is not None and now_ns - self.__last_ns >= self.__gap_ns:
+            return self.flush()
+        return super().poll(now_ns)
+
+    def _split(self) -> list[tuple[int, bytes]]:
+        return []
+
+
+FRAMING_NONE = "none"
+FRAMING_DELIMITER = "delimiter"
+FRAMING_LENGTH = "length"
+FRAMING_SLIP = "slip"
+FRAMING_COBS = "cobs"
+FRAMING_IDLE_GAP = "idle_gap"
+
+
+@dataclass(frozen=True)
+class FramingConfig:
+    kind: str
+    delimiter: bytes
+    length_size: int
+    byteorder: str
+    gap_ms: float
+
+    @classmethod
+    def default(cls):
+        return cls(
+            kind=FRAMING_NONE,
+            delimiter=b"\n",
+            length_size=2,
+            byteorder="big",
+            gap_ms=20.0,
+        )
+
+    def replace(self, key, value):
+        items = asdict(self)
+        items[key] = value
+        return type(self)(**items)
+
+    def create_framer(self) -> Framer | None:
+        # None keeps the stream as it was drained, one session per poll
+        if self.kind == FRAMING_NONE:
+            return None
+        elif self.kind == FRAMING_DELIMITER:
+            return DelimiterFramer(self.delimiter)
+        elif self.kind == FRAMING_LENGTH:
+            return LengthPrefixFramer(self.length_size, self.byteorder)
+        elif self.kind == FRAMING_SLIP:
+            return SlipFramer()
+        elif self.kind == FRAMING_COBS:
+            return CobsFramer()
+        elif self.kind == FRAMING_IDLE_GAP:
+            return IdleGapFramer(round(self.gap_ms * 1e6))
+        else:
+            assert False, self.kind
@@ -0,0 +1,242 @@
+# Request/response latency measured on the acquisition threads; Qt-free like triggers
+import csv
+import threading
+import time
+from array import array
+from dataclasses import dataclass, asdict
+
+from triggers import Matcher, create_matcher, RULE_HEX, RULE_REGEX
+
+RESPONSE_ANY = "any"
+RESPONSE_HEX = RULE_HEX
+RESPONSE_REGEX = RULE_REGEX
+
+# Latencies are binned by powers of two microseconds like the jitter histogram: bin k holds [2 ** (k - 1), 2 ** k) us,
+# except the last bin, which holds everything from 2 ** (N_LATENCY_BINS - 2) us up
+N_LATENCY_BINS = 24
+
+
+@dataclass(frozen=True)
+class LatencyConfig:
+    response_kind: str
+    response_pattern: str  # hex bytes for RESPONSE_HEX, a regex for RESPONSE_REGEX, unused for RESPONSE_ANY
+    timeout_ms: float
+
+    @classmethod
+    def default(cls):
+        return cls(
+            response_kind=RESPONSE_ANY,
+            response_pattern="",
+            timeout_ms=1000.0,
+        )
+
+    def replace(self, key, value):
+        items = asdict(self)
+        items[key] = value
+        return type(self)(**items)
+
+    def create_matcher(self) -> Matcher | None:
+        # ValueError tells what is wrong with the pattern
+        if self.response_kind == RESPONSE_ANY:
+            return None
+        return create_matcher(self.response_kind, self.response_pattern)
+
+    def create_tracker(self) -> "LatencyTracker":
+        return LatencyTracker(self)
+
+
+@dataclass(frozen=True)
+class LatencySnapshot:
+    command: bytes | None  # None gathers the commands beyond MAX_COMMANDS
+    n_requests: int
+    n_replies: int
+    n_unanswered: int
+    min_ns: int | None
+    mean_ns: float | None
+    p50_ns: int | None
+    p90_ns: int | None
+    p99_ns: int | None
+    max_ns: int | None
+    histogram: tuple[int, ...]
+
+
+class _CommandStats:
+    def __init__(self):
+        self.n_requests = 0
+        self.n_replies = 0
+        self.n_unanswered = 0
+        self.sum_ns = 0
+        self.min_ns: int | None = None
+        self.max_ns: int | None = None
+        self.samples = array("q")  # the latest MAX_SAMPLES latencies, as a ring once it is full
+        self.head = 0
+        self.histogram = [0] * N_LATENCY_BINS
+
+    def add(self, latency_ns: int):
+        self.n_replies += 1
+        self.sum_ns += latency_ns
+        self.min_ns = latency_ns if self.min_ns is None else min(self.min_ns, latency_ns)
+        self.max_ns = latency_ns if self.max_ns is None else max(self.max_ns, latency_ns)
+        if len(self.samples) < LatencyTracker.MAX_SAMPLES:
+            self.samples.append(latency_ns)
+        else:
+            self.samples[self.head] = latency_ns
+            self.head = (self.head + 1) % len(self.samples)
+        self.histogram[min(N_LATENCY_BINS - 1, (latency_ns // 1000).bit_length())] += 1
+
+    def snapshot(self, command: bytes | None) -> LatencySnapshot:
+        samples = sorted(self.samples)
+
+        def percentile(p: float) -> int | None:
+            # Nearest rank over the retained samples
+            if not samples:
+                return None
+            return samples[min(len(samples) - 1, max(0, round(p * len(samples)) - 1))]
+
+        return LatencySnapshot(
+            command=command,
+            n_requests=self.n_requests,
+            n_replies=self.n_replies,
+            n_unanswered=self.n_unanswered,
+            min_ns=self.min_ns,
+            mean_ns=self.sum_ns / self.n_replies if self.n_replies else None,
+            p50_ns=percentile(0.5),
+            p90_ns=percentile(0.9),
+            p99_ns=percentile(0.99),
+            max_ns=self.max_ns,
+            histogram=tuple(self.histogram),
+        )
+
+
+class _Request:
+    def __init__(self, stats: _CommandStats, started_at_ns: int, matcher: Matcher | None):
+        self.stats = stats
+        self.started_at_ns = started_at_ns
+        self.sent_at_ns: int | None = None
+        self.replied_at_ns: int | None = None
+        self.matcher = matcher
+        self.offset = 0  # bytes fed to the matcher
+
+
+class LatencyTracker:
+    # Pairs each frame the writer thread completes with the first reply the reader thread receives after it,
+    # both timestamped with perf_counter_ns where the I/O happens rather than when the GUI polls.
+    # A frame is timed from the moment its last bytes were handed to the driver.
+    # The writer announces a frame before writing it, so a reply read before the write call has returned is not
+    # missed, and bytes read before the announcement are never taken for a reply. Only the latest frame waits
+    # for a reply: sending the next frame or timeout_ms passing counts it as unanswered.
+    # With a response pattern, the reply is the chunk in which a match completes, looking from the frame on.
+    # Both threads take the lock for a few attribute updates per chunk; an idle tracker costs the reader nothing.
+    MAX_COMMANDS = 1000
+    MAX_SAMPLES = 100_000
+
+    def __init__(self, config: LatencyConfig):
+        self.__config = config
+        self.__timeout_ns = int(config.timeout_ms * 1_000_000)
+        self.__lock = threading.Lock()
+        self.__stats: dict[bytes | None, _CommandStats] = {}
+        self.__pending: _Request | None = None
+
+    @property
+    def config(self) -> LatencyConfig:
+        return self.__config
+
+    def __get_stats(self, command: bytes) -> _CommandStats:
+        stats = self.__stats.get(command)
+        if stats is None:
+            if len(self.__stats) >= self.MAX_COMMANDS:
+                command = None
+            stats = self.__stats.setdefault(command, _CommandStats())
+        return stats
+
+    def __expire(self, now_ns: int):
+        pending = self.__pending
+        if pending is not None and pending.sent_at_ns is not None and pending.replied_at_ns is None \
+                and now_ns - pending.sent_at_ns > self.__timeout_ns:
+            pending.stats.n_unanswered += 1
+            self.__pending = None
+
+    def on_send_started(self, frame: bytes, timestamp_ns: int):
+        # Writer thread, before the first byte of frame is written
+        with self.__lock:
+            pending = self.__pending
+            if pending is not None and pending.sent_at_ns is not None and pending.replied_at_ns is None:
+                pending.stats.n_unanswered += 1
+            self.__pending = _Request(self.__get_stats(frame), timestamp_ns, self.__config.create_matcher())
+
+    def on_sent(self, timestamp_ns: int):
+        # Writer thread, once the whole frame has been written; timestamp_ns is when its last bytes were handed over
+        with self.__lock:
+            pending = self.__pending
+            if pending is None:
+                return
+            pending.sent_at_ns = timestamp_ns
+            pending.stats.n_requests += 1
+            if pending.replied_at_ns is not None:
+                self.__finish(pending)
+
+    def on_send_failed(self):
+        # Writer thread; a frame that was not written completely is not measured
+        with self.__lock:
+            self.__pending = None
+
+    def on_received(self, data: bytes, timestamp_ns: int):
+        # Reader thread, for every chunk as it was read
+        if self.__pending is None:
+            return
+        with self.__lock:
+            self.__expire(timestamp_ns)
+            pending = self.__pending
+            if pending is None or pending.replied_at_ns is not None or timestamp_ns < pending.started_at_ns:
+                return
+            if pending.matcher is not None:
+                matches = pending.matcher.feed(data, timestamp_ns, pending.offset)
+                pending.offset += len(data)
+                if not matches:
+                    return
+            pending.replied_at_ns = timestamp_ns
+            if pending.sent_at_ns is not None:
+                self.__finish(pending)
+
+    def __finish(self, pending: _Request):
+        # A reply that came in while the write call was returning counts as immediate
+        pending.stats.add(max(0, pending.replied_at_ns - pending.sent_at_ns))
+        self.__pending = None
+
+    def snapshot(self) -> list[LatencySnapshot]:
+        with self.__lock:
+            self.__expire(time.perf_counter_ns())
+            return [stats.snapshot(command) for command, stats in self.__stats.items()]
+
+
+LATENCY_CSV_HEADER = [
+    "port", "command", "requests", "replies", "unanswered",
+    "min_ms", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms",
+    *(f"under_{1 << k}us" for k in range(N_LATENCY_BINS - 1)),
+    f"over_{1 << (N_LATENCY_BINS - 2)}us",
+]
+
+
+def write_latency_csv(f, rows: list[tuple[str, LatencySnapshot]]):
+    # rows are (port name, snapshot); each histogram column counts the replies from the previous bound to its own,
+    # and the last one counts every reply from its bound up
+    def to_ms(value_ns: float | None) -> str:
+        return "" if value_ns is None else f"{value_ns / 1e6:.3f}"
+
+    writer = csv.writer(f)
+    writer.writerow(LATENCY_CSV_HEADER)
+    for port, snapshot in rows:
+        writer.writerow([
+            port,
+            "" if snapshot.command is None else snapshot.command.hex(),
+            snapshot.n_requests,
+            snapshot.n_replies,
+            snapshot.n_unanswered,
+            to_ms(snapshot.min_ns),
+            to_ms(snapshot.mean_ns),
+            to_ms(snapshot.p50_ns),
+            to_ms(snapshot.p90_ns),
+            to_ms(snapshot.p99_ns),
+            to_ms(snapshot.max_ns),
+            *snapshot.histogram,
+        ])
@@ -1,6 +1,6 @@
-from PyQt5.QtGui import *
+from PyQt5.QtGui import QFont
 
-from PyQt5.QtWidgets import *
+from PyQt5.QtWidgets import QApplication
 
 if __name__ == '__main__':
     import sys
@@ -21,8 +21,19 @@ if __name__ == '__main__':
 
     from window_main import MainWindow
 
+    import os
+    import profiling
+
+    # Record the whole session when started with SERIALANALYZER_PROFILE=<path>
+    profile_path = os.environ.get(profiling.PROFILE_ENV)
+    if profile_path:
+        profiling.start_profile(profile_path)
+
     window = MainWindow()
     window.show()
     app.setFont(QFont("Meiryo", 9))
     app.setStyle('Fusion')
     app.exec()
+
+    if profiling.profile_running():
+        profiling.stop_profile()
@@ -0,0 +1,168 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# SERIALANALYZER_SPANS=1 turns the spans on at startup,
+# SERIALANALYZER_PROFILE=<path> records a cProfile of the GUI thread until the application exits
+SPANS_ENV = "SERIALANALYZER_SPANS"
+PROFILE_ENV = "SERIALANALYZER_PROFILE"
+
+# Span durations are binned by powers of two microseconds: bin k holds [2 ** (k - 1), 2 ** k) us
+N_HISTOGRAM_BINS = 24
+
+
+class SpanStats:
+    def __init__(self, name: str):
+        self.__name = name
+        self.__lock = threading.Lock()
+        self.__count = 0
+        self.__total_ns = 0
+        self.__max_ns = 0
+        self.__histogram = [0] * N_HISTOGRAM_BINS
+        self.__interval_total_ns = 0  # since the last take_interval
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def total_ns(self) -> int:
+        return self.__total_ns
+
+    @property
+    def max_ns(self) -> int:
+        return self.__max_ns
+
+    @property
+    def histogram(self) -> list[int]:
+        return list(self.__histogram)
+
+    def add(self, elapsed_ns: int):
+        # Spans may end on the reader and watcher threads as well as on the GUI thread
+        with self.__lock:
+            self.__count += 1
+            self.__total_ns += elapsed_ns
+            self.__interval_total_ns += elapsed_ns
+            if elapsed_ns > self.__max_ns:
+                self.__max_ns = elapsed_ns
+            self.__histogram[min(N_HISTOGRAM_BINS - 1, (elapsed_ns // 1000).bit_length())] += 1
+
+    def take_interval(self) -> int:
+        with self.__lock:
+            elapsed_ns, self.__interval_total_ns = self.__interval_total_ns, 0
+        return elapsed_ns
+
+    def percentile_ns(self, q: float) -> int:
+        # Upper bound of the histogram bin holding the q-th quantile
+        histogram = self.histogram
+        rank = q * sum(histogram)
+        n = 0
+        for i, count in enumerate(histogram):
+            n += count
+            if count and n >= rank:
+                return (1 << i) * 1000
+        return 0
+
+
+_enabled = bool(os.environ.get(SPANS_ENV))
+_stats: dict[str, SpanStats] = {}
+_stats_lock = threading.Lock()
+_profile = None  # cProfile.Profile while recording
+_profile_path: str | None = None
+
+
+def spans_enabled() -> bool:
+    return _enabled
+
+
+def set_spans_enabled(value: bool):
+    global _enabled
+    _enabled = value
+
+
+def get_span_stats(name: str) -> SpanStats:
+    stats = _stats.get(name)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.setdefault(name, SpanStats(name))
+    return stats
+
+
+def list_span_stats() -> list[SpanStats]:
+    return list(_stats.values())
+
+
+def reset_spans():
+    with _stats_lock:
+        _stats.clear()
+
+
+class _Span:
+    __slots__ = ("__stats", "__start_ns")
+
+    def __init__(self, stats: SpanStats):
+        self.__stats = stats
+        self.__start_ns = 0
+
+    def __enter__(self):
+        self.__start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stats.add(time.perf_counter_ns() - self.__start_ns)
+        return False
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def span(name: str):
+    # While disabled this costs one global lookup and returns a shared no-op context manager
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(get_span_stats(name))
+
+
+def spanned(name: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(get_span_stats(name)):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profile_running() -> bool:
+    return _profile is not None
+
+
+def start_profile(path: str):
+    # cProfile only sees the thread that starts it, which is the GUI thread
+    import cProfile
+
+    global _profile, _profile_path
+    assert _profile is None
+    _profile = cProfile.Profile()
+    _profile_path = path
+    _profile.enable()
+
+
+def stop_profile() -> str:
+    global _profile, _profile_path
+    assert _profile is not None
+    _profile.disable()
+    _profile.dump_stats(_profile_path)
+    path = _profile_path
+    _profile, _profile_path = None, None
+    return path
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import serial
+
+from capture_file import CaptureReader, DIRECTION_RX
+from serial_core import COMPortReceiveQueue, COMPortClosedError, COMPortOSError
+
+
+class ReplayIO:
+    # Same receive interface as COMPortIO, fed by a CaptureReplayer instead of a port
+    def __init__(self, replayer: "CaptureReplayer", queue: COMPortReceiveQueue):
+        self.__replayer = replayer
+        self.__queue = queue
+
+    def send_bytes(self, values: bytes) -> None:
+        raise COMPortClosedError()
+
+    def send_async(self, frames: list[bytes], delay_ns: int = 0, repeat: int = 1, on_done=None):
+        raise COMPortClosedError()
+
+    def __get_queue(self) -> COMPortReceiveQueue:
+        if self.__replayer.error is not None and not self.__queue.n_available:
+            raise COMPortOSError() from self.__replayer.error
+        return self.__queue
+
+    def receive_bytes(self, size) -> bytes:
+        return self.__get_queue().pop(size)
+
+    def receive_chunks(self) -> list[tuple[int, bytes]]:
+        return self.__get_queue().pop_chunks()
+
+    def receive_highlights(self) -> list[tuple[int, int]]:
+        return []
+
+    @property
+    def n_received(self) -> int:
+        return self.__get_queue().n_popped
+
+    @property
+    def n_available(self) -> int:
+        return self.__get_queue().n_available
+
+    @property
+    def n_dropped(self) -> int:
+        return self.__get_queue().n_dropped
+
+
+class CaptureReplayer:
+    # Replays the recorded chunks of a capture file with their original spacing scaled by speed
+    # (speed=0 replays as fast as the consumer drains them), optionally writing them to a port as well.
+    MAX_SPEED = 0
+    # At full speed, wait for the consumer instead of overflowing the receive queue
+    HIGH_WATER = COMPortReceiveQueue.DEFAULT_CAPACITY // 2
+
+    def __init__(self, path: str, speed: float = 1.0, direction: int = DIRECTION_RX,
+                 port: str | None = None, output_url: str | None = None, **output_params):
+        self.__path = path
+        self.__speed = speed
+        self.__direction = direction
+        self.__port = port
+        self.__output_url = output_url
+        self.__output_params = output_params
+
+        self.__queue = COMPortReceiveQueue()
+        self.__io = ReplayIO(self, self.__queue)
+        self.__stop_event = threading.Event()
+        self.__error: Exception | None = None
+        self.__n_replayed = 0
+        self.__thread = threading.Thread(target=self.__run, name=f"CaptureReplayer({path})", daemon=True)
+
+    @property
+    def io(self) -> ReplayIO:
+        return self.__io
+
+    @property
+    def error(self) -> Exception | None:
+        return self.__error
+
+    @property
+    def finished(self) -> bool:
+        return not self.__thread.is_alive()
+
+    @property
+    def n_replayed(self) -> int:
+        return self.__n_replayed
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __run(self):
+        try:
+            with CaptureReader(self.__path) as reader:
+                output = None
+                if self.__output_url:
+                    output = serial.serial_for_url(self.__output_url, **self.__output_params)
+                try:
+                    self.__replay(reader, output)
+                finally:
+                    if output is not None:
+                        output.close()
+        except (OSError, ValueError) as e:
+            self.__error = e
+
+    def __replay(self, reader: CaptureReader, output: serial.Serial | None):
+        t_origin = None
+        record_origin = None
+        for record in reader.records():
+            if record.direction != self.__direction:
+                continue
+            if self.__port is not None and record.port != self.__port:
+                continue
+            timestamp_ns = record.timestamp_ns
+            data = record.data
+
+            if self.__speed != self.MAX_SPEED:
+                if t_origin is None:
+                    t_origin, record_origin = time.perf_counter_ns(), timestamp_ns
+                due = t_origin + (timestamp_ns - record_origin) / self.__speed
+                delay = (due - time.perf_counter_ns()) / 1e9
+                if delay > 0 and self.__stop_event.wait(delay):
+                    return
+            else:
+                while self.__queue.n_available + len(data) > self.HIGH_WATER:
+                    if self.__stop_event.wait(0.005):
+                        return
+
+            if self.__stop_event.is_set():
+                return
+            if output is not None:
+                output.write(data)
+            self.__queue.push(data)
+            self.__n_replayed += len(data)
@@ -0,0 +1,43 @@
+# Frames of a sequence file for the sender; Qt-free like framing
+SCRIPT_RAW = "raw"
+SCRIPT_HEX_LINES = "hex_lines"
+SCRIPT_TEXT_LINES = "text_lines"
+
+
+class SendScriptError(ValueError):
+    pass
+
+
+def parse_frames(data: bytes, kind: str) -> list[bytes]:
+    # SCRIPT_RAW sends the whole file as one frame.
+    # SCRIPT_HEX_LINES makes a frame of every line of hex digits; blank lines and lines starting with # are skipped.
+    # SCRIPT_TEXT_LINES makes a frame of every line as it is, line ending included.
+    if kind == SCRIPT_RAW:
+        frames = [data]
+    elif kind == SCRIPT_HEX_LINES:
+        frames = []
+        for i, line in enumerate(data.splitlines(), start=1):
+            line = line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            try:
+                frames.append(bytes.fromhex(line.decode("ascii")))
+            except ValueError:
+                raise SendScriptError(f"{i}行目が16進数ではありません")
+    elif kind == SCRIPT_TEXT_LINES:
+        frames = data.splitlines(keepends=True)
+    else:
+        assert False, kind
+    frames = [frame for frame in frames if frame]
+    if not frames:
+        raise SendScriptError("送信するデータがありません")
+    return frames
+
+
+def load_frames(path: str, kind: str) -> list[bytes]:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise SendScriptError(f"ファイルを読み込めません：{e.strerror}")
+    return parse_frames(data, kind)
@@ -1,16 +1,31 @@
+import collections
 import sys
+import threading
+import time
 import traceback
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
-from PyQt5.QtCore import QMutex
-from serial import Serial, SerialException
+from serial import Serial, SerialException, SerialTimeoutException, serial_for_url
+
+from capture_file import CaptureWriter, DIRECTION_RX, DIRECTION_TX
+from latency import LatencyConfig, LatencyTracker
+from triggers import TriggerConfig, TriggerPipeline
 
 __all__ = (
     "list_device_names",
+    "perf_counter_ns_to_datetime",
     "COMPortConnection",
 )
 
+# Acquisition timestamps are perf_counter_ns values; this anchors them to wall clock time for display
+_CLOCK_ANCHOR = (time.time_ns(), time.perf_counter_ns())
+
+
+def perf_counter_ns_to_datetime(timestamp_ns: int) -> datetime:
+    wall_ns, perf_ns = _CLOCK_ANCHOR
+    return datetime.fromtimestamp((wall_ns + timestamp_ns - perf_ns) / 1e9)
+
 
 def list_device_names() -> list[str]:
     from serial.tools import list_ports
@@ -19,79 +34,732 @@ def list_device_names() -> list[str]:
     return sorted(port.device for port in ports)
 
 
-@dataclass(frozen=False)
-class COMPortStat:
-    mutex: QMutex
-    created_at: datetime | None = None
-    sent_at: datetime | None = None
-    received_at: datetime | None = None
-    total_n_sent: int = 0
-    total_n_received: int = 0
-
-    @classmethod
-    def create_instance(cls):
-        return cls(
-            mutex=QMutex(),
-        )
+@dataclass(frozen=True)
+class COMPortStatSnapshot:
+    version: int
+    created_at_ns: int | None
+    sent_at_ns: int | None
+    received_at_ns: int | None
+    total_n_sent: int
+    total_n_received: int
+
+    @property
+    def accessed_at_ns(self) -> int | None:
+        timestamps = [t for t in (self.sent_at_ns, self.received_at_ns) if t is not None]
+        return max(timestamps, default=None)
 
     def to_info(self) -> dict:
+        # Timestamps are converted to datetime only here, when they are about to be displayed
+        def to_datetime(timestamp_ns: int | None) -> datetime | None:
+            return None if timestamp_ns is None else perf_counter_ns_to_datetime(timestamp_ns)
+
         return {
-            "created_at": self.created_at,
-            "sent_at": self.sent_at,
-            "received_at": self.received_at,
+            "created_at": to_datetime(self.created_at_ns),
+            "sent_at": to_datetime(self.sent_at_ns),
+            "received_at": to_datetime(self.received_at_ns),
             "total_n_sent": self.total_n_sent,
             "total_n_received": self.total_n_received,
-            "accessed_at": self.accessed_at,
+            "accessed_at": to_datetime(self.accessed_at_ns),
         }
 
-    def __enter__(self):
-        self.mutex.lock()
-        return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.mutex.unlock()
-        return False
+class COMPortStat:
+    # Every group of counters has a single writer: the reader thread updates the receive side,
+    # the sending thread the send side and the connection the open/close side.
+    # Plain attribute stores are atomic under the GIL, so no lock is taken on the I/O path.
+    # Each group is a seqlock: its writer bumps the version before and after updating the counters, so an odd
+    # version means an update is in progress, and a snapshot is retried while a version is odd or has changed.
+    def __init__(self):
+        self.__created_at_ns: int | None = None
+        self.__open_version = 0
+        self.__sent_at_ns: int | None = None
+        self.__total_n_sent = 0
+        self.__sent_version = 0
+        self.__received_at_ns: int | None = None
+        self.__total_n_received = 0
+        self.__received_version = 0
+
+    def on_opened(self, timestamp_ns: int | None):
+        self.__open_version += 1
+        self.__created_at_ns = timestamp_ns
+        self.__open_version += 1
+
+    def on_sent(self, n_sent: int, timestamp_ns: int):
+        self.__sent_version += 1
+        self.__total_n_sent += n_sent
+        self.__sent_at_ns = timestamp_ns
+        self.__sent_version += 1
+
+    def on_received(self, n_received: int, timestamp_ns: int):
+        self.__received_version += 1
+        self.__total_n_received += n_received
+        self.__received_at_ns = timestamp_ns
+        self.__received_version += 1
+
+    @property
+    def version(self) -> int:
+        # Changes whenever any counter changed; comparing it is enough to tell that nothing happened
+        return self.__open_version + self.__sent_version + self.__received_version
+
+    def __versions(self) -> tuple[int, int, int]:
+        return self.__open_version, self.__sent_version, self.__received_version
+
+    def snapshot(self) -> COMPortStatSnapshot:
+        while True:
+            versions = self.__versions()
+            if any(version & 1 for version in versions):
+                # Let the writer finish its update
+                time.sleep(0)
+                continue
+            snapshot = COMPortStatSnapshot(
+                version=sum(versions),
+                created_at_ns=self.__created_at_ns,
+                sent_at_ns=self.__sent_at_ns,
+                received_at_ns=self.__received_at_ns,
+                total_n_sent=self.__total_n_sent,
+                total_n_received=self.__total_n_received,
+            )
+            if self.__versions() == versions:
+                return snapshot
+
+    def to_info(self) -> dict:
+        return self.snapshot().to_info()
+
+
+@dataclass(frozen=True)
+class COMPortRateSnapshot:
+    bytes_per_sec: float
+    chunks_per_sec: float
+    peak_bytes_per_sec: float
+    peak_chunks_per_sec: float
+    jitter_ns: float  # standard deviation of the inter-arrival time
+    jitter_histogram: tuple[int, ...]
+    history: tuple[float, ...]  # bytes/s of each bucket, oldest first
+
+
+@dataclass
+class _RateBucket:
+    index: int  # timestamp_ns // BUCKET_NS of the time slice this bucket covers
+    n_bytes: int = 0
+    n_chunks: int = 0
+    n_intervals: int = 0
+    sum_interval: int = 0
+    sum_sq_interval: int = 0
+    max_level: int = 0
+    jitter_histogram: list[int] = field(default_factory=lambda: [0] * COMPortRateWindow.N_JITTER_BINS)
+
+
+class COMPortRateWindow:
+    # Rolling window of fixed time buckets, written by a single thread.
+    # A finished bucket is replaced rather than cleared, so a reader summing the ring never sees it half reset,
+    # and buckets older than the window are skipped by their index, so rates fall to zero without any writes.
+    BUCKET_NS = 100_000_000
+    N_BUCKETS = 50
+    # Inter-arrival times are binned by powers of two microseconds: bin k holds [2 ** (k - 1), 2 ** k) us
+    N_JITTER_BINS = 20
+
+    def __init__(self):
+        self.__buckets: list[_RateBucket | None] = [None] * self.N_BUCKETS
+        self.__current: _RateBucket | None = None
+        self.__last_timestamp_ns: int | None = None
+        self.__peak_bytes_per_sec = 0.0
+        self.__peak_chunks_per_sec = 0.0
+
+    def __new_bucket(self, index: int) -> _RateBucket:
+        current = self.__current
+        if current is not None:
+            self.__peak_bytes_per_sec = max(self.__peak_bytes_per_sec, current.n_bytes * 1e9 / self.BUCKET_NS)
+            self.__peak_chunks_per_sec = max(self.__peak_chunks_per_sec, current.n_chunks * 1e9 / self.BUCKET_NS)
+        bucket = _RateBucket(index=index)
+        self.__buckets[index % self.N_BUCKETS] = bucket
+        self.__current = bucket
+        return bucket
+
+    def record(self, n: int, timestamp_ns: int, level: int = 0):
+        index = timestamp_ns // self.BUCKET_NS
+        bucket = self.__current
+        if bucket is None or bucket.index != index:
+            bucket = self.__new_bucket(index)
+        bucket.n_bytes += n
+        bucket.n_chunks += 1
+        if level > bucket.max_level:
+            bucket.max_level = level
+
+        last_timestamp_ns, self.__last_timestamp_ns = self.__last_timestamp_ns, timestamp_ns
+        if last_timestamp_ns is not None:
+            interval = timestamp_ns - last_timestamp_ns
+            bucket.n_intervals += 1
+            bucket.sum_interval += interval
+            bucket.sum_sq_interval += interval * interval
+            bucket.jitter_histogram[min(self.N_JITTER_BINS - 1, (interval // 1000).bit_length())] += 1
+
+    def snapshot(self, now_ns: int | None = None) -> COMPortRateSnapshot:
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        # The bucket being filled is left out of the rates
+        stop = now_ns // self.BUCKET_NS
+        start = stop - (self.N_BUCKETS - 1)
+        buckets = [None] * (self.N_BUCKETS - 1)
+        for bucket in list(self.__buckets):
+            if bucket is not None and start <= bucket.index < stop:
+                buckets[bucket.index - start] = bucket
+        buckets = [bucket for bucket in buckets if bucket is not None]
+
+        window_sec = (self.N_BUCKETS - 1) * self.BUCKET_NS / 1e9
+        history = [0.0] * (self.N_BUCKETS - 1)
+        for bucket in buckets:
+            history[bucket.index - start] = bucket.n_bytes * 1e9 / self.BUCKET_NS
+
+        n_intervals = sum(bucket.n_intervals for bucket in buckets)
+        if n_intervals > 1:
+            mean = sum(bucket.sum_interval for bucket in buckets) / n_intervals
+            mean_sq = sum(bucket.sum_sq_interval for bucket in buckets) / n_intervals
+            jitter_ns = max(0.0, mean_sq - mean * mean) ** 0.5
+        else:
+            jitter_ns = 0.0
+
+        return COMPortRateSnapshot(
+            bytes_per_sec=sum(bucket.n_bytes for bucket in buckets) / window_sec,
+            chunks_per_sec=sum(bucket.n_chunks for bucket in buckets) / window_sec,
+            peak_bytes_per_sec=max(self.__peak_bytes_per_sec, *history),
+            peak_chunks_per_sec=max(
+                self.__peak_chunks_per_sec,
+                *(bucket.n_chunks * 1e9 / self.BUCKET_NS for bucket in buckets), 0.0,
+            ),
+            jitter_ns=jitter_ns,
+            jitter_histogram=tuple(
+                sum(bucket.jitter_histogram[i] for bucket in buckets) for i in range(self.N_JITTER_BINS)
+            ),
+            history=tuple(history),
+        )
+
+    def max_level(self, now_ns: int | None = None) -> int:
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        start = now_ns // self.BUCKET_NS - (self.N_BUCKETS - 1)
+        return max((b.max_level for b in list(self.__buckets) if b is not None and b.index >= start), default=0)
+
+
+@dataclass(frozen=True)
+class COMPortTelemetrySnapshot:
+    rx: COMPortRateSnapshot
+    tx: COMPortRateSnapshot
+    queue_capacity: int
+    queue_level: int  # highest receive queue level in the window
+    queue_high_water: int  # highest receive queue level since the port was opened
+
+    @property
+    def falling_behind(self) -> bool:
+        # The GUI drains the queue every few milliseconds, so a backlog of half the queue means it cannot keep up
+        return self.queue_level * 2 >= self.queue_capacity
+
+
+class COMPortTelemetry:
+    # Rolling throughput and inter-arrival statistics of one connection.
+    # The receive side is written by the reader thread and the send side by the sending thread.
+    def __init__(self, queue_capacity: int = 0):
+        self.__rx = COMPortRateWindow()
+        self.__tx = COMPortRateWindow()
+        self.__queue_capacity = queue_capacity
+        self.__queue_high_water = 0
+
+    def on_received(self, n: int, timestamp_ns: int, queue_level: int):
+        self.__rx.record(n, timestamp_ns, queue_level)
+        if queue_level > self.__queue_high_water:
+            self.__queue_high_water = queue_level
+
+    def on_sent(self, n: int, timestamp_ns: int):
+        self.__tx.record(n, timestamp_ns)
+
+    def snapshot(self) -> COMPortTelemetrySnapshot:
+        now_ns = time.perf_counter_ns()
+        return COMPortTelemetrySnapshot(
+            rx=self.__rx.snapshot(now_ns),
+            tx=self.__tx.snapshot(now_ns),
+            queue_capacity=self.__queue_capacity,
+            queue_level=self.__rx.max_level(now_ns),
+            queue_high_water=self.__queue_high_water,
+        )
+
+
+class COMPortReceiveQueue:
+    # Bounded single-producer/single-consumer chunk queue between the reader thread and the GUI.
+    # deque.append/popleft are atomic, and each counter is written by one side only, so no lock is needed.
+    DEFAULT_CAPACITY = 16 * 1024 * 1024
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.__capacity = capacity
+        self.__chunks: collections.deque[tuple[int, bytes]] = collections.deque()
+        self.__head: tuple[int, bytes] | None = None
+        self.__n_pushed = 0  # producer only
+        self.__n_dropped = 0  # producer only
+        self.__n_popped = 0  # consumer only
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def push(self, data: bytes, timestamp_ns: int | None = None) -> bool:
+        if self.__n_pushed - self.__n_popped + len(data) > self.__capacity:
+            self.__n_dropped += len(data)
+            return False
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        self.__n_pushed += len(data)
+        self.__chunks.append((timestamp_ns, data))
+        return True
+
+    def __pop_chunk(self) -> tuple[int, bytes] | None:
+        if self.__head is not None:
+            chunk, self.__head = self.__head, None
+            return chunk
+        try:
+            return self.__chunks.popleft()
+        except IndexError:
+            return None
+
+    def pop(self, size: int) -> bytes:
+        parts = []
+        remaining = size
+        while remaining > 0:
+            chunk = self.__pop_chunk()
+            if chunk is None:
+                break
+            timestamp_ns, data = chunk
+            if len(data) > remaining:
+                data, self.__head = data[:remaining], (timestamp_ns, data[remaining:])
+            parts.append(data)
+            remaining -= len(data)
+        data = b"".join(parts)
+        self.__n_popped += len(data)
+        return data
+
+    def pop_chunks(self) -> list[tuple[int, bytes]]:
+        # Everything queued so far as (acquisition timestamp, bytes) pairs
+        chunks = []
+        while True:
+            chunk = self.__pop_chunk()
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            self.__n_popped += len(chunk[1])
+        return chunks
+
+    @property
+    def n_available(self) -> int:
+        return max(0, self.__n_pushed - self.__n_popped)
+
+    @property
+    def n_pushed(self) -> int:
+        return self.__n_pushed
+
+    @property
+    def n_popped(self) -> int:
+        # Stream offset of the next byte the consumer gets
+        return self.__n_popped
+
+    @property
+    def n_dropped(self) -> int:
+        return self.__n_dropped
+
+
+class COMPortReader:
+    # Owns the blocking reads of one open port so that acquisition does not depend on the GUI thread.
+    READ_TIMEOUT = 0.02
+
+    def __init__(self, ser: Serial, stat: COMPortStat, queue: COMPortReceiveQueue,
+                 telemetry: COMPortTelemetry):
+        self.__ser = ser
+        self.__stat = stat
+        self.__queue = queue
+        self.__telemetry = telemetry
+        self.__recorder: CaptureWriter | None = None
+        self.__triggers: TriggerPipeline | None = None
+        self.__latency: LatencyTracker | None = None
+        self.__stop_event = threading.Event()
+        self.__error: Exception | None = None
+        self.__thread = threading.Thread(
+            target=self.__run,
+            name=f"COMPortReader({ser.port})",
+            daemon=True,
+        )
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
 
     @property
-    def accessed_at(self) -> datetime | None:
-        def latest(x: datetime | None, y: datetime | None):
-            vx = x.timestamp() if x else 0
-            vy = y.timestamp() if y else 0
-            if vx < vy:
-                return y
+    def error(self) -> Exception | None:
+        return self.__error
+
+    @property
+    def queue(self) -> COMPortReceiveQueue:
+        return self.__queue
+
+    def set_recorder(self, recorder: CaptureWriter | None):
+        self.__recorder = recorder
+
+    @property
+    def triggers(self) -> TriggerPipeline | None:
+        return self.__triggers
+
+    def set_triggers(self, triggers: TriggerPipeline | None):
+        self.__triggers = triggers
+
+    def set_latency(self, latency: LatencyTracker | None):
+        self.__latency = latency
+
+    def __run(self):
+        ser = self.__ser
+        while not self.__stop_event.is_set():
+            try:
+                data = ser.read(max(1, ser.in_waiting))
+            except OSError as e:
+                self.__error = e
+                return
+            if not data:
+                continue
+            timestamp_ns = time.perf_counter_ns()
+            self.__stat.on_received(len(data), timestamp_ns)
+            latency = self.__latency
+            if latency is not None:
+                latency.on_received(data, timestamp_ns)
+            recorder = self.__recorder
+            triggers = self.__triggers
+            if triggers is None:
+                if recorder is not None:
+                    recorder.write(DIRECTION_RX, ser.port, data, timestamp_ns)
+                self.__queue.push(data, timestamp_ns)
             else:
-                return x
+                # Only what the triggers let through is recorded and shown
+                for piece_timestamp_ns, piece, offset in triggers.process(data, timestamp_ns):
+                    if recorder is not None:
+                        recorder.write(DIRECTION_RX, ser.port, piece, piece_timestamp_ns)
+                    delivered_offset = self.__queue.n_pushed
+                    if self.__queue.push(piece, piece_timestamp_ns):
+                        triggers.on_delivered(offset, len(piece), delivered_offset)
+            self.__telemetry.on_received(len(data), timestamp_ns, self.__queue.n_available)
+
+
+class COMPortSendJob:
+    # Frames written in order, the whole sequence repeat times, with delay_ns between consecutive frames.
+    # Progress is written by the writer thread only; on_done is called on the writer thread once the job has ended.
+    def __init__(self, frames: list[bytes], delay_ns: int = 0, repeat: int = 1, on_done=None):
+        assert repeat >= 1, repeat
+        self.__frames = tuple(frames)
+        self.__delay_ns = delay_ns
+        self.__repeat = repeat
+        self.__on_done = on_done
+        self.__n_bytes = sum(len(frame) for frame in self.__frames) * repeat
+        self.__n_bytes_sent = 0
+        self.__n_frames_sent = 0
+        self.__sent_at_ns: int | None = None
+        self.__error: Exception | None = None
+        self.__cancel_event = threading.Event()
+        self.__done_event = threading.Event()
 
-        return latest(self.sent_at, self.received_at)
+    @property
+    def frames(self) -> tuple[bytes, ...]:
+        return self.__frames
+
+    @property
+    def delay_ns(self) -> int:
+        return self.__delay_ns
+
+    @property
+    def repeat(self) -> int:
+        return self.__repeat
+
+    @property
+    def n_bytes(self) -> int:
+        return self.__n_bytes
+
+    @property
+    def n_bytes_sent(self) -> int:
+        return self.__n_bytes_sent
+
+    @property
+    def n_frames_sent(self) -> int:
+        return self.__n_frames_sent
+
+    @property
+    def sent_at_ns(self) -> int | None:
+        # When the last frame written so far was completed
+        return self.__sent_at_ns
+
+    @property
+    def error(self) -> Exception | None:
+        return self.__error
+
+    @property
+    def done(self) -> bool:
+        return self.__done_event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancel_event.is_set()
+
+    def cancel(self):
+        self.__cancel_event.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self.__done_event.wait(timeout)
+
+    def wait_cancelled(self, timeout: float) -> bool:
+        return self.__cancel_event.wait(timeout)
+
+    def on_written(self, n: int):
+        self.__n_bytes_sent += n
+
+    def on_frame_sent(self, timestamp_ns: int):
+        self.__n_frames_sent += 1
+        self.__sent_at_ns = timestamp_ns
+
+    def finish(self, error: Exception | None):
+        self.__error = error
+        self.__done_event.set()
+        if self.__on_done is not None:
+            try:
+                self.__on_done(self)
+            except Exception:
+                traceback.print_exc()
+
+
+class COMPortWriter:
+    # Owns the writes of one open port so that a slow or stalled port never blocks the GUI thread.
+    # Jobs are written one after another in slices of about SLICE_SEC at the current baudrate, so a cancel or
+    # a close takes effect quickly and write_timeout only expires on a port that really stalls.
+    # While capacity bytes or more are still to be written, new jobs are refused with COMPortBusyError.
+    DEFAULT_CAPACITY = 1024 * 1024
+    WRITE_TIMEOUT = 2.0
+    SLICE_SEC = 0.05
+    MIN_SLICE_SIZE = 16
+    MAX_SLICE_SIZE = 64 * 1024
+
+    def __init__(self, ser: Serial, conn: "COMPortConnection", stat: COMPortStat, telemetry: COMPortTelemetry,
+                 capacity: int = DEFAULT_CAPACITY):
+        self.__ser = ser
+        self.__conn = conn
+        self.__stat = stat
+        self.__telemetry = telemetry
+        self.__capacity = capacity
+        self.__latency: LatencyTracker | None = None
+        self.__cond = threading.Condition()
+        self.__jobs: collections.deque[COMPortSendJob] = collections.deque()  # the first one is being written
+        self.__stopped = False
+        self.__thread = threading.Thread(
+            target=self.__run,
+            name=f"COMPortWriter({ser.port})",
+            daemon=True,
+        )
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        with self.__cond:
+            self.__stopped = True
+            jobs = list(self.__jobs)
+            self.__cond.notify()
+        for job in jobs:
+            job.cancel()
+        # Wakes a write blocked on a stalled port where pyserial supports it
+        cancel_write = getattr(self.__ser, "cancel_write", None)
+        if cancel_write is not None:
+            try:
+                cancel_write()
+            except OSError:
+                pass
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def __n_pending(self) -> int:
+        return sum(job.n_bytes - job.n_bytes_sent for job in self.__jobs)
+
+    @property
+    def n_pending(self) -> int:
+        # Bytes queued or being written, repeats included
+        with self.__cond:
+            return self.__n_pending()
+
+    @property
+    def n_jobs(self) -> int:
+        return len(self.__jobs)
+
+    def submit(self, job: COMPortSendJob):
+        with self.__cond:
+            if self.__stopped:
+                raise COMPortClosedError()
+            if self.__n_pending() >= self.__capacity:
+                raise COMPortBusyError()
+            self.__jobs.append(job)
+            self.__cond.notify()
+
+    def set_latency(self, latency: LatencyTracker | None):
+        self.__latency = latency
+
+    def cancel_all(self):
+        with self.__cond:
+            jobs = list(self.__jobs)
+        for job in jobs:
+            job.cancel()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                while not self.__jobs and not self.__stopped:
+                    self.__cond.wait()
+                if self.__stopped:
+                    break
+                job = self.__jobs[0]
+            error = self.__write_job(job)
+            latency = self.__latency
+            if error is not None and latency is not None:
+                latency.on_send_failed()
+            with self.__cond:
+                self.__jobs.popleft()
+            job.finish(error)
+
+        # Jobs still queued when the port was closed
+        with self.__cond:
+            jobs, self.__jobs = list(self.__jobs), collections.deque()
+        for job in jobs:
+            job.finish(COMPortClosedError())
+
+    def __write_job(self, job: COMPortSendJob) -> Exception | None:
+        ser = self.__ser
+        # About 10 bits go over the line per byte
+        slice_size = min(self.MAX_SLICE_SIZE, max(self.MIN_SLICE_SIZE, int(ser.baudrate * self.SLICE_SEC / 10)))
+        delay_sec = job.delay_ns / 1e9
+        for i in range(job.repeat):
+            for j, frame in enumerate(job.frames):
+                if delay_sec and (i or j):
+                    job.wait_cancelled(delay_sec)
+                latency = self.__latency
+                if latency is not None:
+                    latency.on_send_started(frame, time.perf_counter_ns())
+                for start in range(0, len(frame), slice_size):
+                    if job.cancelled:
+                        return COMPortClosedError() if self.__stopped else COMPortCancelledError()
+                    part = frame[start:start + slice_size]
+                    issued_at_ns = time.perf_counter_ns()
+                    try:
+                        n_sent = ser.write(part)
+                    except SerialTimeoutException as e:
+                        return COMPortTimeoutError(str(e))
+                    except OSError as e:
+                        return COMPortOSError(str(e))
+                    timestamp_ns = time.perf_counter_ns()
+                    if n_sent is None:
+                        n_sent = len(part)
+                    self.__stat.on_sent(n_sent, timestamp_ns)
+                    self.__telemetry.on_sent(n_sent, timestamp_ns)
+                    recorder = self.__conn.recorder
+                    if recorder is not None:
+                        recorder.write(DIRECTION_TX, self.__conn.device_name, part[:n_sent], timestamp_ns)
+                    job.on_written(n_sent)
+                job.on_frame_sent(time.perf_counter_ns())
+                if latency is not None and frame:
+                    # write() may return well after the driver took the bytes (pyserial waits for room in its
+                    # buffer, which on a pty means until the other end has read), so a reply is timed from the call
+                    latency.on_sent(issued_at_ns)
+        return None
 
 
 class COMPortConnection:
     def __init__(self, device_name):
         self.__device_name = device_name
         self.__ser: Serial | None = None
-        self.__stat = COMPortStat.create_instance()
+        self.__reader: COMPortReader | None = None
+        self.__writer: COMPortWriter | None = None
+        self.__io: COMPortIO | None = None
+        self.__recorder: CaptureWriter | None = None
+        self.__trigger_config: TriggerConfig | None = None
+        self.__latency: LatencyTracker | None = None
+        self.__stat = COMPortStat()
+        self.__telemetry = COMPortTelemetry()
 
     @property
     def device_name(self):
         return self.__device_name
 
+    @property
+    def recorder(self) -> CaptureWriter | None:
+        return self.__recorder
+
+    def set_recorder(self, recorder: CaptureWriter | None):
+        self.__recorder = recorder
+        if self.__reader is not None:
+            self.__reader.set_recorder(recorder)
+
+    @property
+    def triggers(self) -> TriggerPipeline | None:
+        return self.__reader.triggers if self.__reader is not None else None
+
+    def set_triggers(self, config: TriggerConfig | None):
+        # Rules start over with fresh counts and an empty pre-trigger ring on every change and every open
+        self.__trigger_config = config if config is not None and config.rules else None
+        if self.__reader is not None:
+            self.__reader.set_triggers(self.__create_triggers())
+
+    @property
+    def latency(self) -> LatencyTracker | None:
+        return self.__latency
+
+    def set_latency(self, config: LatencyConfig | None):
+        # Measuring starts over on every change; the results are kept across reopening the port
+        self.__latency = config.create_tracker() if config is not None else None
+        if self.__reader is not None:
+            self.__reader.set_latency(self.__latency)
+            self.__writer.set_latency(self.__latency)
+
+    def __create_triggers(self) -> TriggerPipeline | None:
+        if self.__trigger_config is None:
+            return None
+        return self.__trigger_config.create_pipeline()
+
     def open(self, **pyserial_params):
         assert self.__ser is None
+        pyserial_params.setdefault("timeout", COMPortReader.READ_TIMEOUT)
+        pyserial_params.setdefault("write_timeout", COMPortWriter.WRITE_TIMEOUT)
         try:
-            self.__ser = Serial(self.__device_name, **pyserial_params)
+            # serial_for_url opens plain device names as well as loop://, socket:// and other URLs
+            self.__ser = serial_for_url(self.__device_name, **pyserial_params)
         except SerialException as e:
             print(e, file=sys.stderr)
             self.__ser = None
         else:
-            with self.__stat as stat:
-                stat.created_at = datetime.now()
+            self.__stat.on_opened(time.perf_counter_ns())
+            queue = COMPortReceiveQueue()
+            self.__telemetry = COMPortTelemetry(queue.capacity)
+            self.__reader = COMPortReader(self.__ser, self.__stat, queue, self.__telemetry)
+            self.__reader.set_recorder(self.__recorder)
+            self.__reader.set_triggers(self.__create_triggers())
+            self.__reader.set_latency(self.__latency)
+            self.__reader.start()
+            self.__writer = COMPortWriter(self.__ser, self, self.__stat, self.__telemetry)
+            self.__writer.set_latency(self.__latency)
+            self.__writer.start()
+            self.__io = COMPortIO(self.__ser, self.__reader, self.__writer)
 
     def close(self):
         assert self.__ser is not None
+        self.__io = None
+        self.__writer.stop()
+        self.__writer = None
+        self.__reader.stop()
+        self.__reader = None
         self.__ser.close()
         self.__ser = None
-        with self.__stat as stat:
-            stat.created_at = None
+        self.__stat.on_opened(None)
 
     @property
     def alive(self):
@@ -101,8 +769,19 @@ class COMPortConnection:
             return False
 
     @property
-    def io(self):
-        return COMPortIO(self, self.__ser, self.__stat)
+    def io(self) -> "COMPortIO":
+        # Built once per open; a closed connection gets an IO that raises COMPortClosedError
+        if self.__io is None:
+            return COMPortIO(None, None, None)
+        return self.__io
+
+    @property
+    def telemetry(self) -> COMPortTelemetry:
+        return self.__telemetry
+
+    @property
+    def info_version(self) -> int:
+        return self.__stat.version
 
     @property
     def info(self) -> dict | None:
@@ -127,46 +806,87 @@ class COMPortClosedError(COMPortIOError):
     pass
 
 
+class COMPortBusyError(COMPortIOError):
+    # Too many bytes are still waiting to be written
+    pass
+
+
+class COMPortTimeoutError(COMPortIOError):
+    # The port did not take the bytes within write_timeout
+    pass
+
+
+class COMPortCancelledError(COMPortIOError):
+    pass
+
+
 class COMPortIO:
-    def __init__(self, conn: "COMPortConnection", ser: Serial, stat: COMPortStat):
-        self.__conn = conn
+    def __init__(self, ser: Serial | None, reader: COMPortReader | None, writer: COMPortWriter | None):
         self.__ser = ser
-        self.__stat = stat
+        self.__reader = reader
+        self.__writer = writer
+
+    def __get_writer(self) -> COMPortWriter:
+        if not self.__ser or self.__writer is None:
+            raise COMPortClosedError()
+        return self.__writer
+
+    def send_async(self, frames: list[bytes], delay_ns: int = 0, repeat: int = 1, on_done=None) -> COMPortSendJob:
+        # Queues the frames for the writer thread and returns at once; on_done(job) is called on the writer thread
+        job = COMPortSendJob(frames, delay_ns, repeat, on_done)
+        self.__get_writer().submit(job)
+        return job
 
     def send_bytes(self, values: bytes) -> None:
-        if self.__ser:
-            try:
-                n_sent = self.__ser.write(values)
-                with self.__stat as stat:
-                    stat.sent_at = datetime.now()
-                    stat.total_n_sent += n_sent
-            except OSError:
-                raise COMPortOSError()
-            else:
-                return
-        else:
+        # Blocks until the writer thread has written values
+        job = self.send_async([values])
+        job.wait()
+        if job.error is not None:
+            raise job.error
+
+    def cancel_sends(self):
+        self.__get_writer().cancel_all()
+
+    @property
+    def n_send_pending(self) -> int:
+        return self.__get_writer().n_pending
+
+    @property
+    def send_capacity(self) -> int:
+        return self.__get_writer().capacity
+
+    def __get_queue(self) -> COMPortReceiveQueue:
+        if not self.__ser or self.__reader is None:
             raise COMPortClosedError()
+        queue = self.__reader.queue
+        # Deliver what was read before the reader failed, then report the failure
+        if self.__reader.error is not None and not queue.n_available:
+            raise COMPortOSError() from self.__reader.error
+        return queue
 
     def receive_bytes(self, size) -> bytes:
-        if self.__ser:
-            try:
-                data = self.__ser.read(size)
-                with self.__stat as stat:
-                    stat.received_at = datetime.now()
-                    stat.total_n_received += len(data)
-            except OSError:
-                raise COMPortOSError()
-            else:
-                return data
-        else:
-            raise COMPortClosedError()
+        # Bytes are read by the connection's reader thread; this only drains what it has queued
+        return self.__get_queue().pop(size)
+
+    def receive_chunks(self) -> list[tuple[int, bytes]]:
+        return self.__get_queue().pop_chunks()
+
+    def receive_highlights(self) -> list[tuple[int, int]]:
+        # [start, end) ranges the triggers want highlighted, in n_received offsets; some may be received later
+        triggers = self.__reader.triggers if self.__reader is not None else None
+        if triggers is None:
+            return []
+        return triggers.pop_highlights()
+
+    @property
+    def n_received(self) -> int:
+        # Stream offset of the next byte receive_chunks() returns
+        return self.__get_queue().n_popped
 
     @property
     def n_available(self) -> int:
-        if self.__ser:
-            try:
-                return self.__ser.in_waiting
-            except OSError:
-                raise COMPortOSError()
-        else:
-            raise COMPortClosedError()
+        return self.__get_queue().n_available
+
+    @property
+    def n_dropped(self) -> int:
+        return self.__get_queue().n_dropped
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_config import RenderConfig, ScrollbackConfig
+
+
+def write_ini(tmp_path, text: str) -> str:
+    path = tmp_path / "SerialAnalyzer.ini"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_render_blank_values_keep_defaults(tmp_path):
+    path = write_ini(tmp_path, "[render]\nfps =\nadaptive =\n")
+    assert RenderConfig.load(path) == RenderConfig.default()
+
+
+def test_render_garbage_values_keep_defaults(tmp_path):
+    path = write_ini(tmp_path, "[render]\nfps = fast\nadaptive = maybe\n")
+    assert RenderConfig.load(path) == RenderConfig.default()
+
+
+def test_render_valid_values(tmp_path):
+    path = write_ini(tmp_path, "[render]\nfps = 60\nadaptive = no\n")
+    assert RenderConfig.load(path) == RenderConfig(fps=60, adaptive=False)
+
+
+def test_scrollback_blank_and_garbage_values(tmp_path):
+    path = write_ini(tmp_path, "[scrollback]\nmax_lines =\nmax_bytes = lots\n")
+    config = ScrollbackConfig.load(path)
+    assert config.max_lines is None
+    assert config.max_bytes == ScrollbackConfig.default().max_bytes
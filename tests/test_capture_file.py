@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_file import CaptureFormatError, CaptureReader, CaptureWriter, DIRECTION_RX, DIRECTION_TX
+
+
+def write_capture(path, records):
+    writer = CaptureWriter(str(path))
+    for direction, port, data, timestamp_ns in records:
+        writer.write(direction, port, data, timestamp_ns)
+    writer.close()
+
+
+def test_close_with_retained_record(tmp_path):
+    path = tmp_path / "a.sacap"
+    write_capture(path, [(DIRECTION_RX, "COM1", b"hello", 100)])
+    reader = CaptureReader(str(path))
+    record = next(reader.records())
+    reader.close()
+    assert record.data == b"hello"
+    os.remove(path)
+
+
+def test_bad_magic_is_rejected(tmp_path):
+    path = tmp_path / "bad.sacap"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(CaptureFormatError):
+        CaptureReader(str(path))
+    os.remove(path)
+
+
+def test_interleaved_ports_stay_in_time_order(tmp_path):
+    # COM2 took its timestamp before COM1 but won the writer lock after it
+    path = tmp_path / "b.sacap"
+    write_capture(path, [
+        (DIRECTION_RX, "COM1", b"a", 1000),
+        (DIRECTION_RX, "COM1", b"b", 3000),
+        (DIRECTION_TX, "COM2", b"c", 2000),
+        (DIRECTION_RX, "COM1", b"d", 4000),
+    ])
+    with CaptureReader(str(path)) as reader:
+        records = list(reader.records())
+        timestamps = [r.timestamp_ns for r in records]
+        assert timestamps == sorted(timestamps)
+        assert [r.port for r in records] == ["COM1", "COM1", "COM2", "COM1"]
+        for t in (0, 1500, 2500, 3000, 3500, 5000):
+            offset = reader.seek_time(t)
+            assert all(r.timestamp_ns < t for r in records if r.offset < offset)
+            assert all(r.timestamp_ns >= t for r in records if r.offset >= offset)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import COMPortSet
+
+
+def test_remove_url_keeps_scanned_device():
+    ports = COMPortSet()
+    ports.update_connection_state(["/dev/ttyUSB0"])
+    ports.add_url("/dev/ttyUSB0")
+    ports.add_url("loop://")
+
+    ports.remove_url("/dev/ttyUSB0")
+    ports.remove_url("loop://")
+
+    assert ports.name_list == ["/dev/ttyUSB0"]
+    assert ports.url_list == []
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+from app_config import RenderConfig
+from capture_store import SessionBuffer
+from widget_logging_field import RenderScheduler
+
+app = QApplication.instance() or QApplication([])
+
+
+def make_session(n_bytes: int) -> SessionBuffer:
+    buf = SessionBuffer()
+    buf.append_bytes(b"x" * n_bytes)
+    return buf
+
+
+def run_frame(scheduler: RenderScheduler, n_bytes: int = 16):
+    scheduler.push(make_session(n_bytes))
+    scheduler.flush()
+    QTest.qWait(1)
+
+
+def test_interval_follows_frame_cost():
+    scheduler = RenderScheduler(RenderConfig(fps=60, adaptive=True))
+    base = scheduler.interval
+    cost = {"ms": 40}
+    # Like a repaint, the cost is paid after the signal returns
+    scheduler.sessions_ready.connect(
+        lambda sessions: QTimer.singleShot(0, lambda: time.sleep(cost["ms"] / 1000)))
+
+    for _ in range(3):
+        run_frame(scheduler)
+    assert scheduler.interval > base
+
+    cost["ms"] = 0
+    for _ in range(10):
+        run_frame(scheduler)
+    assert scheduler.interval == base
+
+
+def test_interval_follows_backlog():
+    scheduler = RenderScheduler(RenderConfig(fps=60, adaptive=True))
+    base = scheduler.interval
+    # Data keeps arriving while the view is busy with the frame
+    backlog = {"bytes": RenderScheduler.BACKLOG_BYTES + 1}
+    scheduler.sessions_ready.connect(lambda sessions: scheduler.push(make_session(backlog["bytes"])))
+
+    run_frame(scheduler)
+    assert scheduler.interval > base
+
+    backlog["bytes"] = 16
+    for _ in range(10):
+        run_frame(scheduler)
+    assert scheduler.interval == base
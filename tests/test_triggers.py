@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from triggers import TriggerConfig, TriggerRule, RULE_HEX, RULE_REGEX, ACTION_START, ACTION_STOP
+
+
+def run(config: TriggerConfig, chunks: list[bytes]) -> list[tuple[bytes, int]]:
+    pipeline = config.create_pipeline()
+    pieces = []
+    for i, chunk in enumerate(chunks):
+        pieces += [(piece, offset) for _, piece, offset in pipeline.process(chunk, i)]
+    return pieces
+
+
+def assert_consistent(pieces: list[tuple[bytes, int]], data: bytes):
+    # Every piece is the raw bytes at its offset, and pieces never overlap or go back
+    end = 0
+    for piece, offset in pieces:
+        assert piece
+        assert offset >= end
+        assert data[offset:offset + len(piece)] == piece
+        end = offset + len(piece)
+
+
+def test_regex_start_on_line_from_earlier_chunk():
+    # The match ends before the bytes already consumed, and so does its post-trigger window
+    config = TriggerConfig((TriggerRule(RULE_REGEX, "ERROR", ACTION_START),), 64, 2)
+    chunks = [b"xxERROR abc", b"defghijklmnop\n", b"zz"]
+    pieces = run(config, chunks)
+    assert pieces == [(b"xxERROR abc", 0)]
+
+
+def test_regex_start_window_reaches_past_line():
+    config = TriggerConfig((TriggerRule(RULE_REGEX, "ERROR", ACTION_START),), 64, 20)
+    chunks = [b"xxERROR abc", b"defghijklmnop\n", b"zzzzzzzzzz"]
+    pieces = run(config, chunks)
+    assert pieces == [(b"xxERROR abc", 0), (b"defghijklmnop\n", 11), (b"zz", 25)]
+
+
+def test_random_chunk_boundaries():
+    rnd = random.Random(0)
+    lines = [rnd.choice([b"ERROR x\n", b"info " * rnd.randint(1, 20) + b"\n", b"STOP\n"]) for _ in range(500)]
+    data = b"".join(lines)
+    for rules in [
+        (TriggerRule(RULE_REGEX, "^ERROR", ACTION_START),),
+        (TriggerRule(RULE_HEX, "4552524f52", ACTION_START),),
+        (TriggerRule(RULE_REGEX, "ERROR", ACTION_START), TriggerRule(RULE_HEX, "53544f50", ACTION_STOP)),
+    ]:
+        for pre, post in [(0, 0), (16, 4), (64, 1), (7, 100)]:
+            for _ in range(20):
+                cuts = sorted(rnd.sample(range(1, len(data)), 40))
+                chunks = [data[i:j] for i, j in zip([0] + cuts, cuts + [len(data)])]
+                assert_consistent(run(TriggerConfig(rules, pre, post), chunks), data)
@@ -0,0 +1,299 @@
+# Match rules evaluated by the reader thread on every received chunk; Qt-free like framing
+import collections
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+
+RULE_HEX = "hex"
+RULE_REGEX = "regex"
+RULE_RATE = "rate"
+
+ACTION_HIGHLIGHT = "highlight"
+ACTION_COUNT = "count"
+ACTION_START = "start"
+ACTION_STOP = "stop"
+
+
+class Matcher(ABC):
+    # Reports the matches completed by each chunk as [start, end) offsets of the raw received stream
+    @abstractmethod
+    def feed(self, data: bytes, timestamp_ns: int, offset: int) -> list[tuple[int, int]]:
+        raise NotImplementedError()
+
+
+class HexMatcher(Matcher):
+    def __init__(self, literal: bytes):
+        assert literal
+        self.__literal = literal
+        self.__tail = b""  # last len(literal) - 1 bytes, in which a match may begin
+        self.__after = 0  # matches do not overlap
+
+    def feed(self, data: bytes, timestamp_ns: int, offset: int) -> list[tuple[int, int]]:
+        literal = self.__literal
+        data = self.__tail + data
+        base = offset - len(self.__tail)
+        matches = []
+        i = data.find(literal, max(0, self.__after - base))
+        while i >= 0:
+            matches.append((base + i, base + i + len(literal)))
+            i = data.find(literal, i + len(literal))
+        if matches:
+            self.__after = matches[-1][1]
+        self.__tail = data[len(data) - len(literal) + 1:] if len(literal) > 1 else b""
+        return matches
+
+
+class RegexLineMatcher(Matcher):
+    # Runs the regex on each line; a line longer than MAX_LINE_SIZE is cut there like a framed message
+    MAX_LINE_SIZE = 64 * 1024
+
+    def __init__(self, regex: re.Pattern):
+        self.__regex = regex
+        self.__line = bytearray()
+        self.__line_start = 0
+
+    def __match_line(self, matches: list[tuple[int, int]]):
+        match = self.__regex.search(self.__line.rstrip(b"\r\n"))
+        if match is not None:
+            if match.end() > match.start():
+                matches.append((self.__line_start + match.start(), self.__line_start + match.end()))
+            else:
+                matches.append((self.__line_start, self.__line_start + len(self.__line)))
+        self.__line_start += len(self.__line)
+        self.__line.clear()
+
+    def feed(self, data: bytes, timestamp_ns: int, offset: int) -> list[tuple[int, int]]:
+        matches = []
+        start = 0
+        while start < len(data):
+            i = data.find(b"\n", start, start + self.MAX_LINE_SIZE - len(self.__line))
+            if i < 0:
+                stop = min(len(data), start + self.MAX_LINE_SIZE - len(self.__line))
+                self.__line += data[start:stop]
+                start = stop
+                if len(self.__line) >= self.MAX_LINE_SIZE:
+                    self.__match_line(matches)
+                continue
+            self.__line += data[start:i + 1]
+            start = i + 1
+            self.__match_line(matches)
+        return matches
+
+
+class RateMatcher(Matcher):
+    # Matches the chunk with which the rate over the last WINDOW_NS rises above the threshold;
+    # it matches again only after the rate has fallen below the threshold
+    WINDOW_NS = 1_000_000_000
+
+    def __init__(self, bytes_per_sec: float):
+        self.__threshold = bytes_per_sec * self.WINDOW_NS / 1e9
+        self.__chunks: collections.deque[tuple[int, int]] = collections.deque()  # (timestamp, size)
+        self.__total = 0
+        self.__above = False
+
+    def feed(self, data: bytes, timestamp_ns: int, offset: int) -> list[tuple[int, int]]:
+        chunks = self.__chunks
+        chunks.append((timestamp_ns, len(data)))
+        self.__total += len(data)
+        while chunks[0][0] <= timestamp_ns - self.WINDOW_NS:
+            self.__total -= chunks.popleft()[1]
+
+        above = self.__total > self.__threshold
+        rising = above and not self.__above
+        self.__above = above
+        return [(offset, offset + len(data))] if rising else []
+
+
+def create_matcher(kind: str, pattern: str) -> Matcher:
+    # pattern is hex bytes for RULE_HEX, a regex for RULE_REGEX, bytes/s for RULE_RATE;
+    # ValueError tells what is wrong with it
+    if kind == RULE_HEX:
+        literal = bytes.fromhex(pattern)
+        if not literal:
+            raise ValueError("empty pattern")
+        return HexMatcher(literal)
+    elif kind == RULE_REGEX:
+        try:
+            return RegexLineMatcher(re.compile(pattern.encode("utf-8")))
+        except re.error as e:
+            raise ValueError(str(e))
+    elif kind == RULE_RATE:
+        bytes_per_sec = float(pattern)
+        if bytes_per_sec < 0:
+            raise ValueError("negative rate")
+        return RateMatcher(bytes_per_sec)
+    else:
+        assert False, kind
+
+
+@dataclass(frozen=True)
+class TriggerRule:
+    kind: str
+    pattern: str
+    action: str
+
+    def create_matcher(self) -> Matcher:
+        return create_matcher(self.kind, self.pattern)
+
+
+@dataclass(frozen=True)
+class TriggerConfig:
+    rules: tuple[TriggerRule, ...]
+    pre_bytes: int
+    post_bytes: int
+
+    @classmethod
+    def default(cls):
+        return cls(
+            rules=(),
+            pre_bytes=4096,
+            post_bytes=4096,
+        )
+
+    def replace(self, key, value):
+        items = {key: getattr(self, key) for key in asdict(self)}
+        items[key] = value
+        return type(self)(**items)
+
+    @property
+    def gated(self) -> bool:
+        return any(rule.action == ACTION_START for rule in self.rules)
+
+    def create_pipeline(self) -> "TriggerPipeline":
+        return TriggerPipeline(self)
+
+
+class TriggerPipeline:
+    # Runs the rules on the reader thread and decides which received bytes are delivered.
+    # Without a start rule every byte is delivered. With one, bytes are held in a pre-trigger ring of
+    # pre_bytes until a start rule matches; then the ring and everything up to post_bytes after the last
+    # start match (or up to a stop match if post_bytes is 0) is delivered, and the rest is discarded.
+    # Match counts are written by the reader only; highlighted ranges are handed to the consumer in
+    # offsets of the delivered stream, once the bytes holding them have been delivered.
+    MAX_PENDING_HIGHLIGHTS = 10_000
+
+    def __init__(self, config: TriggerConfig):
+        self.__config = config
+        self.__matchers = [rule.create_matcher() for rule in config.rules]
+        self.__counts = [0] * len(config.rules)
+        self.__n_read = 0  # raw stream offset of the next byte
+        self.__n_discarded = 0
+
+        self.__capturing = not config.gated
+        self.__capture_until: int | None = None  # raw offset where capturing ends, None for no limit
+        self.__ring: collections.deque[tuple[int, bytes, int]] = collections.deque()  # (timestamp, bytes, raw offset)
+        self.__ring_size = 0
+
+        self.__highlights: list[tuple[int, int]] = []  # raw ranges that are not delivered yet
+        self.__delivered: collections.deque[tuple[int, int]] = collections.deque(
+            maxlen=self.MAX_PENDING_HIGHLIGHTS)  # delivered ranges the consumer has not taken
+
+    @property
+    def config(self) -> TriggerConfig:
+        return self.__config
+
+    @property
+    def counts(self) -> list[int]:
+        return list(self.__counts)
+
+    @property
+    def capturing(self) -> bool:
+        return self.__capturing
+
+    @property
+    def n_discarded(self) -> int:
+        return self.__n_discarded
+
+    def __hold(self, timestamp_ns: int, data: bytes, offset: int):
+        self.__ring.append((timestamp_ns, data, offset))
+        self.__ring_size += len(data)
+        while self.__ring and self.__ring_size - len(self.__ring[0][1]) >= self.__config.pre_bytes:
+            _, old, _ = self.__ring.popleft()
+            self.__ring_size -= len(old)
+            self.__n_discarded += len(old)
+        # Trim the oldest chunk so the ring holds pre_bytes exactly
+        excess = self.__ring_size - self.__config.pre_bytes
+        if excess > 0:
+            timestamp_ns, old, offset = self.__ring[0]
+            self.__ring[0] = timestamp_ns, old[excess:], offset + excess
+            self.__ring_size -= excess
+            self.__n_discarded += excess
+
+    def __consume(self, data: bytes, timestamp_ns: int, offset: int, stop: int,
+                  pieces: list[tuple[int, bytes, int]]):
+        # Delivers or holds the bytes of data from the last consumed raw offset up to stop
+        start = self.__n_read
+        while start < stop:
+            if self.__capturing:
+                end = stop if self.__capture_until is None else min(stop, self.__capture_until)
+                if end <= start:
+                    # The post-trigger window closed before these bytes
+                    self.__capturing = False
+                    continue
+                pieces.append((timestamp_ns, data[start - offset:end - offset], start))
+                if end == self.__capture_until:
+                    self.__capturing = False
+            else:
+                end = stop
+                self.__hold(timestamp_ns, data[start - offset:end - offset], start)
+            start = end
+        self.__n_read = start
+
+    def process(self, data: bytes, timestamp_ns: int) -> list[tuple[int, bytes, int]]:
+        # Pieces to deliver as (timestamp, bytes, raw offset), in stream order
+        offset = self.__n_read
+        # Highlights in bytes that were dropped or left the ring will never be delivered
+        head = self.__ring[0][2] if self.__ring else offset
+        self.__highlights = [match for match in self.__highlights if match[1] > head]
+
+        matches = []
+        for i, matcher in enumerate(self.__matchers):
+            matches += [(end, start, i) for start, end in matcher.feed(data, timestamp_ns, offset)]
+        matches.sort()
+
+        pieces = []
+        gated = self.__config.gated
+        for end, start, i in matches:
+            self.__counts[i] += 1
+            # A regex match on a line that began in an earlier chunk may end before the bytes already consumed
+            consume_end = max(end, self.__n_read)
+            action = self.__config.rules[i].action
+            if action == ACTION_HIGHLIGHT:
+                self.__highlights.append((start, end))
+            elif action == ACTION_START:
+                self.__consume(data, timestamp_ns, offset, consume_end, pieces)
+                if not self.__capturing:
+                    pieces += self.__ring
+                    self.__ring.clear()
+                    self.__ring_size = 0
+                    self.__capturing = True
+                post_bytes = self.__config.post_bytes
+                self.__capture_until = max(end + post_bytes, self.__n_read) if post_bytes else None
+            elif action == ACTION_STOP and gated and self.__capturing:
+                self.__consume(data, timestamp_ns, offset, consume_end, pieces)
+                self.__capturing = False
+        self.__consume(data, timestamp_ns, offset, offset + len(data), pieces)
+        return pieces
+
+    def on_delivered(self, offset: int, size: int, delivered_offset: int):
+        # The piece at raw offset was delivered at delivered_offset of the consumer's stream
+        stop = offset + size
+        remaining = []
+        for start, end in self.__highlights:
+            if start < stop and offset < end:
+                self.__delivered.append((
+                    delivered_offset + max(start, offset) - offset,
+                    delivered_offset + min(end, stop) - offset,
+                ))
+            if end > stop:
+                remaining.append((start, end))
+        self.__highlights = remaining
+
+    def pop_highlights(self) -> list[tuple[int, int]]:
+        # Delivered ranges to highlight, called by the consumer only
+        ranges = []
+        while True:
+            try:
+                ranges.append(self.__delivered.popleft())
+            except IndexError:
+                return ranges
@@ -5,25 +5,11 @@ from enum import Enum
 
 from PyQt5.QtWidgets import QMainWindow, QApplication
 
+from capture_file import CaptureWriter
+from formatting import decode_ascii
+from latency import LatencyConfig, LatencySnapshot
 from serial_core import *
-
-
-def decode_ascii(values: bytes | list[int], replace_error=None, enable_spaces=False):
-    if not isinstance(values, list):
-        values = list(values)
-    assert isinstance(values, list)
-    for i in range(len(values)):
-        value = values[i]
-        if enable_spaces:
-            error = 0x7d < value
-        else:
-            error = value < 0x20 or 0x7d < value
-        if error:
-            if replace_error is not None:
-                values[i] = None
-            else:
-                raise ValueError()
-    return "".join(replace_error if value is None else chr(value) for value in values)
+from triggers import TriggerConfig
 
 
 def find_main_window() -> QMainWindow | None:
@@ -116,19 +102,81 @@ class COMPort:
         info["state"] = str(self.state.value)
         return info
 
+    @property
+    def info_version(self) -> tuple:
+        # Equal values mean serial_info would be the same, without building it
+        return self.state, self.__conn.info_version
+
     @property
     def io(self):
         return self.__conn.io
 
+    @property
+    def telemetry(self):
+        return self.__conn.telemetry
+
+    def set_recorder(self, recorder: CaptureWriter | None):
+        self.__conn.set_recorder(recorder)
+
+    @property
+    def triggers(self):
+        return self.__conn.triggers
+
+    def set_triggers(self, config: TriggerConfig):
+        self.__conn.set_triggers(config)
+
+    @property
+    def latency(self):
+        return self.__conn.latency
+
+    def set_latency(self, config: LatencyConfig | None):
+        self.__conn.set_latency(config)
+
     def __repr__(self):
         return f"<COMPort {self.serial_info}>"
 
 
 class COMPortSet:
+    # Registry of the devices found by the last scan plus the URLs added by the user, indexed by name
     def __init__(self):
-        names = [f"COM{i}" for i in range(1, 20 + 1)]
-        self.__ports: dict[str, COMPort] = {name: COMPort(name) for name in names}
+        self.__ports: dict[str, COMPort] = {}
+        self.__urls: set[str] = set()
+        self.__scanned: set[str] = set()  # device names reported by the last scan
+        self.__open: dict[str, COMPort] = {}  # open ports in activation order
+        self.__active: COMPort | None = None  # the primary port used by the sender and the details panel
         self.__params: COMPortParameters = COMPortParameters.default()
+        self.__recorder: CaptureWriter | None = None
+        self.__trigger_config: TriggerConfig = TriggerConfig.default()
+        self.__latency_config: LatencyConfig | None = None  # None while not measuring
+
+    def __register(self, name: str) -> COMPort:
+        port = COMPort(name)
+        port.set_recorder(self.__recorder)
+        port.set_triggers(self.__trigger_config)
+        port.set_latency(self.__latency_config)
+        self.__ports[name] = port
+        return port
+
+    @property
+    def url_list(self) -> list[str]:
+        return [name for name in self.__ports if name in self.__urls]
+
+    def add_url(self, url: str):
+        # Any name pyserial can open (loop://, socket://host:port, a device path the scan does not list)
+        self.__urls.add(url)
+        port = self.__ports.get(url) or self.__register(url)
+        port._set_connected(True)
+
+    def remove_url(self, url: str):
+        if url not in self.__urls:
+            return
+        self.__urls.discard(url)
+        if url in self.__scanned:
+            # Also a scanned device, which stays listed as long as the scan reports it
+            return
+        port = self.__ports.pop(url)
+        port._set_connected(False)
+        self.__forget(url)
 
     @property
     def parameters(self) -> COMPortParameters:
@@ -136,15 +184,69 @@ class COMPortSet:
 
     def set_params_and_reopen(self, params: COMPortParameters):
         self.__params = params
-        if self.has_active():
-            active_port_name = self.active_port_name
-            self.activate_one(None)
-            self.activate_one(active_port_name)
+        primary_name = self.active_port_name if self.has_active() else None
+        for name in list(self.__open):
+            self.deactivate(name)
+            self.activate(name)
+        if primary_name is not None and primary_name in self.__open:
+            self.__active = self.__open[primary_name]
+
+    def set_recorder(self, recorder: CaptureWriter | None):
+        self.__recorder = recorder
+        for port in self.__ports.values():
+            port.set_recorder(recorder)
+
+    @property
+    def trigger_config(self) -> TriggerConfig:
+        return self.__trigger_config
 
-    def update_connection_state(self):
-        device_name_list = list_device_names()
+    def set_triggers(self, config: TriggerConfig):
+        self.__trigger_config = config
         for port in self.__ports.values():
-            port.update_connection_state(device_name_list)
+            port.set_triggers(config)
+
+    def trigger_counts(self) -> list[int]:
+        # Matches of each rule summed over the open ports
+        counts = [0] * len(self.__trigger_config.rules)
+        for port in self.__open.values():
+            triggers = port.triggers
+            if triggers is not None and triggers.config == self.__trigger_config:
+                counts = [a + b for a, b in zip(counts, triggers.counts)]
+        return counts
+
+    @property
+    def latency_config(self) -> LatencyConfig | None:
+        return self.__latency_config
+
+    def set_latency(self, config: LatencyConfig | None):
+        # Also clears the results measured so far
+        self.__latency_config = config
+        for port in self.__ports.values():
+            port.set_latency(config)
+
+    def latency_snapshots(self) -> list[tuple[str, LatencySnapshot]]:
+        # (port name, results of one command) of every port that has sent something while measuring
+        rows = []
+        for name, port in self.__ports.items():
+            latency = port.latency
+            if latency is not None:
+                rows += [(name, snapshot) for snapshot in latency.snapshot()]
+        return rows
+
+    def update_connection_state(self, device_names=None):
+        device_name_set = set(list_device_names() if device_names is None else device_names)
+        self.__scanned = device_name_set
+        for name in sorted(device_name_set - self.__ports.keys()):
+            self.__register(name)
+        for name, port in list(self.__ports.items()):
+            if name in self.__urls:
+                continue
+            port.update_connection_state(device_name_set)
+            if name not in device_name_set:
+                del self.__ports[name]
+                self.__forget(name)
+            elif port.state != COMPortState.OPEN:
+                self.__forget(name)
 
     @property
     def name_list(self) -> list[str]:
@@ -154,19 +256,43 @@ class COMPortSet:
     def state_list(self) -> list[COMPortState]:
         return [port.state for port in self.__ports.values()]
 
+    @property
+    def open_port_names(self) -> list[str]:
+        return list(self.__open)
+
+    def __forget(self, name: str):
+        port = self.__open.pop(name, None)
+        if port is not None and port is self.__active:
+            # The most recently activated port that is still open becomes the primary
+            self.__active = next(reversed(self.__open.values()), None)
+
+    def activate(self, target_name: str):
+        # Opens the port in addition to the ones already open and makes it the primary
+        assert target_name in self.__ports, target_name
+        target = self.__ports[target_name]
+        target.activate(self.__params)
+        if target.state == COMPortState.OPEN:
+            self.__open.pop(target_name, None)
+            self.__open[target_name] = target
+            self.__active = target
+
+    def deactivate(self, target_name: str):
+        target = self.__ports.get(target_name)
+        if target is None:
+            return
+        target.deactivate()
+        self.__forget(target_name)
+
     def activate_one(self, target_name: str | None):
         assert target_name is None or target_name in self.__ports, target_name
-        for name, port in self.__ports.items():
-            if name == target_name:
-                port.activate(self.__params)
-            else:
-                port.deactivate()
+        for name in list(self.__open):
+            if name != target_name:
+                self.deactivate(name)
+        if target_name is not None:
+            self.activate(target_name)
 
     def __get_current_port(self) -> COMPort | None:
-        for port in self.__ports.values():
-            if port.state == COMPortState.OPEN:
-                return port
-        return None
+        return self.__active
 
     def __get_current_one_port(self) -> COMPort:
         current = self.__get_current_port()
@@ -180,6 +306,13 @@ class COMPortSet:
     def active_port_info(self):
         return self.__get_current_one_port().serial_info
 
+    @property
+    def active_port_info_version(self) -> tuple | None:
+        if not self.has_active():
+            return None
+        port = self.__get_current_one_port()
+        return port.device_name, port.info_version
+
     @property
     def active_port_state(self) -> COMPortState:
         return self.__get_current_one_port().state
@@ -187,6 +320,13 @@ class COMPortSet:
     def get_port_state(self, name: str) -> COMPortState:
         return self.__ports[name].state
 
+    def get_port_io(self, name: str):
+        return self.__ports[name].io
+
+    @property
+    def active_port_telemetry(self):
+        return self.__get_current_one_port().telemetry
+
     @property
     def active_port_io(self):
         return self.__get_current_one_port().io
@@ -196,4 +336,12 @@ class COMPortSet:
         return self.__get_current_one_port().device_name
 
 
-g_ports = COMPortSet()
+_ports: COMPortSet | None = None
+
+
+def g_get_ports() -> COMPortSet:
+    # Created on first use rather than at import time
+    global _ports
+    if _ports is None:
+        _ports = COMPortSet()
+    return _ports
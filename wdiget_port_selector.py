@@ -1,9 +1,12 @@
 import dataclasses
 
-from PyQt5.QtCore import *
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListWidget, QCheckBox
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListWidget, QCheckBox, QLineEdit, QHBoxLayout, \
+    QPushButton
 
-from utils import g_ports, block_signals_context, COMPortState
+from device_watcher import DeviceWatcher
+from profiling import spanned
+from utils import g_get_ports, block_signals_context, COMPortState
 
 
 class PortListWidget(QWidget):
@@ -11,15 +14,24 @@ class PortListWidget(QWidget):
     any_params_changed = pyqtSignal()
     any_info_changed = pyqtSignal()
 
+    # Emitted from the device watcher thread, delivered on the GUI thread
+    _devices_changed = pyqtSignal()
+
     def __init__(self, parent: QObject = None):
         super().__init__(parent)
 
         self.__previous_parameter_dict = {}
-        self.__previous_info_dict = {}
+        self.__previous_info_version = None
+        self.__check_toggled = False
 
         self.__init_ui()
 
-        self.__previous_state_list: list[COMPortState] = g_ports.state_list
+        self.__previous_state_list: list[tuple[str, COMPortState]] = self.__get_state_list()
+
+        self._devices_changed.connect(self.update_port_list, Qt.QueuedConnection)
+        self.__device_watcher = DeviceWatcher()
+        self.__device_watcher.add_listener(self.__on_devices_changed)
+        self.__device_watcher.start()
 
         self.__port_list_update_timer = QTimer(self)
         self.__port_list_update_timer.setInterval(500)
@@ -36,10 +48,28 @@ class PortListWidget(QWidget):
         l_ports = QListWidget(self)
         l_ports.setMinimumHeight(30)
         l_ports.setSelectionMode(QListWidget.SelectionMode.SingleSelection)
+        l_ports.setToolTip("チェックしたポートを同時に開く（クリックしたポートが送信先になる）")
         l_ports.clicked.connect(self.port_selection_clicked)
+        l_ports.itemChanged.connect(self.__on_port_item_changed)
         layout.addWidget(l_ports)
         self.__l_ports = l_ports
 
+        layout_url = QHBoxLayout()
+        layout.addLayout(layout_url)
+
+        e_url = QLineEdit(self)
+        e_url.setPlaceholderText("URLを追加 例：loop://")
+        e_url.setToolTip("pyserialで開けるURLまたはデバイス名（loop://, socket://host:port, /dev/ttyS0 など）")
+        e_url.returnPressed.connect(self.__on_e_url_return_pressed)
+        layout_url.addWidget(e_url)
+        self.__e_url = e_url
+
+        b_remove_url = QPushButton(self)
+        b_remove_url.setText("削除")
+        b_remove_url.setToolTip("選択中のURLを一覧から削除")
+        b_remove_url.clicked.connect(self.__on_b_remove_url_clicked)
+        layout_url.addWidget(b_remove_url)
+
         cb_auto_connect = QCheckBox(self)
         cb_auto_connect.setText("自動的に接続する")
         cb_auto_connect.setChecked(True)
@@ -52,51 +82,80 @@ class PortListWidget(QWidget):
         if name is None:
             text = self.LIST_ITEM_TEXT_DISCONNECT
         else:
-            text = f"{name} {g_ports.get_port_state(name).value.replace('DISCONNECTED', '')}"
+            text = f"{name} {g_get_ports().get_port_state(name).value.replace('DISCONNECTED', '')}"
         self.__l_ports.addItem(text)
+        self.__l_ports.item(self.__l_ports.count() - 1).setData(Qt.UserRole, name)
         if name is not None:
-            if g_ports.get_port_state(name) == COMPortState.DISCONNECTED:
-                item = self.__l_ports.item(self.__l_ports.count() - 1)
+            item = self.__l_ports.item(self.__l_ports.count() - 1)
+            state = g_get_ports().get_port_state(name)
+            if state == COMPortState.DISCONNECTED:
                 item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
+            else:
+                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+                item.setCheckState(Qt.Checked if state == COMPortState.OPEN else Qt.Unchecked)
 
     def _reflect_port_list(self):
         with block_signals_context(self.__l_ports) as l:
             l.clear()
             self.__add_item(None)
-            for value in g_ports.name_list:
+            for value in g_get_ports().name_list:
                 self.__add_item(value)
 
-            if not g_ports.has_active():
+            if not g_get_ports().has_active():
                 l.setCurrentRow(0)
             else:
-                if g_ports.active_port_state == COMPortState.DISCONNECTED:
+                if g_get_ports().active_port_state == COMPortState.DISCONNECTED:
                     l.setCurrentRow(0)
                 else:
-                    i = g_ports.name_list.index(g_ports.active_port_name)
+                    i = g_get_ports().name_list.index(g_get_ports().active_port_name)
                     l.setCurrentRow(i + 1)
 
     def __get_selected_item(self) -> str | None:
-        if self.__l_ports.currentRow() == 0:
+        if self.__l_ports.currentRow() <= 0:
             return None
         else:
-            item_text = self.__l_ports.currentItem().text()
-            port_name = item_text.split(" ")[0]
-            return port_name
+            return self.__l_ports.currentItem().data(Qt.UserRole)
+
+    def __on_e_url_return_pressed(self):
+        url = self.__e_url.text().strip()
+        if not url:
+            return
+        g_get_ports().add_url(url)
+        self.__e_url.clear()
+        self.update_port_list()
+
+    def __on_b_remove_url_clicked(self):
+        name = self.__get_selected_item()
+        if name not in g_get_ports().url_list:
+            return
+        g_get_ports().remove_url(name)
+        self.update_port_list()
+        self.any_state_changed.emit()
+
+    @staticmethod
+    def __get_state_list() -> list[tuple[str, COMPortState]]:
+        return list(zip(g_get_ports().name_list, g_get_ports().state_list))
 
     def process_auto_connect(self):
         if self.__cb_auto_connect.isChecked():
-            if not g_ports.has_active():
+            if not g_get_ports().has_active():
                 try:
-                    i = g_ports.state_list.index(COMPortState.CLOSED)
+                    i = g_get_ports().state_list.index(COMPortState.CLOSED)
                 except ValueError:
                     pass
                 else:
-                    g_ports.activate_one(g_ports.name_list[i])
+                    g_get_ports().activate_one(g_get_ports().name_list[i])
 
+    def __on_devices_changed(self, events):
+        self._devices_changed.emit()
+
+    @spanned("port_list")
     def update_port_list(self):
-        g_ports.update_connection_state()
+        # The device scan runs on the watcher thread; only its latest result is applied here
+        if self.__device_watcher.poll_events():
+            g_get_ports().update_connection_state(self.__device_watcher.devices)
 
-        state_list = g_ports.state_list
+        state_list = self.__get_state_list()
         changed = (
                 self.__previous_state_list is not None
                 and state_list != self.__previous_state_list
@@ -107,9 +166,30 @@ class PortListWidget(QWidget):
             self._reflect_port_list()
             self.any_state_changed.emit()
 
+    def __on_port_item_changed(self, item):
+        name = item.data(Qt.UserRole)
+        if name is None:
+            return
+        # The click that toggled the check box is delivered right after this; leave the other ports alone
+        self.__check_toggled = True
+        QTimer.singleShot(0, self.__reset_check_toggled)
+        if item.checkState() == Qt.Checked:
+            g_get_ports().activate(name)
+        else:
+            g_get_ports().deactivate(name)
+        # The list is rebuilt outside of this signal since the item is deleted by it
+        QTimer.singleShot(0, self.update_port_list)
+        self.any_state_changed.emit()
+
+    def __reset_check_toggled(self):
+        self.__check_toggled = False
+
     def port_selection_clicked(self):
-        if g_ports.has_active():
-            current_port_name = g_ports.active_port_name
+        if self.__check_toggled:
+            return
+
+        if g_get_ports().has_active():
+            current_port_name = g_get_ports().active_port_name
         else:
             current_port_name = None
 
@@ -118,28 +198,30 @@ class PortListWidget(QWidget):
         if current_port_name == new_port_name:
             return
 
-        g_ports.activate_one(new_port_name)
+        if new_port_name in g_get_ports().open_port_names:
+            # Already open with the others; only the port the sender writes to changes
+            g_get_ports().activate(new_port_name)
+        else:
+            g_get_ports().activate_one(new_port_name)
         self.any_state_changed.emit()
 
     def check_parameter_change(self):
-        param_dict = dataclasses.asdict(g_ports.parameters)
+        param_dict = dataclasses.asdict(g_get_ports().parameters)
         if self.__previous_parameter_dict != param_dict:
             self.any_params_changed.emit()
             self.__previous_parameter_dict = param_dict
 
     def check_info_change(self):
-        if g_ports.has_active():
-            info_dict = g_ports.active_port_info
-        else:
-            info_dict = {}
-
-        if self.__previous_info_dict != info_dict:
+        info_version = g_get_ports().active_port_info_version
+        if self.__previous_info_version != info_version:
             self.any_info_changed.emit()
-            self.__previous_info_dict = info_dict
+            self.__previous_info_version = info_version
 
     def showEvent(self, evt):
         self._reflect_port_list()
 
     def closeEvent(self, evt):
         self.__port_list_update_timer.stop()
-        g_ports.activate_one(None)
+        self.__device_watcher.remove_listener(self.__on_devices_changed)
+        self.__device_watcher.stop()
+        g_get_ports().activate_one(None)
@@ -0,0 +1,188 @@
+import os
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QFileDialog, QGridLayout, QComboBox, \
+    QLineEdit
+
+from capture_file import CaptureWriter, CAPTURE_FILE_SUFFIX
+from replay import CaptureReplayer
+from status import g_get_status
+from utils import g_get_ports, block_signals_context
+
+
+class CaptureRecordWidget(QWidget):
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        self.__writer: CaptureWriter | None = None
+
+        self.__init_ui()
+
+        self.__flush_timer = QTimer(self)
+        self.__flush_timer.setInterval(1000)
+        self.__flush_timer.timeout.connect(self.__flush)
+
+    def __init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        b_record = QPushButton(self)
+        b_record.setText("記録開始")
+        b_record.setCheckable(True)
+        b_record.toggled.connect(self.__on_b_record_toggled)
+        layout.addWidget(b_record)
+        self.__b_record = b_record
+
+    def __on_b_record_toggled(self, checked: bool):
+        if checked:
+            self.start_recording()
+        else:
+            self.stop_recording()
+
+    def start_recording(self):
+        default_name = datetime.now().strftime(f"capture_%Y%m%d_%H%M%S{CAPTURE_FILE_SUFFIX}")
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "キャプチャの保存先",
+            os.path.join(os.getcwd(), default_name),
+            f"キャプチャ (*{CAPTURE_FILE_SUFFIX})",
+        )
+        if not path:
+            with block_signals_context(self.__b_record) as b:
+                b.setChecked(False)
+            return
+
+        try:
+            self.__writer = CaptureWriter(path)
+        except OSError as e:
+            g_get_status().error(f"キャプチャを記録できません：{e}")
+            with block_signals_context(self.__b_record) as b:
+                b.setChecked(False)
+            return
+
+        g_get_ports().set_recorder(self.__writer)
+        self.__flush_timer.start()
+        self.__b_record.setText("記録停止")
+        g_get_status().info(f"キャプチャの記録を開始しました：{path}")
+
+    def stop_recording(self):
+        if self.__writer is None:
+            return
+        g_get_ports().set_recorder(None)
+        self.__flush_timer.stop()
+        self.__writer.close()
+        g_get_status().info(f"キャプチャの記録を終了しました：{self.__writer.path}")
+        self.__writer = None
+        self.__b_record.setText("記録開始")
+
+    def __flush(self):
+        if self.__writer is not None:
+            self.__writer.flush()
+
+
+class CaptureReplayWidget(QWidget):
+    # Emits the ReplayIO to read from while a replay runs, and None when it is over
+    source_changed = pyqtSignal(object)
+
+    SPEED_CHOICES = [
+        ("1x", 1.0),
+        ("2x", 2.0),
+        ("10x", 10.0),
+        ("最大", CaptureReplayer.MAX_SPEED),
+    ]
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        self.__replayer: CaptureReplayer | None = None
+
+        self.__init_ui()
+
+        self.__poll_timer = QTimer(self)
+        self.__poll_timer.setInterval(100)
+        self.__poll_timer.timeout.connect(self.__poll)
+
+    def __init_ui(self):
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        l_speed = QComboBox(self)
+        for text, speed in self.SPEED_CHOICES:
+            l_speed.addItem(text, speed)
+        layout.addWidget(l_speed, 0, 0)
+        self.__l_speed = l_speed
+
+        b_replay = QPushButton(self)
+        b_replay.setText("再生")
+        b_replay.setCheckable(True)
+        b_replay.toggled.connect(self.__on_b_replay_toggled)
+        layout.addWidget(b_replay, 0, 1)
+        self.__b_replay = b_replay
+
+        e_output = QLineEdit(self)
+        e_output.setPlaceholderText("出力先（任意）例：COM5, loop://")
+        layout.addWidget(e_output, 1, 0, 1, 2)
+        self.__e_output = e_output
+
+    def __on_b_replay_toggled(self, checked: bool):
+        if checked:
+            self.start_replay()
+        else:
+            self.stop_replay()
+
+    def start_replay(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "再生するキャプチャ",
+            os.getcwd(),
+            f"キャプチャ (*{CAPTURE_FILE_SUFFIX})",
+        )
+        if not path:
+            with block_signals_context(self.__b_replay) as b:
+                b.setChecked(False)
+            return
+
+        self.__replayer = CaptureReplayer(
+            path,
+            speed=self.__l_speed.currentData(),
+            output_url=self.__e_output.text().strip() or None,
+            baudrate=g_get_ports().parameters.baudrate,
+        )
+        self.__replayer.start()
+        self.source_changed.emit(self.__replayer.io)
+        self.__poll_timer.start()
+        self.__l_speed.setEnabled(False)
+        self.__e_output.setEnabled(False)
+        self.__b_replay.setText("停止")
+        g_get_status().info(f"キャプチャを再生しています：{path}")
+
+    def stop_replay(self):
+        if self.__replayer is None:
+            return
+        self.__poll_timer.stop()
+        self.__replayer.stop()
+        self.source_changed.emit(None)
+
+        if self.__replayer.error is not None:
+            g_get_status().error(f"キャプチャを再生できません：{self.__replayer.error}")
+        else:
+            g_get_status().info(f"キャプチャの再生を終了しました：{self.__replayer.n_replayed:,} bytes")
+        self.__replayer = None
+
+        self.__l_speed.setEnabled(True)
+        self.__e_output.setEnabled(True)
+        with block_signals_context(self.__b_replay) as b:
+            b.setChecked(False)
+            b.setText("再生")
+
+    def __poll(self):
+        # Hand the source back to the live port once the receiver has drained the replay
+        replayer = self.__replayer
+        if replayer is None or not replayer.finished:
+            return
+        if replayer.error is None and replayer.io.n_available:
+            return
+        self.stop_replay()
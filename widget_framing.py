@@ -0,0 +1,102 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QComboBox, QLineEdit
+
+from framing import FramingConfig, FRAMING_NONE, FRAMING_DELIMITER, FRAMING_LENGTH, FRAMING_SLIP, \
+    FRAMING_COBS, FRAMING_IDLE_GAP
+from status import g_get_status
+
+
+class FramingSelectorWidget(QWidget):
+    framing_changed = pyqtSignal(object)
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        self.__config = FramingConfig.default()
+
+        self.__init_ui()
+
+    PARAM_DELIMITER = "delimiter"
+    PARAM_GAP = "gap"
+
+    FRAMING_CHOICES = [
+        ("区切りなし", dict(kind=FRAMING_NONE), None),
+        ("改行（LF）", dict(kind=FRAMING_DELIMITER, delimiter=b"\n"), None),
+        ("改行（CRLF）", dict(kind=FRAMING_DELIMITER, delimiter=b"\r\n"), None),
+        ("区切り文字", dict(kind=FRAMING_DELIMITER), PARAM_DELIMITER),
+        ("長さ 1バイト", dict(kind=FRAMING_LENGTH, length_size=1), None),
+        ("長さ 2バイト BE", dict(kind=FRAMING_LENGTH, length_size=2, byteorder="big"), None),
+        ("長さ 2バイト LE", dict(kind=FRAMING_LENGTH, length_size=2, byteorder="little"), None),
+        ("長さ 4バイト BE", dict(kind=FRAMING_LENGTH, length_size=4, byteorder="big"), None),
+        ("長さ 4バイト LE", dict(kind=FRAMING_LENGTH, length_size=4, byteorder="little"), None),
+        ("SLIP", dict(kind=FRAMING_SLIP), None),
+        ("COBS", dict(kind=FRAMING_COBS), None),
+        ("無通信時間", dict(kind=FRAMING_IDLE_GAP), PARAM_GAP),
+    ]
+
+    PARAM_PLACEHOLDERS = {
+        PARAM_DELIMITER: "16進数 例：0d0a",
+        PARAM_GAP: "ミリ秒 例：20",
+    }
+
+    def __init_ui(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        l_framing = QComboBox(self)
+        l_framing.setToolTip("受信データをメッセージに区切る方法（1メッセージが1行になる）")
+        for text, _, _ in self.FRAMING_CHOICES:
+            l_framing.addItem(text)
+        l_framing.currentIndexChanged.connect(self.__on_l_framing_changed)
+        layout.addWidget(l_framing)
+        self.__l_framing = l_framing
+
+        e_param = QLineEdit(self)
+        e_param.setFixedWidth(110)
+        e_param.setEnabled(False)
+        e_param.editingFinished.connect(self.__apply)
+        layout.addWidget(e_param)
+        self.__e_param = e_param
+
+    @property
+    def config(self) -> FramingConfig:
+        return self.__config
+
+    def __on_l_framing_changed(self, index: int):
+        _, _, param = self.FRAMING_CHOICES[index]
+        self.__e_param.setEnabled(param is not None)
+        self.__e_param.clear()
+        self.__e_param.setPlaceholderText(self.PARAM_PLACEHOLDERS.get(param, ""))
+        if param is None:
+            self.__apply()
+
+    def __apply(self):
+        _, items, param = self.FRAMING_CHOICES[self.__l_framing.currentIndex()]
+        config = FramingConfig.default()
+        for key, value in items.items():
+            config = config.replace(key, value)
+
+        text = self.__e_param.text().strip()
+        if param == self.PARAM_DELIMITER:
+            try:
+                delimiter = bytes.fromhex(text)
+            except ValueError:
+                delimiter = b""
+            if not delimiter:
+                g_get_status().error("区切り文字を16進数で入力してください")
+                return
+            config = config.replace("delimiter", delimiter)
+        elif param == self.PARAM_GAP:
+            try:
+                gap_ms = float(text)
+            except ValueError:
+                gap_ms = 0.0
+            if gap_ms <= 0:
+                g_get_status().error("無通信時間をミリ秒で入力してください")
+                return
+            config = config.replace("gap_ms", gap_ms)
+
+        if config != self.__config:
+            self.__config = config
+            self.framing_changed.emit(config)
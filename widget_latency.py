@@ -0,0 +1,53 @@
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
+
+from d_latency import LatencyDialog
+from utils import g_get_ports
+
+
+class LatencyWidget(QWidget):
+    # Opens the latency results and tells whether the ports are measuring
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        self.__dialog: LatencyDialog | None = None
+
+        self.__init_ui()
+
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(500)
+        self.__timer.timeout.connect(self.update_summary)
+        self.__timer.start()
+
+    def __init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        b_show = QPushButton(self)
+        b_show.setText("応答時間の測定")
+        b_show.clicked.connect(self.__on_b_show_clicked)
+        layout.addWidget(b_show)
+
+        label_summary = QLabel(self)
+        label_summary.setWordWrap(True)
+        layout.addWidget(label_summary)
+        self.__label_summary = label_summary
+
+    def __on_b_show_clicked(self):
+        if self.__dialog is None:
+            self.__dialog = LatencyDialog(self)
+        self.__dialog.show()
+        self.__dialog.raise_()
+        self.__dialog.update_results()
+
+    def update_summary(self):
+        if g_get_ports().latency_config is None:
+            text = ""
+        else:
+            rows = g_get_ports().latency_snapshots()
+            n_replies = sum(snapshot.n_replies for _, snapshot in rows)
+            n_unanswered = sum(snapshot.n_unanswered for _, snapshot in rows)
+            text = f"測定中：応答 {n_replies:,}件、無応答 {n_unanswered:,}件"
+        if self.__label_summary.text() != text:
+            self.__label_summary.setText(text)
@@ -1,135 +1,405 @@
-from abc import ABC, abstractmethod
-from datetime import datetime
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, time as dt_time
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QObject, QPoint, QTimer, Qt, pyqtSignal, \
+    pyqtSlot
+from PyQt5.QtGui import QFont, QBrush, QColor
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListView, QHBoxLayout, QCheckBox, \
+    QPushButton, QAbstractItemView, QComboBox, QLineEdit, QLabel
+
+from app_config import ScrollbackConfig, RenderConfig
+from capture_search import CaptureSearch, SearchPattern, SearchPatternError, SearchHits, SEARCH_HEX, \
+    SEARCH_ASCII, SEARCH_REGEX
+from capture_store import SessionBuffer, CaptureStore
+from d_freeze import LogFreezeDialog
+from formatting import HexStringBuilder, TextStringBuilder
+from profiling import spanned, span
+from status import g_get_status
 
-from PyQt5.QtCore import *
-from PyQt5.QtGui import QFont
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit, QHBoxLayout, QCheckBox, \
-    QPushButton
 
-from d_freeze import LogFreezeDialog
-from utils import decode_ascii
+class LogBuffer(QObject):
+    session_completed = pyqtSignal(SessionBuffer)
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.__buf: None | SessionBuffer = None
 
-class SessionBuffer(ABC):
-    def __init__(self):
-        self.__timestamp = datetime.now().time()
-        self.__values = []
+    def session_begin(self, timestamp: dt_time | None = None, source: str | None = None,
+                      highlighted: bool = False):
+        self.__buf = SessionBuffer(timestamp, source, highlighted)
 
-    def append_bytes(self, values: bytes):
-        self.__values += list(values)
+    def append(self, values: bytes | bytearray | memoryview):
+        assert isinstance(values, (bytes, bytearray, memoryview))
+        self.__buf.append_bytes(values)
 
-    @property
-    def values(self) -> list[int]:
-        return self.__values
+    def session_end(self):
+        self.session_completed.emit(self.__buf)
+        self.__buf = None
 
-    @property
-    def timestamp(self):
-        return self.__timestamp
 
+class ScrollbackSpillWriter:
+    # Appends sessions evicted from the scrollback to a hex dump file instead of dropping them
+    def __init__(self, directory: str):
+        self.__directory = directory
+        self.__file = None
+
+    def write(self, sessions: list[SessionBuffer]):
+        if self.__file is None:
+            os.makedirs(self.__directory, exist_ok=True)
+            name = datetime.now().strftime("scrollback_%Y%m%d_%H%M%S.log")
+            self.__file = open(os.path.join(self.__directory, name), "a", encoding="utf-8")
+        for buf in sessions:
+            self.__file.write(HexStringBuilder(buf).to_string())
+        self.__file.flush()
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+class LogListModel(QAbstractListModel):
+    # Rows are rendered from the capture store only when the view asks for them, one page at a time.
+    # Rendered pages are kept in an LRU cache keyed by mode and page of rows counted since the last clear,
+    # so they stay valid while old rows are evicted and switching modes back and forth reuses them.
+    PAGE_SIZE = 64
+    PAGE_CACHE_SIZE = 256
+    HIGHLIGHT_BRUSH = QBrush(QColor(255, 236, 160))
+
+    def __init__(self, config: ScrollbackConfig, parent: QObject = None, show_source: bool = False):
+        super().__init__(parent)
 
-class SessionBufferStringBuilder(ABC):
-    def __init__(self, session_buffer: SessionBuffer):
-        self.__session_buffer = session_buffer
+        self.__show_source = show_source
+        self.__store = CaptureStore(
+            block_size=HexStringBuilder.BLOCK_SIZE,
+            max_lines=config.max_lines,
+            max_bytes=config.max_bytes,
+        )
+        self.__search = CaptureSearch(self.__store)
+        self.__spill = ScrollbackSpillWriter(config.spill_dir) if config.spill_dir else None
+        if self.__spill is not None:
+            # Closed with the view that owns the model, e.g. when its tab is closed
+            self.destroyed.connect(self.__spill.close)
+        self.__hex_mode = True
+        self.__pages: OrderedDict[tuple[bool, int], list[str]] = OrderedDict()
+
+    def set_hex_mode(self, value: bool):
+        if self.__hex_mode == value:
+            return
+        self.beginResetModel()
+        self.__hex_mode = value
+        self.endResetModel()
 
     @property
-    def _buf(self):
-        return self.__session_buffer
+    def hex_mode(self) -> bool:
+        return self.__hex_mode
+
+    def clear(self):
+        self.beginResetModel()
+        self.__store.clear()
+        self.__search.clear()
+        self.__pages.clear()
+        self.endResetModel()
+
+    def set_limit(self, max_lines: int | None, max_bytes: int | None):
+        self.__store.set_limit(max_lines, max_bytes)
+        self.__evict()
+
+    def __evict(self):
+        n_sessions = self.__store.n_evictable()
+        if not n_sessions:
+            return
+
+        if self.__hex_mode:
+            n_removed = self.__store.n_hex_rows_evicted_by(n_sessions)
+        else:
+            n_removed = self.__store.n_text_lines_evicted_by(n_sessions)
+
+        if n_removed:
+            self.beginRemoveRows(QModelIndex(), 0, n_removed - 1)
+        evicted = self.__store.evict(n_sessions)
+        if n_removed:
+            self.endRemoveRows()
+
+        # The oldest text line may have lost its beginning
+        self.__invalidate_text_line(0)
+        if not self.__hex_mode:
+            first = self.index(0)
+            self.dataChanged.emit(first, first)
+
+        if self.__spill is not None:
+            self.__spill.write(evicted)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self.__hex_mode:
+            return self.__store.n_hex_rows
+        else:
+            return self.__store.n_text_lines
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.render_row(index.row())
+        if role == Qt.BackgroundRole and self.__is_highlighted(index.row()):
+            return self.HIGHLIGHT_BRUSH
+        return None
+
+    def __is_highlighted(self, row: int) -> bool:
+        if self.__hex_mode:
+            session, _ = self.__store.locate_hex_row(row)
+            return session.highlighted
+        start = self.__store.text_line_offset(row)
+        stop = self.__store.text_line_offset(row + 1) if row + 1 < self.rowCount() else self.__store.end_byte
+        return self.__store.is_highlighted(start, max(stop, start + 1))
+
+    def __first_row(self) -> int:
+        if self.__hex_mode:
+            return self.__store.first_hex_row
+        else:
+            return self.__store.first_text_line
+
+    def __invalidate_text_line(self, line: int):
+        # Hex rows never change once written, but the first and last text lines can
+        page = (line + self.__store.first_text_line) // self.PAGE_SIZE
+        self.__pages.pop((False, page), None)
+
+    @spanned("render")
+    def __render_page(self, page: int) -> list[str]:
+        first_row = self.__first_row()
+        start = page * self.PAGE_SIZE - first_row
+        stop = min(start + self.PAGE_SIZE, self.rowCount())
+        # Rows of this page that were already evicted are never asked for
+        lines = [""] * max(0, -start)
+        start = max(0, start)
+
+        if self.__hex_mode:
+            row = start
+            while row < stop:
+                session, block = self.__store.locate_hex_row(row)
+                rendered = HexStringBuilder(session, self.__show_source).to_lines(block, block + stop - row)
+                lines += rendered
+                row += len(rendered)
+        else:
+            lines += map(TextStringBuilder.format_line, self.__store.text_lines(start, stop))
+        return lines
+
+    def render_row(self, row: int) -> str:
+        page, i = divmod(row + self.__first_row(), self.PAGE_SIZE)
+        key = (self.__hex_mode, page)
+        lines = self.__pages.get(key)
+        if lines is None or i >= len(lines):
+            lines = self.__render_page(page)
+            self.__pages[key] = lines
+            if len(self.__pages) > self.PAGE_CACHE_SIZE:
+                self.__pages.popitem(last=False)
+        else:
+            self.__pages.move_to_end(key)
+        return lines[i]
 
-    @abstractmethod
-    def to_string(self):
-        raise NotImplementedError()
+    def row_offset(self, row: int) -> int:
+        if self.__hex_mode:
+            return self.__store.hex_row_offset(row)
+        else:
+            return self.__store.text_line_offset(row)
 
+    def row_at(self, offset: int) -> int:
+        if self.__hex_mode:
+            return self.__store.hex_row_at(offset)
+        else:
+            return self.__store.text_line_at(offset)
 
-class HexStringBuilder(SessionBufferStringBuilder):
-    HEADER_LENGTH = 15
-    BLOCK_SIZE = 16
+    def search(self, pattern: SearchPattern) -> SearchHits:
+        with span("search"):
+            return self.__search.search(pattern)
 
-    def _iter_blocks(self):
-        i = 0
-        while i < len(self._buf.values):
-            block = self._buf.values[i:i + self.BLOCK_SIZE]
-            yield block
-            i += self.BLOCK_SIZE
+    def append_sessions(self, bufs: list[SessionBuffer]):
+        if self.__hex_mode:
+            n_added = self.__store.n_hex_rows_of(*bufs)
+        else:
+            n_added = self.__store.n_text_lines_of(*bufs)
+        n_before = self.rowCount()
+        if self.__store.n_text_lines:
+            self.__invalidate_text_line(self.__store.n_text_lines - 1)
 
-    def to_string(self) -> str:
-        block_bytes = [
-            " ".join("{:02x}".format(value) for value in block)
-            for block in self._iter_blocks()
-        ]
-        block_asciis = [
-            "".join(decode_ascii(block, replace_error='・'))
-            for block in self._iter_blocks()
-        ]
-        block_headers = [
-            str(self._buf.timestamp) if i == 0 else ""
-            for i in range(len(block_bytes))
-        ]
-        lines = [
-            f'{1 + i:>5d} | {header.ljust(self.HEADER_LENGTH)} | {b.ljust(3 * self.BLOCK_SIZE)}| {a}'
-            for i, (header, b, a) in enumerate(zip(block_headers, block_bytes, block_asciis))
-        ]
-        content = "\n".join(lines) + "\n"
-        return content
-
-
-class TextStringBuilder(SessionBufferStringBuilder):
-    NEW_LINE = 0x0a
-
-    def _iter_blocks(self):
-        i = 0
-        block = []
-        while i < len(self._buf.values):
-            value = self._buf.values[i]
-            if value == self.NEW_LINE:
-                yield block
-                block.clear()
-            else:
-                block.append(decode_ascii(value))
-            i += 1
+        if n_added:
+            self.beginInsertRows(QModelIndex(), n_before, n_before + n_added - 1)
+        for buf in bufs:
+            self.__store.append(buf)
+        if n_added:
+            self.endInsertRows()
+
+        if not self.__hex_mode and n_before:
+            # The last text line may have been continued by these sessions
+            last = self.index(n_before - 1)
+            self.dataChanged.emit(last, last)
+
+        self.__evict()
 
     def to_string(self) -> str:
-        content = decode_ascii(self._buf.values, replace_error='・', enable_spaces=True)
-        return content
+        if self.__hex_mode:
+            return "".join(HexStringBuilder(buf, self.__show_source).to_string() for buf in self.__store.sessions)
+        else:
+            return "".join(TextStringBuilder(buf).to_string() for buf in self.__store.sessions)
 
 
-class LogBuffer(QObject):
-    session_completed = pyqtSignal(SessionBuffer)
+class RenderScheduler(QObject):
+    # Collects completed sessions and hands them to the view at most once per frame.
+    # In adaptive mode a frame is timed from the flush until the event loop is idle again, so laying out
+    # and painting the view count as well as the model update. The frame interval doubles while frames
+    # take more than half of it or more than BACKLOG_BYTES arrive during a frame, and comes back once
+    # frames are cheap and the backlog is small again.
+    sessions_ready = pyqtSignal(list)
 
-    def __init__(self, parent=None):
+    MAX_INTERVAL = 500
+    BACKLOG_BYTES = 256 * 1024
+
+    def __init__(self, config: RenderConfig, parent: QObject = None):
         super().__init__(parent)
-        self.__buf: None | SessionBuffer = None
 
-    def session_begin(self):
-        self.__buf = SessionBuffer()
+        self.__base_interval = max(1, round(1000 / config.fps))
+        self.__interval = self.__base_interval
+        self.__adaptive = config.adaptive
+        self.__pending: list[SessionBuffer] = []
+        self.__n_pending_bytes = 0
+        self.__frame_start: float | None = None
 
-    def append(self, values: bytes):
-        assert isinstance(values, bytes)
-        self.__buf.append_bytes(values)
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.flush)
 
-    def session_end(self):
-        self.session_completed.emit(self.__buf)
-        self.__buf = None
+        # Fires once the events queued by a flush, painting included, have been processed
+        self.__idle_timer = QTimer(self)
+        self.__idle_timer.setSingleShot(True)
+        self.__idle_timer.setInterval(0)
+        self.__idle_timer.timeout.connect(self.__on_frame_done)
+
+    @property
+    def interval(self) -> int:
+        return self.__interval
+
+    @property
+    def n_pending(self) -> int:
+        return len(self.__pending)
+
+    def push(self, buf: SessionBuffer):
+        self.__pending.append(buf)
+        self.__n_pending_bytes += len(buf)
+        if not self.__timer.isActive():
+            self.__timer.start(self.__interval)
+
+    def discard(self):
+        self.__timer.stop()
+        self.__pending = []
+        self.__n_pending_bytes = 0
+
+    def flush(self):
+        if not self.__pending:
+            return
+        sessions, self.__pending = self.__pending, []
+        self.__n_pending_bytes = 0
+
+        t_start = time.perf_counter()
+        self.sessions_ready.emit(sessions)
+
+        if self.__adaptive and self.__frame_start is None:
+            self.__frame_start = t_start
+            self.__idle_timer.start()
+
+    def __on_frame_done(self):
+        elapsed = (time.perf_counter() - self.__frame_start) * 1000
+        self.__frame_start = None
+        # Sessions pushed while the frame was busy are the backlog the next frame has to catch up with
+        self.__adapt(elapsed, self.__n_pending_bytes)
+
+    def __adapt(self, elapsed: float, backlog: int):
+        if elapsed > self.__interval / 2 or backlog > self.BACKLOG_BYTES:
+            self.__interval = min(self.MAX_INTERVAL, self.__interval * 2)
+        elif elapsed < self.__interval / 8 and backlog < self.BACKLOG_BYTES / 8:
+            self.__interval = max(self.__base_interval, self.__interval // 2)
 
 
 class LogViewWidget(QWidget):
-    def __init__(self, parent: QObject = None):
+    def __init__(self, parent: QObject = None, show_source: bool = False):
         super().__init__(parent)
 
+        self.__show_source = show_source
         self.__clear_later = False
+        self.__config = ScrollbackConfig.load()
+        self.__hit_offset: int | None = None  # stream offset of the search hit shown last
+
+        self.__scheduler = RenderScheduler(RenderConfig.load(), self)
+        self.__scheduler.sessions_ready.connect(self.__on_sessions_ready)
 
         self.__init_ui()
 
+    SCROLLBACK_LINE_CHOICES = [
+        ("1万行", 10_000),
+        ("10万行", 100_000),
+        ("100万行", 1_000_000),
+        ("無制限", None),
+    ]
+
+    SEARCH_KIND_CHOICES = [
+        ("16進数", SEARCH_HEX),
+        ("文字列", SEARCH_ASCII),
+        ("正規表現", SEARCH_REGEX),
+    ]
+
     def __init_ui(self):
         layout = QVBoxLayout()
         self.setLayout(layout)
 
-        field = QPlainTextEdit(self)
-        field.setReadOnly(True)
+        model = LogListModel(self.__config, self, show_source=self.__show_source)
+        self.__model = model
+
+        field = QListView(self)
+        field.setModel(model)
         field.setFont(QFont("Consolas", 9))
-        field.setTextInteractionFlags(Qt.NoTextInteraction)
+        field.setUniformItemSizes(True)
+        field.setWordWrap(False)
+        field.setTextElideMode(Qt.ElideNone)
+        field.setSelectionMode(QAbstractItemView.SingleSelection)
+        field.setEditTriggers(QAbstractItemView.NoEditTriggers)
         layout.addWidget(field)
         self.__field = field
 
+        layout_search = QHBoxLayout()
+        layout.addLayout(layout_search)
+
+        l_search_kind = QComboBox(self)
+        for text, kind in self.SEARCH_KIND_CHOICES:
+            l_search_kind.addItem(text, kind)
+        l_search_kind.currentIndexChanged.connect(self.__reset_search)
+        layout_search.addWidget(l_search_kind)
+        self.__l_search_kind = l_search_kind
+
+        e_search = QLineEdit(self)
+        e_search.setPlaceholderText("受信データを検索 例：0d0a")
+        e_search.textChanged.connect(self.__reset_search)
+        e_search.returnPressed.connect(self.search_next)
+        layout_search.addWidget(e_search, 1)
+        self.__e_search = e_search
+
+        b_search_prev = QPushButton(self)
+        b_search_prev.setText("前へ")
+        b_search_prev.clicked.connect(self.search_prev)
+        layout_search.addWidget(b_search_prev)
+
+        b_search_next = QPushButton(self)
+        b_search_next.setText("次へ")
+        b_search_next.clicked.connect(self.search_next)
+        layout_search.addWidget(b_search_next)
+
+        label_search = QLabel(self)
+        label_search.setMinimumWidth(100)
+        layout_search.addWidget(label_search)
+        self.__label_search = label_search
+
         layout_control = QHBoxLayout()
         layout.addLayout(layout_control)
 
@@ -142,9 +412,23 @@ class LogViewWidget(QWidget):
         cb_hex = QCheckBox(self)
         cb_hex.setText("16進数")
         cb_hex.setChecked(True)
+        cb_hex.toggled.connect(self.__on_cb_hex_toggled)
         layout_control.addWidget(cb_hex)
         self.__cb_hex = cb_hex
 
+        l_scrollback = QComboBox(self)
+        l_scrollback.setToolTip("保持する最大行数（超えた分は古い順に破棄）")
+        for text, max_lines in self.SCROLLBACK_LINE_CHOICES:
+            l_scrollback.addItem(text, max_lines)
+        i = l_scrollback.findData(self.__config.max_lines)
+        if i < 0:
+            l_scrollback.addItem(f"{self.__config.max_lines:,}行", self.__config.max_lines)
+            i = l_scrollback.count() - 1
+        l_scrollback.setCurrentIndex(i)
+        l_scrollback.currentIndexChanged.connect(self.__on_l_scrollback_changed)
+        layout_control.addWidget(l_scrollback)
+        self.__l_scrollback = l_scrollback
+
         layout_control.addStretch(1)
 
         b_clear = QPushButton(self)
@@ -157,14 +441,71 @@ class LogViewWidget(QWidget):
         b_freeze.clicked.connect(self.freeze)
         layout_control.addWidget(b_freeze)
 
-    def __get_current_string_builder(self):
-        if self.__cb_hex.isChecked():
-            return HexStringBuilder
+    def __on_l_scrollback_changed(self, index: int):
+        max_lines = self.__l_scrollback.itemData(index)
+        self.__model.set_limit(max_lines, self.__config.max_bytes)
+
+    def __on_cb_hex_toggled(self, checked: bool):
+        # Keep the byte at the top of the view in place unless following the tail
+        top = self.__field.indexAt(QPoint(0, 0))
+        offset = self.__model.row_offset(top.row()) if top.isValid() else None
+
+        self.__model.set_hex_mode(checked)
+
+        if self.__cb_scroll.isChecked() or offset is None:
+            self.__scroll_to_bottom()
         else:
-            return TextStringBuilder
+            index = self.__model.index(self.__model.row_at(offset))
+            self.__field.scrollTo(index, QAbstractItemView.PositionAtTop)
+
+    def __reset_search(self):
+        self.__hit_offset = None
+        self.__label_search.clear()
+
+    def __search(self, step: int):
+        text = self.__e_search.text()
+        if not text:
+            return
+        pattern = SearchPattern(self.__l_search_kind.currentData(), text)
+        try:
+            hits = self.__model.search(pattern)
+        except SearchPatternError as e:
+            g_get_status().error(str(e))
+            return
+
+        if not hits:
+            self.__hit_offset = None
+            self.__label_search.setText("0件")
+            g_get_status().info("見つかりませんでした")
+            return
+
+        if self.__hit_offset is None:
+            # Start from the top of the view
+            top = self.__field.indexAt(QPoint(0, 0))
+            origin = self.__model.row_offset(top.row()) if top.isValid() else 0
+            i = hits.index_at(origin) if step > 0 else hits.index_after(origin) - 1
+        elif step > 0:
+            i = hits.index_after(self.__hit_offset)
+        else:
+            i = hits.index_at(self.__hit_offset) - 1
+        i %= len(hits)
+        self.__hit_offset, _ = hits[i]
+        self.__label_search.setText(f"{i + 1:,} / {len(hits):,}件")
+
+        # Stay on the hit instead of following the tail
+        self.__cb_scroll.setChecked(False)
+        index = self.__model.index(self.__model.row_at(self.__hit_offset))
+        self.__field.scrollTo(index, QAbstractItemView.PositionAtCenter)
+        self.__field.setCurrentIndex(index)
+
+    def search_next(self):
+        self.__search(1)
+
+    def search_prev(self):
+        self.__search(-1)
 
     def freeze(self):
-        dialog = LogFreezeDialog(self, text=self.__field.document().toRawText())
+        dialog = LogFreezeDialog(self, text=self.__model.to_string())
         dialog.exec()
 
     def clear_later(self):
@@ -173,19 +514,21 @@ class LogViewWidget(QWidget):
     def dispatch_clear_later(self):
         if self.__clear_later:
             self.__clear_later = False
-            self.__field.clear()
+            self.__scheduler.discard()
+            self.__model.clear()
+            self.__reset_search()
 
     def __scroll_to_bottom(self):
         if not self.__cb_scroll.isChecked():
             return
 
-        sb = self.__field.verticalScrollBar()
-        sb.setValue(sb.maximum())
+        self.__field.scrollToBottom()
 
     @pyqtSlot(SessionBuffer)
     def update_by_session(self, buf: SessionBuffer):
-        sb_cls = self.__get_current_string_builder()
-        sb = sb_cls(buf)
-        content = sb.to_string()
-        self.__field.insertPlainText(content)
+        self.__scheduler.push(buf)
+
+    @spanned("append")
+    def __on_sessions_ready(self, bufs: list[SessionBuffer]):
+        self.__model.append_sessions(bufs)
         self.__scroll_to_bottom()
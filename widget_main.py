@@ -35,3 +35,5 @@ class MainWidget(QWidget):
         w_sender = SerialSenderWidget(self)
         right_layout.addWidget(w_sender)
         self.__w_sender = w_sender
+
+        w_config.replay_source_changed.connect(w_receiver.set_source)
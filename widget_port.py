@@ -1,10 +1,13 @@
-from PyQt5.QtCore import *
-from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtWidgets import QFrame, QLabel, QPushButton, QVBoxLayout, QWidget
 
 from utils import find_main_window
+from widget_capture import CaptureRecordWidget, CaptureReplayWidget
+from widget_latency import LatencyWidget
 from wdiget_port_selector import PortListWidget
 from widget_port_details import PortDetailWidget
 from widget_port_parameter import PortParameterWidget
+from widget_triggers import TriggerWidget
 
 
 class HorizontalSplitWidget(QFrame):
@@ -15,6 +18,8 @@ class HorizontalSplitWidget(QFrame):
 
 
 class PortConfigWidget(QWidget):
+    replay_source_changed = pyqtSignal(object)
+
     def __init__(self, parent: QObject = None):
         super().__init__(parent)
 
@@ -47,6 +52,29 @@ class PortConfigWidget(QWidget):
         layout.addWidget(w_port_details)
         self.__w_port_details = w_port_details
 
+        layout.addWidget(QLabel(self, text="<html><b>キャプチャ</b></html>"))
+
+        w_capture = CaptureRecordWidget(self)
+        layout.addWidget(w_capture)
+        self.__w_capture = w_capture
+
+        w_replay = CaptureReplayWidget(self)
+        w_replay.source_changed.connect(self.replay_source_changed)
+        layout.addWidget(w_replay)
+        self.__w_replay = w_replay
+
+        layout.addWidget(QLabel(self, text="<html><b>トリガー</b></html>"))
+
+        w_triggers = TriggerWidget(self)
+        layout.addWidget(w_triggers)
+        self.__w_triggers = w_triggers
+
+        layout.addWidget(QLabel(self, text="<html><b>応答時間</b></html>"))
+
+        w_latency = LatencyWidget(self)
+        layout.addWidget(w_latency)
+        self.__w_latency = w_latency
+
         layout.addWidget(QLabel(self, text="<html><b>Windowの設定</b></html>"))
 
         b_stay_on_top = QPushButton(self)
@@ -2,30 +2,118 @@ import collections
 from collections import OrderedDict
 from datetime import time, datetime
 
-from PyQt5.QtCore import *
-from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QObject, QPointF, QRectF, QTimer, pyqtSlot
+from PyQt5.QtGui import QPainter, QPolygonF, QColor
+from PyQt5.QtWidgets import QGridLayout, QLabel, QVBoxLayout, QWidget
 
-from utils import g_ports
+from utils import g_get_ports
 
 
 def maybe_datetime_to_time_string(maybe_datetime: datetime | None) -> str:
     return "-" if maybe_datetime is None else str(maybe_datetime.time())[:-7]
 
 
+def format_rate(bytes_per_sec: float) -> str:
+    for unit in ("B/s", "KB/s"):
+        if bytes_per_sec < 1024:
+            return f"{bytes_per_sec:,.0f} {unit}"
+        bytes_per_sec /= 1024
+    return f"{bytes_per_sec:,.1f} MB/s"
+
+
+class SparklineWidget(QWidget):
+    # Draws a series scaled to its own maximum, as a line or as bars
+    def __init__(self, parent: QObject = None, bars: bool = False):
+        super().__init__(parent)
+
+        self.__bars = bars
+        self.__values: tuple[float, ...] = ()
+
+        self.setFixedHeight(28)
+
+    def set_values(self, values):
+        values = tuple(values)
+        if self.__values != values:
+            self.__values = values
+            self.update()
+
+    def paintEvent(self, evt):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        painter.setPen(self.palette().mid().color())
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+
+        values = self.__values
+        peak = max(values, default=0)
+        if not peak:
+            return
+        width, height = self.width() - 2, self.height() - 3
+        step = width / max(1, len(values) - (0 if self.__bars else 1))
+        color = QColor(0x30, 0x80, 0xd0)
+        if self.__bars:
+            for i, value in enumerate(values):
+                h = round(height * value / peak)
+                painter.fillRect(QRectF(1 + i * step, 1 + height - h, max(1.0, step - 1), h), color)
+        else:
+            painter.setPen(color)
+            painter.drawPolyline(QPolygonF([
+                QPointF(1 + i * step, 1 + height * (1 - value / peak)) for i, value in enumerate(values)
+            ]))
+
+
 class PortDetailWidget(QWidget):
     def __init__(self, parent: QObject = None):
         super().__init__(parent)
 
         self.__init_ui()
 
+        self.__telemetry_timer = QTimer(self)
+        self.__telemetry_timer.setInterval(500)
+        self.__telemetry_timer.timeout.connect(self.update_telemetry)
+        self.__telemetry_timer.start()
+
+    TELEMETRY_KEYS = [
+        ("rx_rate", "受信速度"),
+        ("rx_chunks", "受信回数"),
+        ("rx_peak", "受信ピーク"),
+        ("rx_peak_chunks", "受信回数ピーク"),
+        ("rx_jitter", "受信間隔σ"),
+        ("tx_rate", "送信速度"),
+        ("queue", "バッファ最大"),
+    ]
+
     def __init_ui(self):
         self.setFixedWidth(200)
 
-        layout = QGridLayout(self)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
 
+        layout_info = QGridLayout()
+        layout.addLayout(layout_info)
+        self.__layout_info = layout_info
+
+        layout_telemetry = QGridLayout()
+        layout.addLayout(layout_telemetry)
+        self.__telemetry_labels = {}
+        for i_row, (key, text) in enumerate(self.TELEMETRY_KEYS):
+            layout_telemetry.addWidget(QLabel(self, text=text), i_row, 0)
+            label = QLabel(self, text="-")
+            layout_telemetry.addWidget(label, i_row, 1)
+            self.__telemetry_labels[key] = label
+
+        w_rx_history = SparklineWidget(self)
+        w_rx_history.setToolTip("受信速度（直近5秒）")
+        layout.addWidget(w_rx_history)
+        self.__w_rx_history = w_rx_history
+
+        w_rx_jitter = SparklineWidget(self, bars=True)
+        w_rx_jitter.setToolTip("受信間隔の分布（左から1µs未満, 1µs以上, 2µs以上, 4µs以上, ... の2倍刻み）")
+        layout.addWidget(w_rx_jitter)
+        self.__w_rx_jitter = w_rx_jitter
+
     def set_values_on_view(self, mapping):
-        layout: QGridLayout = self.layout()
+        layout: QGridLayout = self.__layout_info
 
         for i in reversed(range(layout.count())):
             layout.itemAt(i).widget().deleteLater()
@@ -80,9 +168,34 @@ class PortDetailWidget(QWidget):
 
     @pyqtSlot()
     def update_port_info(self):
-        if g_ports.has_active():
-            serial_info = self.map_serial_info(g_ports.active_port_info)
+        if g_get_ports().has_active():
+            serial_info = self.map_serial_info(g_get_ports().active_port_info)
             self.set_values_on_view(serial_info)
             self.setEnabled(True)
         else:
             self.setEnabled(False)
+        self.update_telemetry()
+
+    @pyqtSlot()
+    def update_telemetry(self):
+        if not g_get_ports().has_active() or not self.isVisible():
+            return
+        telemetry = g_get_ports().active_port_telemetry.snapshot()
+        rx, tx = telemetry.rx, telemetry.tx
+
+        labels = self.__telemetry_labels
+        labels["rx_rate"].setText(format_rate(rx.bytes_per_sec))
+        labels["rx_chunks"].setText(f"{rx.chunks_per_sec:,.1f} /s")
+        labels["rx_peak"].setText(format_rate(rx.peak_bytes_per_sec))
+        labels["rx_peak_chunks"].setText(f"{rx.peak_chunks_per_sec:,.0f} /s")
+        labels["rx_jitter"].setText(f"{rx.jitter_ns / 1e6:,.2f} ms")
+        labels["tx_rate"].setText(format_rate(tx.bytes_per_sec))
+        labels["queue"].setText(
+            f"{telemetry.queue_high_water:,} B ({telemetry.queue_high_water / telemetry.queue_capacity:.0%})"
+            if telemetry.queue_capacity else "-"
+        )
+        # The backlog of the last few seconds shows that the display is falling behind the port
+        labels["queue"].setStyleSheet("color: red" if telemetry.falling_behind else "")
+
+        self.__w_rx_history.set_values(rx.history)
+        self.__w_rx_jitter.set_values(rx.jitter_histogram)
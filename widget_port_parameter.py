@@ -1,7 +1,7 @@
-from PyQt5.QtCore import *
-from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtWidgets import QComboBox, QGridLayout, QWidget
 
-from utils import g_ports, COMPortParameters
+from utils import g_get_ports, COMPortParameters
 
 
 class PortParameterWidget(QWidget):
@@ -31,7 +31,7 @@ class PortParameterWidget(QWidget):
     @pyqtSlot()
     def on_parameter_changed(self):
         baudrate = int(self.__l_baudrate.currentText().split(" ")[0])
-        g_ports.set_params_and_reopen(
+        g_get_ports().set_params_and_reopen(
             COMPortParameters(
                 baudrate=baudrate,
             )
@@ -1,17 +1,37 @@
-from PyQt5.QtCore import *
-from PyQt5.QtWidgets import QVBoxLayout, QTabWidget
+import itertools
+import time
 
-from serial_core import COMPortIOError
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSlot
+from PyQt5.QtWidgets import QTabWidget, QCheckBox, QWidget, QHBoxLayout
+
+from framing import Framer, FramingConfig
+from profiling import span
+from serial_core import COMPortIOError, perf_counter_ns_to_datetime
 from status import g_get_status
-from utils import g_ports, block_signals_context
+from utils import g_get_ports
+from widget_framing import FramingSelectorWidget
 from widget_logging_field import LogViewWidget, LogBuffer
 
 
 class SerialReceiverViewWidget(QTabWidget):
+    # One tab per receiving port, plus an optional merged tab that interleaves every port by acquisition time
+    REPLAY_SOURCE_NAME = "再生"
+    MERGED_TAB_TEXT = "統合"
+
     def __init__(self, parent: QObject = None):
         super().__init__(parent)
 
-        self.__buf = LogBuffer(self)
+        self.__source = None
+        self.__bufs: dict[str, LogBuffer] = {}
+        self.__loggers: dict[str, LogViewWidget] = {}
+        self.__merged_buf = LogBuffer(self)
+        self.__merged_logger: LogViewWidget | None = None
+        self.__framing = FramingConfig.default()
+        self.__framers: dict[str, Framer | None] = {}
+        self.__framer_offsets: dict[str, int] = {}  # received stream offset of the first byte fed to the framer
+        self.__highlights: dict[str, list[tuple[int, int]]] = {}  # ranges of received bytes not shown yet
+        self.__n_received: dict[str, int] = {}  # received stream offset reached by the last poll
+        self.__n_messages = 0
 
         self.__init_ui()
 
@@ -21,28 +41,213 @@ class SerialReceiverViewWidget(QTabWidget):
         self.__timer.start()
 
     def __init_ui(self):
-        layout = QVBoxLayout()
-        self.setLayout(layout)
+        self.setMinimumWidth(840)
+        self.setTabsClosable(True)
+        self.tabCloseRequested.connect(self.__on_tab_close_requested)
+
+        w_corner = QWidget(self)
+        layout_corner = QHBoxLayout(w_corner)
+        layout_corner.setContentsMargins(0, 0, 0, 0)
+        w_corner.setLayout(layout_corner)
+        self.setCornerWidget(w_corner, Qt.TopRightCorner)
+
+        w_framing = FramingSelectorWidget(w_corner)
+        w_framing.framing_changed.connect(self.set_framing)
+        layout_corner.addWidget(w_framing)
+
+        cb_merged = QCheckBox(w_corner)
+        cb_merged.setText("統合ビュー")
+        cb_merged.toggled.connect(self.__on_cb_merged_toggled)
+        layout_corner.addWidget(cb_merged)
+        self.__cb_merged = cb_merged
+
+    def __on_cb_merged_toggled(self, checked: bool):
+        if checked and self.__merged_logger is None:
+            logger = LogViewWidget(self, show_source=True)
+            self.__merged_buf.session_completed.connect(logger.update_by_session)
+            self.insertTab(0, logger, self.MERGED_TAB_TEXT)
+            self.setCurrentIndex(0)
+            self.__merged_logger = logger
+        elif not checked and self.__merged_logger is not None:
+            self.removeTab(self.indexOf(self.__merged_logger))
+            self.__merged_logger.deleteLater()
+            self.__merged_logger = None
+
+    def __on_tab_close_requested(self, index: int):
+        logger = self.widget(index)
+        if logger is self.__merged_logger:
+            self.__cb_merged.setChecked(False)
+            return
+        for name, other in list(self.__loggers.items()):
+            if other is logger:
+                # The tab comes back with the next bytes received from this port
+                del self.__loggers[name]
+                self.__bufs.pop(name).deleteLater()
+                self.__framers.pop(name, None)
+                self.__highlights.pop(name, None)
+                self.removeTab(index)
+                logger.deleteLater()
+                break
+
+    def __get_buf(self, name: str) -> LogBuffer:
+        buf = self.__bufs.get(name)
+        if buf is None:
+            buf = LogBuffer(self)
+            logger = LogViewWidget(self)
+            buf.session_completed.connect(logger.update_by_session)
+            self.addTab(logger, name)
+            self.__bufs[name] = buf
+            self.__loggers[name] = logger
+        return buf
+
+    def __update_tab_texts(self):
+        open_names = set(g_get_ports().open_port_names)
+        for name, logger in self.__loggers.items():
+            if name == self.REPLAY_SOURCE_NAME:
+                closed = self.__source is None
+            else:
+                closed = name not in open_names
+            text = f"{name}（閉）" if closed else name
+            index = self.indexOf(logger)
+            if self.tabText(index) != text:
+                self.setTabText(index, text)
+
+    @pyqtSlot(object)
+    def set_source(self, source):
+        # Also read from source (e.g. a capture replay) in its own tab; None stops reading from it
+        self.__source = source
+
+    @pyqtSlot(object)
+    def set_framing(self, config: FramingConfig):
+        # Bytes still waiting for the end of their message are shown as they are before switching
+        merged = []
+        for name, framer in self.__framers.items():
+            if framer is not None:
+                self.__emit_messages(name, self.__mark_messages(name, framer, framer.flush()), merged)
+        self.__emit_merged(merged)
+        self.__framers.clear()
+        self.__framing = config
 
-        logger = LogViewWidget(self)
-        logger.setMinimumWidth(840)
-        self.__buf.session_completed.connect(logger.update_by_session)
-        layout.addWidget(logger)
-        self.__logger = logger
+    def __get_framer(self, name: str, offset: int) -> Framer | None:
+        try:
+            return self.__framers[name]
+        except KeyError:
+            framer = self.__framers[name] = self.__framing.create_framer()
+            self.__framer_offsets[name] = offset
+            return framer
+
+    def __is_highlighted(self, name: str, start: int, stop: int) -> bool:
+        return any(s < stop and start < e for s, e in self.__highlights.get(name, ()))
+
+    def __mark_messages(self, name: str, framer: Framer, messages: list[tuple[int, bytes]]) -> list:
+        # (timestamp, bytes, highlighted) of the messages the framer just returned
+        base = self.__framer_offsets[name]
+        return [
+            (timestamp_ns, values, self.__is_highlighted(name, base + offset, base + offset + len(values)))
+            for (timestamp_ns, values), offset in zip(messages, framer.message_offsets)
+        ]
+
+    def __emit_messages(self, name: str, messages: list[tuple[int, bytes, bool]], merged: list):
+        if not messages:
+            return
+        buf = self.__get_buf(name)
+        for timestamp_ns, values, highlighted in messages:
+            buf.session_begin(perf_counter_ns_to_datetime(timestamp_ns).time(), name, highlighted)
+            buf.append(values)
+            buf.session_end()
+
+        if self.__merged_logger is not None:
+            # Every message stays a session of its own in the merged view as well
+            for timestamp_ns, values, highlighted in messages:
+                self.__n_messages += 1
+                merged.append((timestamp_ns, name, self.__n_messages, values, highlighted))
+
+    def __emit_merged(self, merged: list):
+        # merged holds (timestamp, port, group, bytes, highlighted); consecutive entries of a group become one session
+        if not merged:
+            return
+        merged.sort(key=lambda chunk: chunk[0])
+        for _, run in itertools.groupby(merged, key=lambda chunk: chunk[2]):
+            run = list(run)
+            highlighted = any(chunk[4] for chunk in run)
+            self.__merged_buf.session_begin(perf_counter_ns_to_datetime(run[0][0]).time(), run[0][1], highlighted)
+            for _, _, _, values, _ in run:
+                self.__merged_buf.append(values)
+            self.__merged_buf.session_end()
+
+    def __end_stream(self, name: str, merged: list):
+        # A port that was closed will not complete its last message
+        framer = self.__framers.pop(name, None)
+        if framer is not None:
+            self.__emit_messages(name, self.__mark_messages(name, framer, framer.flush()), merged)
+        self.__highlights.pop(name, None)
+        self.__n_received.pop(name, None)
+
+    def __list_sources(self) -> list:
+        sources = [(name, g_get_ports().get_port_io(name)) for name in g_get_ports().open_port_names]
+        if self.__source is not None:
+            sources.append((self.REPLAY_SOURCE_NAME, self.__source))
+        return sources
 
     def update_log(self):
-        self.__logger.dispatch_clear_later()
-        with block_signals_context(self.__logger):
-            if not g_ports.has_active():
-                return
-            active_io = g_ports.active_port_io
+        for logger in self.__loggers.values():
+            logger.dispatch_clear_later()
+        if self.__merged_logger is not None:
+            self.__merged_logger.dispatch_clear_later()
 
+        merged = []
+        now_ns = time.perf_counter_ns()
+        sources = self.__list_sources()
+        for name, io in sources:
             try:
-                n_available = active_io.n_available
-                if n_available:
-                    self.__buf.session_begin()
-                    values = active_io.receive_bytes(n_available)
-                    self.__buf.append(values)
-                    self.__buf.session_end()
+                with span("receive"):
+                    offset = io.n_received
+                    if offset < self.__n_received.get(name, 0):
+                        # Reopened; the stream and the offsets start over
+                        self.__end_stream(name, merged)
+                    chunks = io.receive_chunks()
+                    # Ranges come in once the reader has delivered their bytes, which may be after this poll
+                    highlights = self.__highlights.setdefault(name, [])
+                    highlights += io.receive_highlights()
             except COMPortIOError as e:
                 g_get_status().error(f"データを受信できません：{type(e).__name__}")
+                continue
+
+            framer = self.__get_framer(name, offset)
+            end = offset + sum(len(values) for _, values in chunks)
+            shown = end
+            if framer is None:
+                if chunks:
+                    # Each poll becomes one session; the merged view interleaves its chunks with the other ports
+                    buf = self.__get_buf(name)
+                    buf.session_begin(
+                        perf_counter_ns_to_datetime(chunks[0][0]).time(), name,
+                        self.__is_highlighted(name, offset, end),
+                    )
+                    for _, values in chunks:
+                        buf.append(values)
+                    buf.session_end()
+                if chunks and self.__merged_logger is not None:
+                    for timestamp_ns, values in chunks:
+                        highlighted = self.__is_highlighted(name, offset, offset + len(values))
+                        merged.append((timestamp_ns, name, name, values, highlighted))
+                        offset += len(values)
+            else:
+                with span("framing"):
+                    messages = []
+                    for timestamp_ns, values in chunks:
+                        messages += self.__mark_messages(name, framer, framer.feed(values, timestamp_ns))
+                    messages += self.__mark_messages(name, framer, framer.poll(now_ns))
+                self.__emit_messages(name, messages, merged)
+                # Bytes still in the framer are shown later
+                shown -= framer.n_pending
+            self.__highlights[name] = [(s, e) for s, e in highlights if e > shown]
+            self.__n_received[name] = end
+
+        source_names = {name for name, _ in sources}
+        for name in [name for name in self.__n_received if name not in source_names]:
+            self.__end_stream(name, merged)
+
+        self.__emit_merged(merged)
+
+        self.__update_tab_texts()
@@ -1,14 +1,18 @@
 import binascii
 import collections
+import os
 
-from PyQt5.QtCore import QObject, Qt, QEvent
+from PyQt5.QtCore import QObject, Qt, QEvent, QTimer, pyqtSignal
 from PyQt5.QtGui import QKeyEvent, QFont
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QCheckBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QCheckBox, QHBoxLayout, QLabel, QSpinBox, \
+    QComboBox, QPushButton, QFileDialog
 
-from serial_core import COMPortIOError, COMPortOSError, COMPortClosedError
+from send_script import load_frames, SendScriptError, SCRIPT_RAW, SCRIPT_HEX_LINES, SCRIPT_TEXT_LINES
+from serial_core import COMPortIOError, COMPortOSError, COMPortClosedError, COMPortBusyError, \
+    COMPortCancelledError, COMPortSendJob
 from status import g_get_status
 from utils import decode_ascii, block_signals_context
-from utils import g_ports
+from utils import g_get_ports
 
 
 class SendBuffer:
@@ -58,6 +62,9 @@ class SendBuffer:
 
 
 class SerialSenderWidget(QWidget):
+    # Emitted with the COMPortSendJob from the writer thread; delivered on the GUI thread
+    send_done = pyqtSignal(object)
+
     def __init__(self, parent: QObject = None):
         super().__init__(parent)
 
@@ -66,9 +73,22 @@ class SerialSenderWidget(QWidget):
 
         self.__init_ui()
 
+        self.send_done.connect(self.__on_send_done)
+
+        # Refreshes the pending count while the writer thread drains the queue
+        self.__pending_timer = QTimer(self)
+        self.__pending_timer.setInterval(100)
+        self.__pending_timer.timeout.connect(self.__update_pending)
+
     EMPTY_PLACEHOLDER_BYTES = "送信する16進数を入力してエンター 例：48656c6c6f2121"
     EMPTY_PLACEHOLDER_TEXT = "送信する文字列を入力してエンター 例：Hello!!"
 
+    SCRIPT_CHOICES = [
+        ("ファイル全体", SCRIPT_RAW),
+        ("16進数の行ごと", SCRIPT_HEX_LINES),
+        ("文字列の行ごと", SCRIPT_TEXT_LINES),
+    ]
+
     def __init_ui(self):
         layout = QVBoxLayout()
 
@@ -93,6 +113,48 @@ class SerialSenderWidget(QWidget):
         layout.addWidget(cb_newline)
         self.__cb_newline = cb_newline
 
+        layout_burst = QHBoxLayout()
+        layout.addLayout(layout_burst)
+
+        layout_burst.addWidget(QLabel("間隔", self))
+        sb_delay = QSpinBox(self)
+        sb_delay.setRange(0, 60_000)
+        sb_delay.setSuffix(" ms")
+        sb_delay.setToolTip("フレームを送る間隔（0 で回線の速度いっぱいに送る）")
+        layout_burst.addWidget(sb_delay)
+        self.__sb_delay = sb_delay
+
+        layout_burst.addWidget(QLabel("繰り返し", self))
+        sb_repeat = QSpinBox(self)
+        sb_repeat.setRange(1, 1_000_000)
+        sb_repeat.setSuffix(" 回")
+        layout_burst.addWidget(sb_repeat)
+        self.__sb_repeat = sb_repeat
+
+        l_script = QComboBox(self)
+        l_script.setToolTip("ファイルをフレームに分ける方法")
+        for text, kind in self.SCRIPT_CHOICES:
+            l_script.addItem(text, kind)
+        layout_burst.addWidget(l_script)
+        self.__l_script = l_script
+
+        b_file = QPushButton(self)
+        b_file.setText("ファイル送信…")
+        b_file.clicked.connect(self.send_file)
+        layout_burst.addWidget(b_file)
+
+        b_cancel = QPushButton(self)
+        b_cancel.setText("停止")
+        b_cancel.setEnabled(False)
+        b_cancel.clicked.connect(self.cancel)
+        layout_burst.addWidget(b_cancel)
+        self.__b_cancel = b_cancel
+
+        l_pending = QLabel(self)
+        layout_burst.addWidget(l_pending)
+        layout_burst.addStretch(1)
+        self.__l_pending = l_pending
+
         self.setLayout(layout)
 
         self.set_indicator(
@@ -232,27 +294,77 @@ class SerialSenderWidget(QWidget):
                 placeholder=True
             )
 
+    def __send(self, frames: list[bytes]):
+        # Queued for the writer thread of the active port; the result comes back through send_done
+        if not g_get_ports().has_active():
+            raise COMPortClosedError()
+        g_get_ports().active_port_io.send_async(
+            frames,
+            delay_ns=self.__sb_delay.value() * 1_000_000,
+            repeat=self.__sb_repeat.value(),
+            on_done=self.send_done.emit,
+        )
+        self.__update_pending()
+
+    def __on_send_done(self, job: COMPortSendJob):
+        if job.error is None:
+            if len(job.frames) == 1 and job.repeat == 1:
+                values = " ".join(f"{value:02x}" for value in job.frames[0])
+                g_get_status().info(f"データを送信しました：{values}")
+            else:
+                g_get_status().info(f"データを送信しました：{job.n_frames_sent:,} フレーム、{job.n_bytes_sent:,} バイト")
+        elif isinstance(job.error, COMPortCancelledError):
+            g_get_status().info(f"送信を中止しました：{job.n_bytes_sent:,} / {job.n_bytes:,} バイト送信済み")
+        else:
+            g_get_status().error(f"データを送信できません：{type(job.error).__name__}")
+        self.__update_pending()
+
+    def __update_pending(self):
+        try:
+            n_pending = g_get_ports().active_port_io.n_send_pending if g_get_ports().has_active() else 0
+        except COMPortIOError:
+            n_pending = 0
+        self.__l_pending.setText(f"送信待ち {n_pending:,} バイト" if n_pending else "")
+        self.__b_cancel.setEnabled(n_pending > 0)
+        if n_pending and not self.__pending_timer.isActive():
+            self.__pending_timer.start()
+        elif not n_pending:
+            self.__pending_timer.stop()
+
+    def cancel(self):
+        try:
+            g_get_ports().active_port_io.cancel_sends()
+        except COMPortIOError:
+            pass
+
+    def send_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "送信するファイル", os.getcwd())
+        if not path:
+            return
+        try:
+            frames = load_frames(path, self.__l_script.currentData())
+            self.__send(frames)
+        except SendScriptError as e:
+            g_get_status().error(str(e))
+        except COMPortBusyError:
+            g_get_status().error("送信待ちのデータが多すぎます")
+        except COMPortIOError as e:
+            g_get_status().error(f"データを送信できません：{type(e).__name__}")
+
     def flush(self):
         fail = True
-        bytes_sent = None
 
         try:
             if self.__cb_newline.isChecked():
                 if self.__state.startswith("ok") or self.__state == "empty":
-                    if g_ports.has_active():
-                        bytes_sent = self.current_input_bytes() + b"\x0a"
-                        g_ports.active_port_io.send_bytes(bytes_sent)
-                        fail = False
-                    else:
-                        raise COMPortClosedError()
+                    self.__send([self.current_input_bytes() + b"\x0a"])
+                    fail = False
             else:
                 if self.__state.startswith("ok"):
-                    if g_ports.has_active():
-                        bytes_sent = self.current_input_bytes()
-                        g_ports.active_port_io.send_bytes(bytes_sent)
-                        fail = False
-                    else:
-                        raise COMPortClosedError()
+                    self.__send([self.current_input_bytes()])
+                    fail = False
+        except COMPortBusyError:
+            g_get_status().error("送信待ちのデータが多すぎます")
         except COMPortIOError as e:
             g_get_status().error(f"データを送信できません：{type(e).__name__}")
 
@@ -261,9 +373,6 @@ class SerialSenderWidget(QWidget):
 
         self.__buf.notify_flush()
 
-        values = " ".join(f"{value:02x}" for value in bytes_sent)
-        g_get_status().info(f"データを送信しました：{values}")
-
         self.set_indicator(
             "empty",
             self.EMPTY_PLACEHOLDER_BYTES,
@@ -0,0 +1,50 @@
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
+
+from d_triggers import TriggerDialog, format_rule
+from status import g_get_status
+from utils import g_get_ports
+
+
+class TriggerWidget(QWidget):
+    # Edits the rules the reader threads of every port evaluate and shows how often each one matched
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        self.__init_ui()
+
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(500)
+        self.__timer.timeout.connect(self.update_counts)
+        self.__timer.start()
+
+    def __init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        b_edit = QPushButton(self)
+        b_edit.setText("トリガー設定")
+        b_edit.clicked.connect(self.__on_b_edit_clicked)
+        layout.addWidget(b_edit)
+
+        label_counts = QLabel(self)
+        label_counts.setWordWrap(True)
+        layout.addWidget(label_counts)
+        self.__label_counts = label_counts
+
+    def __on_b_edit_clicked(self):
+        dialog = TriggerDialog(self, g_get_ports().trigger_config)
+        if not dialog.exec():
+            return
+        g_get_ports().set_triggers(dialog.config)
+        if dialog.config.gated:
+            g_get_status().info("記録開始のルールが一致するまで受信データを表示しません")
+        self.update_counts()
+
+    def update_counts(self):
+        rules = g_get_ports().trigger_config.rules
+        counts = g_get_ports().trigger_counts()
+        text = "\n".join(f"{format_rule(rule)}：{count:,}件" for rule, count in zip(rules, counts))
+        if self.__label_counts.text() != text:
+            self.__label_counts.setText(text)
@@ -1,10 +1,12 @@
+import os
 from datetime import datetime
 
-import psutil
 from PyQt5.QtCore import QObject, QSize, QTimer
-from PyQt5.QtWidgets import *
+from PyQt5.QtWidgets import QFileDialog, QFrame, QLabel, QMainWindow, QStatusBar
 
+import profiling
 from status import StatusMessageHandler, register_message_handler, g_get_status
+from utils import block_signals_context
 from widget_main import MainWidget
 
 
@@ -61,6 +63,46 @@ class MainWindow(QMainWindow):
         self.ram_label.setFixedWidth(100)
         status.addPermanentWidget(self.ram_label)
 
+        status.addPermanentWidget(VLine())
+
+        self.profile_label = QLabel(self)
+        self.profile_label.setMinimumWidth(100)
+        status.addPermanentWidget(self.profile_label)
+
+        menu_tool = self.menuBar().addMenu("ツール")
+
+        a_spans = menu_tool.addAction("処理時間を計測する")
+        a_spans.setCheckable(True)
+        a_spans.setChecked(profiling.spans_enabled())
+        a_spans.toggled.connect(self.__on_a_spans_toggled)
+
+        a_profile = menu_tool.addAction("プロファイルを記録する")
+        a_profile.setCheckable(True)
+        a_profile.setChecked(profiling.profile_running())
+        a_profile.toggled.connect(self.__on_a_profile_toggled)
+        self.__a_profile = a_profile
+
+    def __on_a_spans_toggled(self, checked: bool):
+        profiling.reset_spans()
+        profiling.set_spans_enabled(checked)
+        if not checked:
+            self.profile_label.clear()
+            self.profile_label.setToolTip("")
+
+    def __on_a_profile_toggled(self, checked: bool):
+        if checked:
+            default_name = datetime.now().strftime("profile_%Y%m%d_%H%M%S.prof")
+            path, _ = QFileDialog.getSaveFileName(self, "プロファイルの保存先", default_name, "cProfile (*.prof)")
+            if not path:
+                with block_signals_context(self.__a_profile):
+                    self.__a_profile.setChecked(False)
+                return
+            profiling.start_profile(path)
+            g_get_status().info(f"プロファイルを記録しています：{os.path.basename(path)}")
+        elif profiling.profile_running():
+            path = profiling.stop_profile()
+            g_get_status().info(f"プロファイルを保存しました：{path}")
+
 
     def showEvent(self, evt):
         g_get_status().info("COMポートを開いてください")
@@ -84,9 +126,34 @@ class MainWindow(QMainWindow):
             self.cpu_label.setText(message)
         elif tag == "ram":
             self.ram_label.setText(message)
+        elif tag == "profile":
+            self.profile_label.setText(message)
         else:
             assert False, tag
 
     def timer_timeout(self):
+        # psutil takes a noticeable part of the startup time, so it is loaded once the window is up
+        import psutil
+
         g_get_status().info("CPU: {:.0f}%".format(psutil.cpu_percent()), tag="cpu")
         g_get_status().info("RAM: {:.0f}MB".format(psutil.virtual_memory().total >> 30), tag="ram")
+        if profiling.spans_enabled():
+            self.__update_profile_label()
+
+    PROFILE_LABEL_SPANS = 3
+
+    def __update_profile_label(self):
+        # Time spent in each stage during the last timer interval, slowest first
+        stats_list = profiling.list_span_stats()
+        intervals = sorted(((stats.take_interval(), stats) for stats in stats_list), key=lambda x: -x[0])
+        text = " ".join(
+            f"{stats.name}: {elapsed_ns / 1e6:.1f}ms"
+            for elapsed_ns, stats in intervals[:self.PROFILE_LABEL_SPANS]
+        )
+        g_get_status().info(text or "計測中", tag="profile")
+        self.profile_label.setToolTip("\n".join(
+            f"{stats.name}: {stats.count:,}回 平均 {stats.total_ns / stats.count / 1e3:,.0f}µs"
+            f" p50 ≤{stats.percentile_ns(0.5) / 1e3:,.0f}µs p99 ≤{stats.percentile_ns(0.99) / 1e3:,.0f}µs"
+            f" 最大 {stats.max_ns / 1e3:,.0f}µs"
+            for stats in sorted(stats_list, key=lambda stats: stats.name) if stats.count
+        ))